@@ -0,0 +1,83 @@
+"""
+Import-time check for Scout ETL Pipeline
+Fails when importing any ETL module reads configuration, pulls client
+drivers or spends more than a budget in ETL module bodies
+
+Usage (from pipelines/scout): python bench_import_time.py [--module etl.load.postgres_copy] [--budget-ms 100]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent
+
+# Loaded on first config access or extractor use, never at import
+LAZY_MODULES = ["yaml", "dotenv", "requests", "sqlalchemy", "supabase", "pyodbc", "psycopg"]
+
+def etl_modules() -> List[str]:
+    """Every module of the etl package, found on disk so none is imported here"""
+    modules = []
+    for path in sorted((ROOT / "etl").rglob("*.py")):
+        parts = path.relative_to(ROOT).with_suffix("").parts
+        modules.append(".".join(parts[:-1] if parts[-1] == "__init__" else parts))
+    return modules
+
+def measure_import(module: str) -> Tuple[Dict[str, int], List[str]]:
+    """Self time (us) of each ETL module and the lazy modules that got imported"""
+    probe = (f"import sys, {module}; "
+             f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+
+    self_us: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == "etl" or name.startswith("etl."):
+            self_us[name] = int(self_time)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return self_us, loaded
+
+def check_module(module: str, budget_ms: float, repeat: int) -> bool:
+    runs = [measure_import(module) for _ in range(max(1, repeat))]
+    self_us, loaded = min(runs, key=lambda r: sum(r[0].values()))
+    total_ms = sum(self_us.values()) / 1000
+
+    ok = not loaded and total_ms <= budget_ms
+    print(f"{'✅' if ok else '❌'} import {module}: {total_ms:.1f} ms in ETL modules")
+    if loaded:
+        print(f"   Imported eagerly: {', '.join(loaded)}")
+    if total_ms > budget_ms:
+        print(f"   Over budget by {total_ms - budget_ms:.1f} ms, slowest:")
+        slowest = sorted(self_us.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        for name, us in slowest:
+            print(f"   {us / 1000:7.1f} ms  {name}")
+    return ok
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", action="append",
+                        help="Module to check (repeatable); default every etl module")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="Max time spent in ETL module bodies per imported module")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Fresh interpreters per module; the fastest one counts")
+    args = parser.parse_args()
+
+    modules = args.module or etl_modules()
+    print(f"⏱️  Checking {len(modules)} modules (budget {args.budget_ms:.0f} ms each)")
+    failed = [m for m in modules if not check_module(m, args.budget_ms, args.repeat)]
+
+    if failed:
+        print(f"❌ {len(failed)} of {len(modules)} modules failed: {', '.join(failed)}")
+        return 1
+    print("✅ Import time within budget, no eager driver or config imports")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
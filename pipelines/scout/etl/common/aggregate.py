@@ -0,0 +1,202 @@
+"""
+Vectorized grouped aggregations for Scout ETL Pipeline
+Aggregations on factorized group codes that avoid per-group Python callbacks
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .hll import grouped_distinct_estimate
+
+def group_codes(keys: pd.Series, sort: bool = True) -> Tuple[np.ndarray, pd.Index]:
+    """Factorize a group key column; returns (codes, unique keys)"""
+    codes, uniques = pd.factorize(keys, sort=sort, use_na_sentinel=True)
+    return codes, pd.Index(uniques, name=keys.name)
+
+def first_n_distinct_join(codes: np.ndarray, n_groups: int, values: pd.Series,
+                          n: int, sep: str = '|') -> np.ndarray:
+    """Per group, join the first `n` distinct values in order of appearance
+
+    Vectorized equivalent of ``groupby(...)[col].agg(lambda x: sep.join(x.unique()[:n]))``
+    working on factorized codes; null values are skipped. Rows whose
+    group code is -1 are ignored. Returns an object array of length
+    `n_groups` ('' for groups without values).
+    """
+    result = np.full(n_groups, '', dtype=object)
+    if n_groups == 0 or len(values) == 0 or n <= 0:
+        return result
+
+    value_codes, value_uniques = pd.factorize(values, use_na_sentinel=True)
+    valid = (codes >= 0) & (value_codes >= 0)
+    rows = np.flatnonzero(valid)
+    if len(rows) == 0:
+        return result
+
+    # First occurrence of each distinct (group, value) pair
+    pair = codes[rows].astype(np.int64) * (len(value_uniques) + 1) + value_codes[rows]
+    _, first_pos = np.unique(pair, return_index=True)
+    first_rows = rows[np.sort(first_pos)]
+
+    # Order pairs by group, then by appearance; rank within each group
+    pair_groups = codes[first_rows]
+    order = np.argsort(pair_groups, kind='stable')
+    pair_groups = pair_groups[order]
+    pair_values = value_codes[first_rows][order]
+
+    group_start = np.r_[0, np.flatnonzero(np.diff(pair_groups)) + 1]
+    starts = np.repeat(group_start, np.diff(np.r_[group_start, len(pair_groups)]))
+    rank = np.arange(len(pair_groups)) - starts
+
+    labels = np.asarray(value_uniques.astype(str), dtype=object)
+    for k in range(n):
+        take = rank == k
+        if not take.any():
+            break
+        groups_k = pair_groups[take]
+        labels_k = labels[pair_values[take]]
+        if k == 0:
+            result[groups_k] = labels_k
+        else:
+            result[groups_k] = result[groups_k] + sep + labels_k
+
+    return result
+
+def broadcast_group_stats(df: pd.DataFrame, by: str, aggs: Dict[str, Tuple[str, str]],
+                          decimals: Optional[int] = None,
+                          hll_precision: int = 10) -> pd.DataFrame:
+    """Compute several per-group statistics and broadcast them back onto rows
+
+    `aggs` maps output column -> (source column, how) with how in
+    {'sum', 'count', 'mean', 'nunique', 'approx_nunique', 'size'};
+    'approx_nunique' estimates distinct counts with HyperLogLog registers
+    of `hll_precision` bits instead of deduplicating pairs. The key is factorized
+    once, each statistic is a bincount over the codes, and results are
+    attached by indexing with the row codes, which replaces
+    ``groupby(...).agg(...)`` followed by ``merge`` back onto the frame.
+    Rows with a null key get NaN, as a left merge would give them.
+    """
+    codes, uniques = group_codes(df[by], sort=False)
+    n_groups = len(uniques)
+    valid = codes >= 0
+    safe_codes = np.where(valid, codes, 0)
+    has_null_keys = not valid.all()
+
+    sums: Dict[str, np.ndarray] = {}
+    counts: Dict[str, np.ndarray] = {}
+
+    def group_sum(col: str) -> np.ndarray:
+        if col not in sums:
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            present = valid & ~np.isnan(values)
+            sums[col] = np.bincount(codes[present], weights=values[present], minlength=n_groups)
+            counts[col] = np.bincount(codes[present], minlength=n_groups)
+        return sums[col]
+
+    def group_count(col: str) -> np.ndarray:
+        if col not in counts:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                group_sum(col)
+            else:
+                present = valid & df[col].notna().to_numpy()
+                counts[col] = np.bincount(codes[present], minlength=n_groups)
+        return counts[col]
+
+    columns = {}
+    for out_col, (col, how) in aggs.items():
+        if how == 'sum':
+            stat = group_sum(col)
+        elif how == 'count':
+            stat = group_count(col)
+        elif how == 'size':
+            stat = np.bincount(codes[valid], minlength=n_groups)
+        elif how == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stat = group_sum(col) / group_count(col)
+            stat = np.where(group_count(col) > 0, stat, np.nan)
+        elif how == 'nunique':
+            value_codes, _ = pd.factorize(df[col], use_na_sentinel=True)
+            present = valid & (value_codes >= 0)
+            pairs = np.unique(np.stack([codes[present], value_codes[present]]), axis=1)
+            stat = np.bincount(pairs[0], minlength=n_groups)
+        elif how == 'approx_nunique':
+            stat = grouped_distinct_estimate(codes, n_groups, df[col], hll_precision).astype(np.int64)
+        else:
+            raise ValueError(f"Unsupported aggregation '{how}' for {out_col}")
+
+        if decimals is not None and stat.dtype.kind == 'f':
+            stat = np.round(stat, decimals)
+
+        row_values = stat[safe_codes]
+        if has_null_keys:
+            row_values = np.where(valid, row_values.astype(float), np.nan)
+        columns[out_col] = row_values
+
+    return pd.DataFrame(columns, index=df.index)
+
+def broadcast_stats_table(keys: pd.Series, stats: pd.DataFrame) -> pd.DataFrame:
+    """Attach precomputed per-group statistics (indexed by group key) to rows
+
+    Used when the statistics cover more rows than the frame at hand, e.g.
+    population-wide stats applied to one partition. Keys missing from
+    `stats` get NaN.
+    """
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        keys = keys.astype(keys.cat.categories.dtype)
+    positions = stats.index.get_indexer(keys)
+    return pd.DataFrame({
+        col: pd.api.extensions.take(stats[col].array, positions, allow_fill=True)
+        for col in stats.columns
+    }, index=keys.index)
+
+# Aggregations that merge across partitions from partial sums and counts
+MERGEABLE_AGGS = ('sum', 'count', 'mean', 'size')
+
+def group_stat_partials(df: pd.DataFrame, by: str,
+                        aggs: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+    """Per-group partial sums and counts for `aggs`, indexed by group key
+
+    `aggs` uses the `broadcast_group_stats` spec restricted to
+    MERGEABLE_AGGS. Partials of several partitions combine with
+    `merge_group_stats` into the statistics of their union.
+    """
+    keys = df[by]
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        keys = keys.astype(keys.cat.categories.dtype)
+    parts = {}
+    for out_col, (col, how) in aggs.items():
+        if how not in MERGEABLE_AGGS:
+            raise ValueError(f"Aggregation '{how}' for {out_col} cannot be merged across partitions")
+        if how == 'size':
+            parts['size'] = np.ones(len(df), dtype=np.int64)
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]) or how != 'count':
+            values = pd.to_numeric(df[col], errors='coerce')
+            parts[f'{col}:sum'] = values.fillna(0).to_numpy(dtype=float)
+            present = values.notna()
+        else:
+            present = df[col].notna()
+        parts[f'{col}:count'] = present.to_numpy(dtype=np.int64)
+    return pd.DataFrame(parts, index=df.index).groupby(keys.to_numpy(), sort=False).sum()
+
+def merge_group_stats(partials: List[pd.DataFrame], aggs: Dict[str, Tuple[str, str]],
+                      decimals: Optional[int] = None) -> pd.DataFrame:
+    """Combine `group_stat_partials` into the statistics of `aggs` per group
+
+    Values match `broadcast_group_stats` over all partitions at once
+    (before broadcasting); means of groups without values are NaN.
+    """
+    totals = pd.concat(partials).groupby(level=0).sum()
+    columns = {}
+    for out_col, (col, how) in aggs.items():
+        if how == 'size':
+            stat = totals['size'].astype('int64')
+        elif how == 'sum':
+            stat = totals[f'{col}:sum'].astype(float)
+        elif how == 'count':
+            stat = totals[f'{col}:count'].astype('int64')
+        else:
+            count = totals[f'{col}:count']
+            stat = totals[f'{col}:sum'] / count.where(count > 0)
+        if decimals is not None and stat.dtype.kind == 'f':
+            stat = stat.round(decimals)
+        columns[out_col] = stat
+    return pd.DataFrame(columns, index=totals.index)
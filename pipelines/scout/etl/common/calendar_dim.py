@@ -0,0 +1,202 @@
+"""
+Calendar and hour-of-day dimensions for Scout ETL Pipeline
+Philippine calendar flags precomputed per date, joined to facts by integer key
+"""
+from functools import lru_cache
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from .config import Config, cfg, get_config
+
+# Regular and special non-working days fixed by law: (month, day, name, type)
+PH_FIXED_HOLIDAYS = [
+    (1, 1, "New Year's Day", 'regular'),
+    (2, 25, "EDSA People Power Revolution Anniversary", 'special'),
+    (4, 9, "Araw ng Kagitingan", 'regular'),
+    (5, 1, "Labor Day", 'regular'),
+    (6, 12, "Independence Day", 'regular'),
+    (8, 21, "Ninoy Aquino Day", 'special'),
+    (11, 1, "All Saints' Day", 'special'),
+    (11, 2, "All Souls' Day", 'special'),
+    (11, 30, "Bonifacio Day", 'regular'),
+    (12, 8, "Feast of the Immaculate Conception of Mary", 'special'),
+    (12, 24, "Christmas Eve", 'special'),
+    (12, 25, "Christmas Day", 'regular'),
+    (12, 30, "Rizal Day", 'regular'),
+    (12, 31, "Last Day of the Year", 'special'),
+]
+
+# Holy Week holidays relative to Easter Sunday: (offset days, name, type)
+PH_EASTER_HOLIDAYS = [
+    (-3, "Maundy Thursday", 'regular'),
+    (-2, "Good Friday", 'regular'),
+    (-1, "Black Saturday", 'special'),
+]
+
+SEASONS = {
+    12: 'Dry', 1: 'Dry', 2: 'Dry', 3: 'Hot Dry', 4: 'Hot Dry', 5: 'Hot Dry',
+    6: 'Wet', 7: 'Wet', 8: 'Wet', 9: 'Wet', 10: 'Wet', 11: 'Dry'
+}
+
+_EPOCH_DAY = np.datetime64('1970-01-01', 'D')
+_NS_PER_HOUR = 3_600_000_000_000
+
+def easter_sunday(year: int) -> pd.Timestamp:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return pd.Timestamp(year=year, month=month, day=day + 1)
+
+def last_proclaimed_year(config: Optional[Config] = None) -> Optional[int]:
+    """Latest year with proclaimed holidays in calendar.yaml (None if none are listed)"""
+    entries = ((config or cfg).calendar or {}).get('proclaimed') or []
+    return max((pd.Timestamp(entry['date']).year for entry in entries), default=None)
+
+def ph_holidays(start_year: int, end_year: int, config: Optional[Config] = None) -> pd.DataFrame:
+    """Philippine holidays for a year range (fixed, Holy Week, National Heroes Day, proclaimed)"""
+    rows = []
+    for year in range(start_year, end_year + 1):
+        for month, day, name, holiday_type in PH_FIXED_HOLIDAYS:
+            rows.append((pd.Timestamp(year=year, month=month, day=day), name, holiday_type))
+
+        easter = easter_sunday(year)
+        for offset, name, holiday_type in PH_EASTER_HOLIDAYS:
+            rows.append((easter + pd.Timedelta(days=offset), name, holiday_type))
+
+        # National Heroes Day: last Monday of August
+        august_end = pd.Timestamp(year=year, month=8, day=31)
+        rows.append((august_end - pd.Timedelta(days=august_end.weekday()),
+                     "National Heroes Day", 'regular'))
+
+    for entry in ((config or cfg).calendar or {}).get('proclaimed') or []:
+        date = pd.Timestamp(entry['date'])
+        if start_year <= date.year <= end_year:
+            rows.append((date, entry['name'], entry.get('type', 'special')))
+
+    holidays = pd.DataFrame(rows, columns=['date', 'holiday_name', 'holiday_type'])
+    # Several holidays can share a date (e.g. Araw ng Kagitingan in Holy Week)
+    holidays = holidays.sort_values('date', kind='stable')
+    return holidays.groupby('date', as_index=False).agg(
+        holiday_name=('holiday_name', ' / '.join),
+        holiday_type=('holiday_type', lambda t: 'regular' if (t == 'regular').any() else 'special'),
+    )
+
+def build_calendar(start_year: int, end_year: int,
+                   config: Optional[Config] = None) -> pd.DataFrame:
+    """One row per date with Philippine calendar flags, keyed by date_key (YYYYMMDD)"""
+    dates = pd.date_range(f"{start_year}-01-01", f"{end_year}-12-31", freq='D')
+    day = dates.day
+
+    calendar = pd.DataFrame({
+        'date_key': (dates.year * 10000 + dates.month * 100 + day).astype(np.int32),
+        'day_number': (dates.values.astype('datetime64[D]') - _EPOCH_DAY).astype(np.int64),
+        'date': dates,
+        'year': dates.year,
+        'quarter': dates.quarter,
+        'month': dates.month,
+        'day': day,
+        'day_of_week': dates.day_name(),
+        'is_weekend': dates.weekday >= 5,
+        'is_month_end': day >= 25,
+        'is_month_start': day <= 7,
+        'season': dates.month.map(SEASONS),
+        'is_holiday_season': dates.month.isin([11, 12, 1]),
+        'is_payday_period': ((day >= 13) & (day <= 17)) | ((day >= 28) & (day <= 31)),
+    })
+
+    holidays = ph_holidays(start_year, end_year, config)
+    calendar = calendar.merge(holidays, on='date', how='left')
+    calendar['is_holiday'] = calendar['holiday_name'].notna()
+    return calendar
+
+def build_hour_dimension() -> pd.DataFrame:
+    """One row per hour of day with shift and peak flags, keyed by hour_key"""
+    hours = pd.Series(np.arange(24, dtype=np.int32))
+    return pd.DataFrame({
+        'hour_key': hours,
+        'hour': hours,
+        'time_of_day': pd.cut(hours, bins=[0, 6, 12, 18, 24],
+                              labels=['Night', 'Morning', 'Afternoon', 'Evening']),
+        'is_peak_hour': hours.isin([11, 12, 13, 17, 18, 19]),  # Lunch & dinner
+        'is_business_hour': hours.between(9, 21),
+        'work_shift': pd.cut(hours, bins=[0, 6, 14, 22, 24],
+                             labels=['Night', 'Morning', 'Afternoon', 'Evening'],
+                             include_lowest=True),
+    })
+
+def get_calendar(start_year: int, end_year: int) -> pd.DataFrame:
+    """Cached calendar dimension for a year range"""
+    # Keyed by the live Config, so calendars are rebuilt after reload_config()
+    return _cached_calendar(get_config(), start_year, end_year)
+
+@lru_cache(maxsize=16)
+def _cached_calendar(config: Config, start_year: int, end_year: int) -> pd.DataFrame:
+    last_year = last_proclaimed_year(config)
+    if last_year is None or end_year > last_year:
+        first_missing = start_year if last_year is None else max(start_year, last_year + 1)
+        years = str(end_year) if first_missing == end_year else f"{first_missing}-{end_year}"
+        listed = f"calendar.yaml ends at {last_year}" if last_year else "calendar.yaml lists none"
+        print(f"⚠️ No proclaimed holidays for {years} ({listed}); "
+              f"lunar and moved holidays are not flagged")
+    return build_calendar(start_year, end_year, config)
+
+@lru_cache(maxsize=1)
+def get_hour_dimension() -> pd.DataFrame:
+    return build_hour_dimension()
+
+def _take(dim: pd.DataFrame, positions: np.ndarray, columns: List[str],
+          index: pd.Index, prefix: str) -> pd.DataFrame:
+    """Gather dimension columns by row position; unmatched rows get NaN (False for flags)"""
+    matched = positions >= 0
+    result = {}
+    for col in columns:
+        values = dim[col]
+        if pd.api.types.is_bool_dtype(values):
+            taken = np.where(matched, values.to_numpy()[np.where(matched, positions, 0)], False)
+        else:
+            taken = pd.api.extensions.take(values.array, positions, allow_fill=True)
+        result[f"{prefix}{col}"] = taken
+    return pd.DataFrame(result, index=index)
+
+def _local_datetime64(series: pd.Series) -> np.ndarray:
+    """datetime64[ns] values in local wall time (timezone dropped)"""
+    if getattr(series.dt, 'tz', None) is not None:
+        series = series.dt.tz_localize(None)
+    return series.to_numpy(dtype='datetime64[ns]')
+
+def calendar_columns(dates: pd.Series, columns: List[str], prefix: str = "") -> pd.DataFrame:
+    """Calendar attributes for each value of a datetime64 series (one lookup per row)"""
+    days = _local_datetime64(dates).astype('datetime64[D]')
+    valid = ~np.isnat(days)
+    if not valid.any():
+        return _take(get_calendar(1970, 1970), np.full(len(dates), -1), columns,
+                     dates.index, prefix)
+
+    start_year = int(days[valid].min().astype('datetime64[Y]').astype(int)) + 1970
+    end_year = int(days[valid].max().astype('datetime64[Y]').astype(int)) + 1970
+    calendar = get_calendar(start_year, end_year)
+
+    day_number = (days - _EPOCH_DAY).astype(np.int64)
+    positions = np.where(valid, day_number - calendar['day_number'].iat[0], -1)
+    return _take(calendar, positions, columns, dates.index, prefix)
+
+def hour_columns(timestamps: pd.Series, columns: List[str], prefix: str = "") -> pd.DataFrame:
+    """Hour-of-day attributes for each value of a datetime64 series (one lookup per row)"""
+    values = _local_datetime64(timestamps)
+    valid = ~np.isnat(values)
+    hours = (values.astype(np.int64) // _NS_PER_HOUR) % 24
+    positions = np.where(valid, hours, -1)
+    return _take(get_hour_dimension(), positions, columns, timestamps.index, prefix)
+
+def date_key(dates: pd.Series) -> pd.Series:
+    """Integer YYYYMMDD key for a datetime64 series (nullable Int32)"""
+    keys = calendar_columns(dates, ['date_key'])['date_key']
+    return keys.astype('Int32')
@@ -0,0 +1,211 @@
+"""
+Change detection for Scout ETL Pipeline
+Diff row content hashes against persisted fingerprints by key
+"""
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from .config import cfg
+from .log import ETLRun
+from .dataset import PartitionedDataset, partition_values
+from .util import row_content_hash, hashable_values
+
+ROW_HASH_COLUMN = '_row_hash'
+KEY_HASH_COLUMN = '_key_hash'
+
+# Table -> (key columns, columns carried with fingerprints so deletes can be
+# routed, e.g. to the gold dates they affect)
+CHANGE_KEYS = {
+    'stores': (['store_id'], []),
+    'devices': (['device_id'], []),
+    'interactions': (['interaction_key'], ['transaction_date']),
+    'transactions': (['transaction_key'], ['transaction_date']),
+    'daily_sales': (['date_key', 'store_id', 'brand', 'category', 'payment_method'],
+                    ['transaction_date']),
+}
+
+def key_hash(df: pd.DataFrame, key_columns: List[str]) -> pd.Series:
+    """64-bit hash of the key columns per row (nulls are ordinary key values)"""
+    normalized = pd.DataFrame({col: hashable_values(df[col]) for col in key_columns},
+                              index=df.index)
+    return pd.util.hash_pandas_object(normalized, index=False).rename(None)
+
+@dataclass
+class ChangeSet:
+    """Rows of one table classified against its previous fingerprints"""
+    table: str
+    key_columns: List[str]
+    inserts: pd.DataFrame
+    updates: pd.DataFrame
+    deletes: pd.DataFrame
+    unchanged: int = 0
+    fingerprints: pd.DataFrame = field(default=None, repr=False)
+
+    @property
+    def upserts(self) -> pd.DataFrame:
+        """Inserted and updated rows (what a loader has to write)"""
+        if self.updates.empty:
+            return self.inserts
+        if self.inserts.empty:
+            return self.updates
+        return pd.concat([self.inserts, self.updates])
+
+    def counts(self) -> Dict[str, int]:
+        return {"inserts": len(self.inserts), "updates": len(self.updates),
+                "deletes": len(self.deletes), "unchanged": self.unchanged}
+
+    def changed_partitions(self, column: str) -> List[str]:
+        """Partition labels of `column` touched by any insert, update or delete"""
+        values = [partition_values(df[column]) for df in (self.inserts, self.updates, self.deletes)
+                  if column in df.columns and len(df)]
+        return sorted(set().union(*[set(v.unique()) for v in values])) if values else []
+
+    def fingerprint(self) -> str:
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(self.table.encode())
+        if self.fingerprints is not None:
+            hasher.update(pd.util.hash_pandas_object(
+                self.fingerprints[[KEY_HASH_COLUMN, ROW_HASH_COLUMN]], index=False
+            ).values.tobytes())
+        hasher.update(str(self.counts()).encode())
+        return hasher.hexdigest()
+
+def diff_by_key(df: pd.DataFrame, previous: pd.DataFrame, table: str,
+                key_columns: List[str], carry: Sequence[str] = (),
+                scope: Optional[Tuple[str, List[str]]] = None) -> ChangeSet:
+    """Classify rows of `df` as inserts, updates or unchanged against `previous`
+
+    `previous` holds the fingerprints of the last committed state. `df` is
+    taken as the complete table, or with `scope=(column, labels)` as
+    complete for those partition labels of a carried column only; keys
+    missing from that snapshot are deletes. A key shared by several rows
+    (interaction line items share their `interaction_key`) is fingerprinted
+    by a hash combined over all of its rows, and every row of a new or
+    changed key is returned, so loaders can replace the key's rows as a whole.
+    """
+    carry = [c for c in carry if c in df.columns]
+    if df.empty:
+        df = df.assign(**{KEY_HASH_COLUMN: pd.Series(dtype='uint64'),
+                          ROW_HASH_COLUMN: pd.Series(dtype='uint64')})
+        keyed = df
+    else:
+        row_hashes = df[ROW_HASH_COLUMN] if ROW_HASH_COLUMN in df.columns else row_content_hash(df)
+        key_hashes = key_hash(df, key_columns).to_numpy()
+        row_hashes = row_hashes.to_numpy(dtype='uint64')
+        duplicated = pd.Series(key_hashes).duplicated(keep='last').to_numpy()
+        if duplicated.any():
+            # A key's hash covers all of its rows, so a change to any of them is seen
+            codes, uniques = pd.factorize(key_hashes)
+            combined = np.zeros(len(uniques), dtype='uint64')
+            np.add.at(combined, codes, row_hashes)
+            row_hashes = combined[codes]
+        df = df.assign(**{KEY_HASH_COLUMN: key_hashes, ROW_HASH_COLUMN: row_hashes})
+        keyed = df[~duplicated] if duplicated.any() else df
+
+    current_hashes = df[KEY_HASH_COLUMN].to_numpy(dtype='uint64')
+    if previous.empty:
+        previous = pd.DataFrame({KEY_HASH_COLUMN: pd.Series(dtype='uint64'),
+                                 ROW_HASH_COLUMN: pd.Series(dtype='uint64')})
+    previous_keys = pd.Index(previous[KEY_HASH_COLUMN].to_numpy(dtype='uint64'))
+    positions = previous_keys.get_indexer(current_hashes)
+
+    is_new = positions < 0
+    previous_rows = previous[ROW_HASH_COLUMN].to_numpy(dtype='uint64')
+    matched_rows = previous_rows[np.where(is_new, 0, positions)] if len(previous_rows) else \
+        np.zeros(len(positions), dtype='uint64')
+    is_changed = ~is_new & (matched_rows != df[ROW_HASH_COLUMN].to_numpy(dtype='uint64'))
+
+    in_scope = np.ones(len(previous), dtype=bool)
+    if scope is not None:
+        column, labels = scope
+        if column in previous.columns:
+            in_scope = partition_values(previous[column]).isin(labels).to_numpy()
+    gone = in_scope & ~previous_keys.isin(current_hashes)
+    deletes = previous[gone].drop(columns=[ROW_HASH_COLUMN]).reset_index(drop=True)
+
+    # One fingerprint per key
+    fingerprint_columns = key_columns + carry + [KEY_HASH_COLUMN, ROW_HASH_COLUMN]
+    current = keyed.reindex(columns=fingerprint_columns)
+    kept = previous[~in_scope & ~previous_keys.isin(current_hashes)]
+    fingerprints = pd.concat([kept, current], ignore_index=True) if len(kept) else \
+        current.reset_index(drop=True)
+
+    return ChangeSet(
+        table=table,
+        key_columns=key_columns,
+        inserts=df[is_new].drop(columns=[KEY_HASH_COLUMN]),
+        updates=df[is_changed].drop(columns=[KEY_HASH_COLUMN]),
+        deletes=deletes,
+        unchanged=int((~is_new & ~is_changed).sum()),
+        fingerprints=fingerprints,
+    )
+
+class ChangeTracker:
+    """Persisted per-table fingerprints: <root>/<table>/part.parquet
+
+    `diff` compares a table against the last committed fingerprints;
+    `commit` records a ChangeSet's state once its changes were applied
+    downstream, so a failed load is detected again on the next run.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        self.root = Path(root or cfg.fingerprint_dir)
+
+    def _dataset(self, table: str) -> PartitionedDataset:
+        return PartitionedDataset(self.root, table)
+
+    def previous(self, table: str) -> pd.DataFrame:
+        return self._dataset(table).read()
+
+    def diff(self, table: str, df: pd.DataFrame,
+             key_columns: Optional[List[str]] = None, carry: Optional[List[str]] = None,
+             scope: Optional[Tuple[str, List[str]]] = None) -> ChangeSet:
+        default_keys, default_carry = CHANGE_KEYS.get(table, ([], []))
+        key_columns = key_columns or default_keys
+        if not key_columns:
+            raise ValueError(f"No key columns known for {table}")
+        return diff_by_key(df, self.previous(table), table, key_columns,
+                           carry if carry is not None else default_carry, scope)
+
+    def commit(self, changes: ChangeSet) -> None:
+        self._dataset(changes.table).write(changes.fingerprints)
+
+def detect_changes(frames: Dict[str, Any], run: ETLRun, tracker: ChangeTracker,
+                   scopes: Optional[Dict[str, Tuple[str, List[str]]]] = None) -> Dict[str, ChangeSet]:
+    """Diff every known table in `frames` and log insert/update/delete counts"""
+    start_time = pd.Timestamp.now()
+    changes = {}
+    try:
+        for name, df in frames.items():
+            if name not in CHANGE_KEYS or not isinstance(df, pd.DataFrame):
+                continue
+            key_columns = CHANGE_KEYS[name][0]
+            if not df.empty and any(k not in df.columns for k in key_columns):
+                continue
+            changes[name] = tracker.diff(name, df, scope=(scopes or {}).get(name))
+            for kind, count in changes[name].counts().items():
+                run.log_metric(f"{name}_rows_{kind}", count)
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("detect_changes", "success",
+                    duration_ms=duration_ms,
+                    tables=len(changes),
+                    changed_rows=sum(len(c.inserts) + len(c.updates) + len(c.deletes)
+                                     for c in changes.values()))
+        return changes
+
+    except Exception as e:
+        run.log_error("detect_changes", str(e))
+        raise
+
+def commit_changes(changes: Dict[str, ChangeSet], tracker: ChangeTracker, run: ETLRun) -> Dict[str, int]:
+    """Persist the fingerprints of applied change sets; returns rows tracked per table"""
+    tracked = {}
+    for name, change_set in changes.items():
+        tracker.commit(change_set)
+        tracked[name] = len(change_set.fingerprints)
+    run.log_step("commit_changes", "success", tables=len(tracked), rows_tracked=sum(tracked.values()))
+    return tracked
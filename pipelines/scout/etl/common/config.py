@@ -2,19 +2,24 @@
 Configuration management for Scout ETL Pipeline
 Handles environment variables and feature flags
 """
+import copy
 import os
-import yaml
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Dict, Any, Optional
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 class Config:
-    """Configuration manager for Scout ETL"""
+    """Configuration manager for Scout ETL
+
+    Environment variables are read when the instance is built; each YAML
+    file is parsed on first access to its attribute.
+    """
 
     def __init__(self):
+        # Load environment variables
+        from dotenv import load_dotenv
+        load_dotenv()
+
         self.base_path = Path(__file__).parent.parent
         self.configs_path = self.base_path.parent / "configs"
 
@@ -27,6 +32,10 @@ class Config:
         self.supabase_anon_key = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
         self.supabase_service_role = os.getenv("SUPABASE_SERVICE_ROLE")
 
+        # Postgres load target (Supabase direct connection or a local container)
+        self.postgres_url = os.getenv("POSTGRES_URL")
+        self.load_max_connections = int(os.getenv("LOAD_MAX_CONNECTIONS", "4"))
+
         # Azure SQL configuration
         self.azure_sql_url = os.getenv("AZURE_SQL_URL")
         self.azure_sql_user = os.getenv("AZURE_SQL_USER")
@@ -39,29 +48,80 @@ class Config:
         # Processing configuration
         self.batch_size = int(os.getenv("BATCH_SIZE", "5000"))
         self.max_workers = int(os.getenv("MAX_WORKERS", "4"))
-
-        # Load YAML configurations
-        self._load_configs()
-
-    def _load_configs(self):
-        """Load YAML configuration files"""
+        self.bronze_chunk_rows = int(os.getenv("BRONZE_CHUNK_ROWS", "250000"))
+        self.bronze_parallel_min_rows = int(os.getenv("BRONZE_PARALLEL_MIN_ROWS", "200000"))
+        self.enrich_parallel_min_rows = int(os.getenv("ENRICH_PARALLEL_MIN_ROWS", "200000"))
+        self.checkpoint_dir = os.getenv("CHECKPOINT_DIR", ".checkpoints")
+        self.silver_dataset_dir = os.getenv("SILVER_DATASET_DIR", "data/silver")
+        self.gold_dataset_dir = os.getenv("GOLD_DATASET_DIR", "data/gold")
+        self.fingerprint_dir = os.getenv("FINGERPRINT_DIR", "data/fingerprints")
+        self.key_index_dir = os.getenv("KEY_INDEX_DIR", "data/state/keys")
+        self.key_index_fp_rate = float(os.getenv("KEY_INDEX_FP_RATE", "0.01"))
+        self.validation_state_path = os.getenv(
+            "VALIDATION_STATE_PATH", "data/state/validation_counts.json"
+        )
+        self.spill_dir = os.getenv("SPILL_DIR", ".spill")
+        self.memory_budget_mb = int(os.getenv("MEMORY_BUDGET_MB", "1024"))
+        self.optimize_dtypes = os.getenv("OPTIMIZE_DTYPES", "true").lower() == "true"
+        self.customer_state_dir = os.getenv("CUSTOMER_STATE_DIR", "data/state/customers")
+        self.approx_distinct = os.getenv("APPROX_DISTINCT", "false").lower() == "true"
+        self.hll_precision = int(os.getenv("HLL_PRECISION", "12"))
+        self.hll_group_precision = int(os.getenv("HLL_GROUP_PRECISION", "10"))
+        self.quantile_sketch_k = int(os.getenv("QUANTILE_SKETCH_K", "200"))
+        self.spatial_cell_deg = float(os.getenv("SPATIAL_CELL_DEG", "0.05"))
+        self.geo_hex_size_km = float(os.getenv("GEO_HEX_SIZE_KM", "2.0"))
+        self.category_dictionary_path = os.getenv(
+            "CATEGORY_DICTIONARY_PATH", "data/dictionaries/categories.json"
+        )
+
+        # Logging configuration
+        self.log_sinks = os.getenv("LOG_SINKS", "stdout")
+        self.log_file = os.getenv("LOG_FILE", "logs/scout_etl.ndjson")
+        self.log_table = os.getenv("LOG_TABLE", "scout_etl_logs")
+        self.log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+        # Metrics export (prometheus textfile or otlp json)
+        self.metrics_export_path = os.getenv("METRICS_EXPORT_PATH")
+        self.metrics_export_format = os.getenv("METRICS_EXPORT_FORMAT", "prometheus")
+
+    @cached_property
+    def tables(self) -> Dict[str, Any]:
+        """Table mappings"""
+        return self._load_yaml("tables.yaml")
+
+    @cached_property
+    def dims(self) -> Dict[str, Any]:
+        """Dimension configurations"""
+        return self._load_yaml("dims.yaml")
+
+    @cached_property
+    def features(self) -> Dict[str, Any]:
+        """Feature flags"""
+        return self._load_yaml("features.yaml")
+
+    @cached_property
+    def bronze_specs(self) -> Dict[str, Any]:
+        """Per-source bronze normalization specs"""
+        return self._load_yaml("bronze.yaml")
+
+    @cached_property
+    def calendar(self) -> Dict[str, Any]:
+        """Proclaimed holidays for the calendar dimension"""
+        return self._load_yaml("calendar.yaml")
+
+    @cached_property
+    def validation_rules(self) -> Dict[str, Any]:
+        """Declarative data quality rules per layer and table"""
+        return self._load_yaml("validation.yaml")
+
+    def _load_yaml(self, file_name: str) -> Dict[str, Any]:
+        """Load a single optional YAML config file"""
+        path = self.configs_path / file_name
         try:
-            # Load table mappings
-            with open(self.configs_path / "tables.yaml", 'r') as f:
-                self.tables = yaml.safe_load(f)
-
-            # Load dimension configurations
-            with open(self.configs_path / "dims.yaml", 'r') as f:
-                self.dims = yaml.safe_load(f)
-
-            # Load feature flags
-            with open(self.configs_path / "features.yaml", 'r') as f:
-                self.features = yaml.safe_load(f)
+            return copy.deepcopy(_parse_yaml(str(path), path.stat().st_mtime_ns))
         except FileNotFoundError as e:
             print(f"Warning: Configuration file not found: {e}")
-            self.tables = {}
-            self.dims = {}
-            self.features = {}
+            return {}
 
     def validate_supabase_config(self, require_service_role: bool = False) -> bool:
         """Validate Supabase configuration"""
@@ -73,6 +133,10 @@ class Config:
 
         return True
 
+    def validate_postgres_config(self) -> bool:
+        """Validate Postgres load target configuration"""
+        return bool(self.postgres_url)
+
     def validate_azure_config(self) -> bool:
         """Validate Azure SQL configuration"""
         return all([
@@ -93,5 +157,35 @@ class Config:
         """Check if running in production environment"""
         return self.environment.lower() == "production"
 
-# Global configuration instance
-cfg = Config()
\ No newline at end of file
+@lru_cache(maxsize=32)
+def _parse_yaml(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parsed YAML file, cached until the file changes"""
+    import yaml
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """The process-wide configuration, built on first use"""
+    return Config()
+
+def reload_config() -> Config:
+    """Rebuild the configuration (e.g. after the environment changed)"""
+    get_config.cache_clear()
+    return get_config()
+
+class _LazyConfig:
+    """Stand-in for the global Config that builds it on first attribute access"""
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_config(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_config(), name, value)
+
+    def __repr__(self) -> str:
+        return f"<lazy {get_config()!r}>"
+
+# Global configuration instance (importing this module reads nothing)
+cfg = _LazyConfig()
\ No newline at end of file
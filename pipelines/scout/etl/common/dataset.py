@@ -0,0 +1,134 @@
+"""
+Partitioned dataset storage for Scout ETL Pipeline
+Parquet files partitioned by a key column, with a small JSON metadata sidecar
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+NULL_PARTITION = "__null__"
+
+def partition_values(series: pd.Series) -> pd.Series:
+    """Map a column to partition labels (ISO dates for datetime columns)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Format the distinct days only, then broadcast back by code
+        codes, uniques = pd.factorize(series.dt.normalize())
+        labels = np.array(pd.Index(uniques).strftime('%Y-%m-%d').tolist() + [NULL_PARTITION],
+                          dtype=object)
+        return pd.Series(labels[codes], index=series.index)
+    return series.astype(str).where(series.notna(), NULL_PARTITION)
+
+class PartitionedDataset:
+    """A table stored as <root>/<name>/<partition_col>=<value>/part.parquet
+
+    Unpartitioned tables (partition_col=None) are a single part.parquet.
+    Writes are atomic per partition.
+    """
+
+    def __init__(self, root: Union[str, Path], name: str, partition_col: Optional[str] = None):
+        self.root = Path(root)
+        self.name = name
+        self.partition_col = partition_col
+        self.path = self.root / name
+
+    def _partition_path(self, value: Optional[str]) -> Path:
+        if self.partition_col is None:
+            return self.path / "part.parquet"
+        return self.path / f"{self.partition_col}={value}" / "part.parquet"
+
+    def partitions(self) -> List[str]:
+        """List stored partition values"""
+        if self.partition_col is None or not self.path.exists():
+            return []
+        prefix = f"{self.partition_col}="
+        return sorted(p.name[len(prefix):] for p in self.path.iterdir()
+                      if p.is_dir() and p.name.startswith(prefix))
+
+    def exists(self, value: Optional[str] = None) -> bool:
+        return self._partition_path(value).exists()
+
+    def read_partition(self, value: Optional[str] = None,
+                       columns: Optional[List[str]] = None) -> pd.DataFrame:
+        path = self._partition_path(value)
+        if not path.exists():
+            return pd.DataFrame()
+        return pd.read_parquet(path, columns=columns)
+
+    def read(self, partitions: Optional[List[str]] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read selected partitions (all by default) into one frame"""
+        if self.partition_col is None:
+            return self.read_partition(None, columns)
+        values = self.partitions() if partitions is None else partitions
+        frames = [self.read_partition(v, columns) for v in values if self.exists(v)]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_partitions(self, columns: Optional[List[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        for value in self.partitions():
+            yield value, self.read_partition(value, columns)
+
+    def write_partition(self, value: Optional[str], df: pd.DataFrame) -> None:
+        """Atomically replace one partition (an empty frame deletes it)"""
+        path = self._partition_path(value)
+        if df.empty:
+            self.delete_partition(value)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def write(self, df: pd.DataFrame) -> List[str]:
+        """Replace every partition present in `df`; returns the partitions written"""
+        if self.partition_col is None:
+            self.write_partition(None, df.reset_index(drop=True))
+            return []
+        written = []
+        labels = partition_values(df[self.partition_col])
+        for value, part in df.groupby(labels, sort=True, observed=True):
+            self.write_partition(value, part.reset_index(drop=True))
+            written.append(value)
+        return written
+
+    def delete_partition(self, value: Optional[str]) -> None:
+        path = self._partition_path(value)
+        if path.exists():
+            path.unlink()
+        if self.partition_col is not None and path.parent.exists() and not any(path.parent.iterdir()):
+            path.parent.rmdir()
+
+    def drop(self) -> None:
+        if self.path.exists():
+            shutil.rmtree(self.path)
+
+    # Metadata sidecar
+
+    def _meta_path(self) -> Path:
+        return self.path / "_meta.json"
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        path = self._meta_path()
+        if not path.exists():
+            return default
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(key, default)
+
+    def set_meta(self, key: str, value: Any) -> None:
+        path = self._meta_path()
+        meta: Dict[str, Any] = {}
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        meta[key] = value
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, path)
@@ -0,0 +1,97 @@
+"""
+Datetime parsing for Scout ETL Pipeline
+Format detection cached per source column, parsing of distinct values only
+"""
+import threading
+from typing import Any, Dict, Hashable, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+class DatetimeParser:
+    """Parse string columns to datetime64 with a per-column format cache
+
+    Semantics match `pd.to_datetime(series, errors='coerce')`: the format is
+    inferred from the first non-null value and values that do not match it
+    become NaT. The inferred format is cached under `key` (e.g.
+    ``("sales", "transaction_date")``) so later chunks and runs skip
+    inference, and only distinct values are parsed. When a cached format
+    leaves non-blank values unparsed, the format is inferred again from
+    those values, which are re-parsed, and the cache is updated.
+    """
+
+    def __init__(self):
+        self._formats: Dict[Hashable, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0, "reinferred": 0}
+
+    def parse(self, series: pd.Series, key: Optional[Hashable] = None) -> pd.Series:
+        """Return `series` as datetime64, parsing each distinct value once"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            self.stats["skipped"] += 1
+            return series
+
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            return pd.to_datetime(series, errors='coerce')
+
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        if len(uniques) == 0:
+            return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]', name=series.name)
+
+        if key is not None and key in self._formats:
+            self.stats["hits"] += 1
+            parsed = _parse_values(uniques, self._formats[key])
+            unparsed = np.asarray(parsed.isna()) & _has_text(uniques)
+            if unparsed.any():
+                # The cached format no longer fits (e.g. the source changed its layout)
+                self.stats["reinferred"] += 1
+                retry_values = uniques[unparsed]
+                fmt = self._infer_format(key, retry_values)
+                values = parsed.to_numpy(copy=True)
+                values[unparsed] = _parse_values(retry_values, fmt).to_numpy()
+                parsed = pd.DatetimeIndex(values)
+        else:
+            self.stats["misses"] += 1
+            parsed = _parse_values(uniques, self._infer_format(key, uniques))
+
+        values = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+        return pd.Series(values, index=series.index, name=series.name)
+
+    def _infer_format(self, key: Optional[Hashable], uniques: Any) -> Optional[str]:
+        first = next((str(u) for u in uniques if isinstance(u, str) and u.strip()), None)
+        fmt = guess_datetime_format(first) if first is not None else None
+
+        if key is not None and fmt is not None:
+            with self._lock:
+                self._formats[key] = fmt
+        return fmt
+
+    def cached_format(self, key: Hashable) -> Optional[str]:
+        return self._formats.get(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._formats.clear()
+
+def _parse_values(values: Any, fmt: Optional[str]) -> pd.DatetimeIndex:
+    if fmt is not None:
+        return pd.DatetimeIndex(pd.to_datetime(values, format=fmt, errors='coerce'))
+    return pd.DatetimeIndex(pd.to_datetime(values, errors='coerce'))
+
+def _has_text(values: Any) -> np.ndarray:
+    """Mask of values that should parse to a timestamp (non-blank)"""
+    return np.fromiter((not isinstance(v, str) or bool(v.strip()) for v in values),
+                       dtype=bool, count=len(values))
+
+_default_parser = DatetimeParser()
+
+def parse_datetimes(series: pd.Series, key: Optional[Hashable] = None) -> pd.Series:
+    """Parse a column to datetime64 using the shared format cache"""
+    return _default_parser.parse(series, key)
+
+def get_datetime_parser() -> DatetimeParser:
+    return _default_parser
@@ -0,0 +1,219 @@
+"""
+Dtype planning for Scout ETL Pipeline
+Downcast numerics and encode low-cardinality strings with shared category dictionaries
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+# Float columns that hold integer semantics (ids, counts, calendar parts)
+INTEGER_HINT_COLUMNS = {'quantity', 'year', 'month', 'quarter', 'hour', 'date_key'}
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+_NULLABLE_INT_TYPES = {np.int8: 'Int8', np.int16: 'Int16', np.int32: 'Int32', np.int64: 'Int64'}
+
+@dataclass
+class ColumnProfile:
+    """Profiling stats used to choose a column's storage type"""
+    name: str
+    dtype: str
+    null_count: int
+    unique_count: Optional[int] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    integral: bool = False
+
+def profile_frame(df: pd.DataFrame) -> Dict[str, ColumnProfile]:
+    """Collect per-column stats needed by the dtype planner"""
+    profiles = {}
+    for col in df.columns:
+        series = df[col]
+        profile = ColumnProfile(name=col, dtype=str(series.dtype),
+                                null_count=int(series.isna().sum()))
+
+        if pd.api.types.is_bool_dtype(series):
+            pass
+        elif pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(series):
+            values = series.dropna().to_numpy()
+            if len(values):
+                profile.min_value = float(values.min())
+                profile.max_value = float(values.max())
+                profile.integral = bool(pd.api.types.is_integer_dtype(series)
+                                        or np.all(np.mod(values, 1) == 0))
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            profile.unique_count = int(series.nunique(dropna=True))
+
+        profiles[col] = profile
+    return profiles
+
+def _smallest_int(min_value: float, max_value: float):
+    for int_type in _INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= min_value and max_value <= info.max:
+            return int_type
+    return None
+
+class CategoryDictionary:
+    """Append-only category lists per column, shared across chunks and runs
+
+    Codes never change once assigned, so frames encoded at different times
+    concatenate (after `align_categories`) and write to Parquet without
+    re-encoding.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self._categories: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._categories = json.load(f)
+
+    def categories(self, column: str) -> List[Any]:
+        return list(self._categories.get(column, []))
+
+    def extend(self, column: str, values: Any) -> List[Any]:
+        """Append unseen values (in first-seen order) and return the full list"""
+        with self._lock:
+            current = self._categories.setdefault(column, [])
+            known = set(current)
+            new_values = [v for v in pd.unique(pd.Series(values).dropna()) if v not in known]
+            if new_values:
+                current.extend(new_values)
+                self._dirty = True
+            return list(current)
+
+    def encode(self, series: pd.Series) -> pd.Series:
+        """Encode a column as categorical using the shared dictionary"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = self.extend(series.name, series.cat.categories)
+            return series.cat.set_categories(categories)
+        categories = self.extend(series.name, series.unique())
+        return pd.Series(pd.Categorical(series, categories=categories),
+                         index=series.index, name=series.name)
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._categories, f, default=str)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+_default_dictionary: Optional[CategoryDictionary] = None
+_dictionary_lock = threading.Lock()
+
+def get_category_dictionary() -> CategoryDictionary:
+    """Process-wide category dictionary persisted at cfg.category_dictionary_path"""
+    global _default_dictionary
+    if _default_dictionary is None:
+        with _dictionary_lock:
+            if _default_dictionary is None:
+                from .config import cfg
+                _default_dictionary = CategoryDictionary(cfg.category_dictionary_path)
+    return _default_dictionary
+
+def plan_dtypes(profiles: Dict[str, ColumnProfile], row_count: int,
+                max_categories: int = 1000, max_category_ratio: float = 0.5) -> Dict[str, Any]:
+    """Choose the smallest safe storage type per column; returns {column: dtype}"""
+    plan: Dict[str, Any] = {}
+    for col, profile in profiles.items():
+        if profile.min_value is not None and profile.integral:
+            is_int = profile.dtype.startswith('int')
+            if not is_int and not (col.endswith('_id') or col in INTEGER_HINT_COLUMNS):
+                continue
+            int_type = _smallest_int(profile.min_value, profile.max_value)
+            if int_type is None:
+                continue
+            if is_int:
+                if np.dtype(int_type) != np.dtype(profile.dtype):
+                    plan[col] = int_type
+            elif profile.null_count:
+                plan[col] = _NULLABLE_INT_TYPES[int_type]
+            else:
+                plan[col] = int_type
+
+        elif profile.unique_count is not None and row_count and not col.endswith('_id'):
+            # Identifier columns stay as-is: their cardinality grows without bound
+            if (profile.unique_count <= max_categories
+                    and profile.unique_count / row_count <= max_category_ratio):
+                plan[col] = 'category'
+    return plan
+
+def apply_dtype_plan(df: pd.DataFrame, plan: Dict[str, Any],
+                     dictionary: Optional[CategoryDictionary] = None) -> pd.DataFrame:
+    """Convert columns according to a plan, using shared dictionaries for categoricals"""
+    if not plan:
+        return df
+    dictionary = dictionary or get_category_dictionary()
+    df = df.copy(deep=False)
+    for col, dtype in plan.items():
+        if dtype == 'category':
+            df[col] = dictionary.encode(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def optimize_dtypes(df: pd.DataFrame, run: Any = None, stage: str = "",
+                    dictionary: Optional[CategoryDictionary] = None,
+                    exclude: Optional[List[str]] = None) -> pd.DataFrame:
+    """Profile, plan and apply compact dtypes; reports memory saved for the stage"""
+    if df.empty:
+        return df
+
+    dictionary = dictionary or get_category_dictionary()
+    bytes_before = int(df.memory_usage(deep=True).sum())
+
+    candidates = [c for c in df.columns if not c.startswith('_') and c not in (exclude or [])]
+    plan = plan_dtypes(profile_frame(df[candidates]), len(df))
+    df = apply_dtype_plan(df, plan, dictionary)
+    dictionary.save()
+
+    bytes_after = int(df.memory_usage(deep=True).sum())
+    if run is not None:
+        run.log_step(f"optimize_dtypes_{stage}", "success",
+                    columns_converted=len(plan),
+                    bytes_before=bytes_before,
+                    bytes_after=bytes_after)
+        run.log_metric(f"{stage}_memory_saved_bytes", bytes_before - bytes_after)
+
+    return df
+
+def align_categories(frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """Give same-named categorical columns identical categories before concat"""
+    frames = [f for f in frames if f is not None]
+    categorical_cols = {
+        col for f in frames for col in f.columns
+        if isinstance(f[col].dtype, pd.CategoricalDtype)
+    }
+    if not categorical_cols:
+        return frames
+
+    dictionary = get_category_dictionary()
+    aligned = []
+    for frame in frames:
+        frame = frame.copy(deep=False)
+        for col in categorical_cols:
+            if col in frame.columns:
+                frame[col] = dictionary.encode(frame[col])
+        aligned.append(frame)
+
+    # Frames encoded earlier may hold a shorter prefix of the dictionary
+    for frame in aligned:
+        for col in categorical_cols:
+            if col in frame.columns:
+                frame[col] = frame[col].cat.set_categories(dictionary.categories(col))
+    return aligned
+
+def concat_aligned(frames: List[pd.DataFrame], **kwargs) -> pd.DataFrame:
+    """pd.concat that keeps shared-dictionary categoricals categorical"""
+    return pd.concat(align_categories(frames), **kwargs)
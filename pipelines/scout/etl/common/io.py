@@ -8,6 +8,7 @@ import csv
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Union, Iterator
 from io import StringIO
+from .datetimes import parse_datetimes
 
 def read_csv(file_path: Union[str, Path], **kwargs) -> pd.DataFrame:
     """Read CSV file with robust error handling"""
@@ -86,8 +87,13 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
 
 def infer_datatypes(df: pd.DataFrame,
                    numeric_cols: Optional[List[str]] = None,
-                   date_cols: Optional[List[str]] = None) -> pd.DataFrame:
-    """Infer and convert data types"""
+                   date_cols: Optional[List[str]] = None,
+                   source_name: Optional[str] = None) -> pd.DataFrame:
+    """Infer and convert data types
+
+    Date formats are cached per `source_name` and column, so sources that
+    share a column name do not share its format.
+    """
     df = df.copy()
 
     # Convert numeric columns
@@ -100,7 +106,7 @@ def infer_datatypes(df: pd.DataFrame,
     if date_cols:
         for col in date_cols:
             if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+                df[col] = parse_datetimes(df[col], key=(source_name or 'infer_datatypes', col))
 
     # Auto-infer numeric columns (if not specified)
     if not numeric_cols:
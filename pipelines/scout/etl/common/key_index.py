@@ -0,0 +1,331 @@
+"""
+Persistent key index for Scout ETL Pipeline
+Bloom filter plus sorted memory-mapped key runs for cross-run deduplication
+"""
+import json
+import math
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from .config import cfg
+from .log import ETLRun
+from .util import create_surrogate_key, hashable_values, row_content_hash
+
+# Index name -> column holding its keys
+LOADED_KEY_COLUMNS = {
+    'transaction_id': 'transaction_id',
+    'interaction_key': 'interaction_key',
+}
+
+# Columns of silver's interaction_key: the line items sharing them are
+# conformed and replaced together
+INTERACTION_KEY_COLUMNS = ['transaction_id', 'store_id', 'device_id']
+
+# Index of the content fingerprints of loaded interactions
+CONTENT_INDEX = 'interaction_content'
+
+MIN_CAPACITY = 1 << 16
+
+def key_hashes(keys: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """(64-bit hash per non-null key, positions of those keys)
+
+    Keys are normalized like change-detection keys, so 1 and 1.0 match
+    but 1 and '1' do not.
+    """
+    series = keys if isinstance(keys, pd.Series) else pd.Series(keys)
+    values = hashable_values(series.reset_index(drop=True))
+    valid = np.flatnonzero(values.notna().to_numpy())
+    if len(valid) == 0:
+        return np.empty(0, dtype=np.uint64), valid
+    hashes = pd.util.hash_pandas_object(values.iloc[valid], index=False).to_numpy(dtype=np.uint64)
+    return hashes, valid
+
+def bloom_parameters(capacity: int, fp_rate: float) -> Tuple[int, int]:
+    """(bits, hash functions) of a Bloom filter for `capacity` keys at `fp_rate`"""
+    bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    bits = max(64, (bits + 63) // 64 * 64)
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+class KeyIndex:
+    """Persistent set of key hashes: a Bloom filter over sorted key runs
+
+    Layout: <root>/<name>/bloom.npy (uint64 words), run-<seq>.npy (sorted,
+    unique uint64 key hashes, memory-mapped on lookup) and meta.json.
+    Lookups test the Bloom filter first and binary-search the runs only
+    for its positives. Each `add` writes one run; runs are merged into one
+    once there are more than `max_runs`, and the filter is resized when
+    the key count outgrows the capacity it was sized for. Keys are
+    compared by 64-bit hash, so distinct keys collide with negligible
+    probability (about n^2 / 2^65 for n keys).
+    """
+
+    def __init__(self, name: str, root: Optional[Union[str, Path]] = None,
+                 fp_rate: Optional[float] = None, max_runs: int = 8):
+        self.name = name
+        self.path = Path(root or cfg.key_index_dir) / name
+        self.fp_rate = fp_rate or cfg.key_index_fp_rate
+        self.max_runs = max_runs
+        self._meta = self._read_meta()
+        self._bloom: Optional[np.ndarray] = None
+
+    # Persistence
+
+    def _read_meta(self) -> Dict[str, Any]:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            bits, hashes = bloom_parameters(MIN_CAPACITY, self.fp_rate)
+            return {"count": 0, "capacity": MIN_CAPACITY, "bits": bits, "hashes": hashes,
+                    "runs": [], "next_run": 1}
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_array(self, file_name: str, values: np.ndarray) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / f".{file_name}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, self.path / file_name)
+
+    def _write_meta(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / ".meta.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self.path / "meta.json")
+
+    def _runs(self) -> List[np.ndarray]:
+        return [np.load(self.path / run, mmap_mode='r') for run in self._meta["runs"]]
+
+    def _bloom_words(self) -> np.ndarray:
+        if self._bloom is None:
+            bloom_path = self.path / "bloom.npy"
+            self._bloom = np.load(bloom_path) if bloom_path.exists() else \
+                np.zeros(self._meta["bits"] // 64, dtype=np.uint64)
+        return self._bloom
+
+    def __len__(self) -> int:
+        return int(self._meta["count"])
+
+    # Bloom filter
+
+    def _bit_positions(self, hashes: np.ndarray) -> np.ndarray:
+        """Double hashing: k bit positions per key from the two 32-bit halves"""
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rounds = np.arange(self._meta["hashes"], dtype=np.uint64)
+        return (h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(self._meta["bits"])
+
+    def _set_bits(self, bloom: np.ndarray, hashes: np.ndarray) -> None:
+        positions = self._bit_positions(hashes).ravel()
+        np.bitwise_or.at(bloom, (positions >> np.uint64(6)).astype(np.int64),
+                         np.uint64(1) << (positions & np.uint64(63)))
+
+    def _might_contain(self, hashes: np.ndarray) -> np.ndarray:
+        bloom = self._bloom_words()
+        positions = self._bit_positions(hashes)
+        words = bloom[(positions >> np.uint64(6)).astype(np.int64)]
+        return ((words >> (positions & np.uint64(63))) & np.uint64(1)).all(axis=1)
+
+    # Lookups
+
+    def _contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        if len(hashes) == 0 or not self._meta["runs"]:
+            return found
+        candidates = np.flatnonzero(self._might_contain(hashes))
+        for run in self._runs():
+            pending = candidates[~found[candidates]]
+            if len(pending) == 0:
+                break
+            positions = np.searchsorted(run, hashes[pending])
+            inside = positions < len(run)
+            hit = np.zeros(len(pending), dtype=bool)
+            hit[inside] = run[positions[inside]] == hashes[pending[inside]]
+            found[pending[hit]] = True
+        return found
+
+    def contains(self, keys: Any) -> np.ndarray:
+        """Whether each key is in the index (nulls never are)"""
+        series = keys if isinstance(keys, pd.Series) else pd.Series(keys)
+        hashes, valid = key_hashes(series)
+        found = np.zeros(len(series), dtype=bool)
+        found[valid] = self._contains_hashes(hashes)
+        return found
+
+    # Updates
+
+    def add(self, keys: Any) -> int:
+        """Add keys; returns how many were new"""
+        hashes, _ = key_hashes(keys)
+        hashes = np.unique(hashes)
+        new = hashes[~self._contains_hashes(hashes)]
+        if len(new) == 0:
+            return 0
+
+        run_name = f"run-{self._meta['next_run']:08d}.npy"
+        self._write_array(run_name, new)
+        self._meta["runs"].append(run_name)
+        self._meta["next_run"] += 1
+        self._meta["count"] += len(new)
+
+        if self._meta["count"] > self._meta["capacity"]:
+            self._resize_bloom(2 * self._meta["count"])
+        else:
+            bloom = self._bloom_words()
+            self._set_bits(bloom, new)
+            self._write_array("bloom.npy", bloom)
+
+        if len(self._meta["runs"]) > self.max_runs:
+            self._compact()
+        self._write_meta()
+        return len(new)
+
+    def _resize_bloom(self, capacity: int) -> None:
+        bits, hash_count = bloom_parameters(capacity, self.fp_rate)
+        self._meta.update(capacity=capacity, bits=bits, hashes=hash_count)
+        bloom = np.zeros(bits // 64, dtype=np.uint64)
+        for run in self._runs():
+            self._set_bits(bloom, np.asarray(run))
+        self._bloom = bloom
+        self._write_array("bloom.npy", bloom)
+
+    def _compact(self) -> None:
+        """Merge all runs into one sorted run"""
+        old_runs = list(self._meta["runs"])
+        merged = np.sort(np.concatenate([np.asarray(run) for run in self._runs()]))
+        run_name = f"run-{self._meta['next_run']:08d}.npy"
+        self._write_array(run_name, merged)
+        self._meta["runs"] = [run_name]
+        self._meta["next_run"] += 1
+        self._write_meta()
+        for old in old_runs:
+            (self.path / old).unlink(missing_ok=True)
+
+    def drop(self) -> None:
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        self._meta = self._read_meta()
+        self._bloom = None
+
+    def rebuild(self, chunks: Iterable[Any]) -> int:
+        """Replace the index with the keys of `chunks` (e.g. pages from the warehouse)"""
+        self.drop()
+        for chunk in chunks:
+            self.add(chunk)
+        if len(self._meta["runs"]) > 1:
+            self._compact()
+        return len(self)
+
+def interaction_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """Content fingerprint per row of the interaction (all line items sharing
+    the interaction key columns) it belongs to
+
+    Combines the content hashes of every line item of the interaction,
+    whatever their order, with their count, so it changes when a line
+    item is corrected, added or removed.
+    """
+    key_columns = [c for c in INTERACTION_KEY_COLUMNS if c in df.columns]
+    codes, _ = pd.factorize(row_content_hash(df, key_columns).to_numpy())
+    content = row_content_hash(df).to_numpy(dtype=np.uint64)
+
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    # uint64 sums wrap around, which keeps them order independent
+    groups = pd.DataFrame({
+        'content': np.add.reduceat(content[order], starts),
+        'lines': np.diff(np.r_[starts, len(order)]),
+    })
+    fingerprints = pd.util.hash_pandas_object(groups, index=False).to_numpy(dtype=np.uint64)
+    return fingerprints[codes]
+
+def drop_loaded_rows(bronze_data: Dict[str, pd.DataFrame], run: ETLRun,
+                     indexes: Optional[Dict[str, KeyIndex]] = None,
+                     source: str = 'sales') -> Dict[str, pd.DataFrame]:
+    """Drop interactions of `source` that an earlier run loaded unchanged
+
+    Works at the grain silver replaces rows at: an interaction (all line
+    items sharing an interaction_key) is dropped only when its content
+    fingerprint was recorded, so corrected re-deliveries and late line
+    items still pass. Kept interactions whose key was loaded before are
+    counted as re-delivered.
+    """
+    df = bronze_data.get(source)
+    if df is None or df.empty or 'transaction_id' not in df.columns:
+        run.log_step("drop_loaded_rows", "skipped", note=f"No {source}.transaction_id to check")
+        return bronze_data
+
+    start_time = pd.Timestamp.now()
+    indexes = indexes or {}
+    try:
+        content_index = indexes.get(CONTENT_INDEX) or KeyIndex(CONTENT_INDEX)
+        key_index = indexes.get('interaction_key') or KeyIndex('interaction_key')
+        loaded = content_index.contains(interaction_fingerprints(df))
+        kept = df[~loaded].reset_index(drop=True)
+
+        # Surrogate keys as silver computes them, for the rows that remain only
+        redelivered = 0
+        if len(key_index) and not kept.empty:
+            key_columns = [c for c in INTERACTION_KEY_COLUMNS if c in kept.columns]
+            keys = create_surrogate_key(kept, key_columns)
+            redelivered = int(keys[key_index.contains(keys)].nunique())
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("drop_loaded_rows", "success",
+                    duration_ms=duration_ms,
+                    rows=len(df),
+                    already_loaded=int(loaded.sum()),
+                    redelivered_interactions=redelivered,
+                    index_size=len(content_index))
+        run.log_metric(f"{source}_rows_already_loaded", int(loaded.sum()))
+        run.log_metric(f"{source}_interactions_redelivered", redelivered)
+        if not loaded.any():
+            return bronze_data
+        return {**bronze_data, source: kept}
+
+    except Exception as e:
+        run.log_error("drop_loaded_rows", str(e))
+        raise
+
+def record_loaded_keys(silver_data: Dict[str, Any], run: ETLRun,
+                       indexes: Optional[Dict[str, KeyIndex]] = None,
+                       bronze_data: Optional[Dict[str, Any]] = None,
+                       source: str = 'sales') -> Dict[str, int]:
+    """Add the keys of a persisted batch to their indexes
+
+    Transaction ids and interaction keys come from the silver interactions,
+    interaction content fingerprints from the bronze `source` rows they
+    were conformed from (what `drop_loaded_rows` compares).
+    """
+    interactions = silver_data.get('interactions')
+    if not isinstance(interactions, pd.DataFrame) or interactions.empty:
+        run.log_step("record_loaded_keys", "skipped", note="No interactions data")
+        return {}
+
+    start_time = pd.Timestamp.now()
+    indexes = indexes or {}
+    added = {}
+    try:
+        for name, column in LOADED_KEY_COLUMNS.items():
+            if column not in interactions.columns:
+                continue
+            index = indexes.get(name) or KeyIndex(name)
+            added[name] = index.add(interactions[column])
+            run.log_metric(f"key_index_{name}_size", len(index))
+
+        bronze = (bronze_data or {}).get(source)
+        if isinstance(bronze, pd.DataFrame) and not bronze.empty and \
+                'transaction_id' in bronze.columns:
+            index = indexes.get(CONTENT_INDEX) or KeyIndex(CONTENT_INDEX)
+            added[CONTENT_INDEX] = index.add(interaction_fingerprints(bronze))
+            run.log_metric(f"key_index_{CONTENT_INDEX}_size", len(index))
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("record_loaded_keys", "success", duration_ms=duration_ms, **added)
+        return added
+
+    except Exception as e:
+        run.log_error("record_loaded_keys", str(e))
+        raise
@@ -1,12 +1,14 @@
 """
 Structured logging for Scout ETL Pipeline
 """
-import json
+import copy
 import time
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields
+from .sinks import LogSink, get_default_sink
+from .metrics import MetricsRegistry
 
 @dataclass
 class ETLRun:
@@ -20,6 +22,8 @@ class ETLRun:
     steps: list = None
     metrics: dict = None
     errors: list = None
+    sink: Optional[LogSink] = field(default=None, repr=False, compare=False)
+    registry: Optional[MetricsRegistry] = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
         if self.steps is None:
@@ -28,6 +32,16 @@ class ETLRun:
             self.metrics = {}
         if self.errors is None:
             self.errors = []
+        if self.registry is None:
+            self.registry = MetricsRegistry(const_labels={"environment": self.environment})
+
+    def _emit(self, log_entry: Dict[str, Any]):
+        """Hand a structured log entry to the run's sink (non-blocking)"""
+        sink = self.sink or get_default_sink()
+        if hasattr(sink, "emit"):
+            sink.emit(log_entry)
+        else:
+            sink.write_batch([log_entry])
 
     def log_step(self, step_name: str, status: str = "success",
                  duration_ms: Optional[int] = None, **kwargs):
@@ -44,6 +58,15 @@ class ETLRun:
 
         self.steps.append(step_data)
 
+        # Feed stage latency / throughput instruments
+        if duration_ms is not None:
+            rows = kwargs.get("rows", kwargs.get("rows_out"))
+            self.registry.observe_stage(step_name, duration_ms / 1000.0,
+                                        rows=rows if isinstance(rows, (int, float)) else None,
+                                        status=status)
+        if isinstance(kwargs.get("bytes_read"), (int, float)):
+            self.registry.record_bytes_read(step_name, kwargs["bytes_read"])
+
         # Print structured log
         log_entry = {
             "run_id": self.run_id,
@@ -51,11 +74,13 @@ class ETLRun:
             "message": f"ETL Step: {step_name}",
             "data": step_data
         }
-        print(json.dumps(log_entry, default=str))
+        self._emit(log_entry)
 
     def log_metric(self, metric_name: str, value: Any):
         """Log a metric for this run"""
         self.metrics[metric_name] = value
+        if isinstance(value, (bool, int, float)):
+            self.registry.gauge(metric_name).set(float(value))
 
         log_entry = {
             "run_id": self.run_id,
@@ -63,7 +88,7 @@ class ETLRun:
             "message": f"Metric: {metric_name}",
             "data": {"metric": metric_name, "value": value}
         }
-        print(json.dumps(log_entry, default=str))
+        self._emit(log_entry)
 
     def log_error(self, error_type: str, error_message: str, **kwargs):
         """Log an error for this run"""
@@ -82,7 +107,7 @@ class ETLRun:
             "message": f"ETL Error: {error_type}",
             "data": error_data
         }
-        print(json.dumps(log_entry, default=str))
+        self._emit(log_entry)
 
     def finish(self, ok: bool = True):
         """Finish the ETL run"""
@@ -90,6 +115,9 @@ class ETLRun:
         self.status = "success" if ok else "failed"
 
         duration_seconds = (self.end_time - self.start_time).total_seconds()
+        self.registry.gauge("run_duration_seconds", "Wall time of the last run").set(duration_seconds)
+        self.registry.gauge("run_success", "1 if the last run succeeded").set(1.0 if ok else 0.0)
+        self.registry.counter("errors_total", "Errors logged by runs").inc(len(self.errors))
 
         log_entry = {
             "run_id": self.run_id,
@@ -100,16 +128,38 @@ class ETLRun:
                 "duration_seconds": duration_seconds,
                 "steps_count": len(self.steps),
                 "errors_count": len(self.errors),
-                "metrics": self.metrics
+                "metrics": dict(self.metrics)
             }
         }
-        print(json.dumps(log_entry, default=str))
+        self._emit(log_entry)
+
+        self.export_metrics()
+
+        # Drain buffered records so nothing is lost when the run ends
+        (self.sink or get_default_sink()).flush()
+
+    def export_metrics(self, file_path: Optional[str] = None, fmt: Optional[str] = None):
+        """Write the run's metrics registry to a Prometheus textfile or OTLP JSON file"""
+        from .config import cfg
+        file_path = file_path or cfg.metrics_export_path
+        if not file_path:
+            return None
+
+        try:
+            return self.registry.export(file_path, fmt or cfg.metrics_export_format)
+        except Exception as e:
+            self.log_error("export_metrics", str(e))
+            return None
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert run to dictionary for serialization"""
-        return asdict(self)
+        return copy.deepcopy({
+            f.name: getattr(self, f.name)
+            for f in fields(self) if f.name not in ("sink", "registry")
+        })
 
-def log_run(environment: str = "development", dry_run: bool = True) -> ETLRun:
+def log_run(environment: str = "development", dry_run: bool = True,
+            sink: Optional[LogSink] = None) -> ETLRun:
     """Initialize a new ETL run with logging"""
     run_id = str(uuid.uuid4())[:8]
     start_time = datetime.utcnow()
@@ -118,7 +168,8 @@ def log_run(environment: str = "development", dry_run: bool = True) -> ETLRun:
         run_id=run_id,
         start_time=start_time,
         environment=environment,
-        dry_run=dry_run
+        dry_run=dry_run,
+        sink=sink
     )
 
     log_entry = {
@@ -131,6 +182,6 @@ def log_run(environment: str = "development", dry_run: bool = True) -> ETLRun:
             "start_time": start_time.isoformat()
         }
     }
-    print(json.dumps(log_entry, default=str))
+    run._emit(log_entry)
 
     return run
\ No newline at end of file
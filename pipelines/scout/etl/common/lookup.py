@@ -0,0 +1,82 @@
+"""
+Dimension lookup joins for Scout ETL Pipeline
+Attach small-dimension attributes to fact rows by position index and take
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Integer keys spanning at most this many slots use a dense position array
+DENSE_KEY_MAX_SPAN = 1_000_000
+
+class DimensionLookup:
+    """Position index over a dimension keyed by a unique id
+
+    The index is built once per dimension; `positions` maps fact keys to
+    dimension row positions (-1 for no match) and `attach` gathers attribute
+    columns with a vectorized take. Compact integer keys use a dense
+    key -> position array, other keys a hash index. Equivalent to a left
+    `merge` on a dimension whose keys are unique (duplicate keys resolve to
+    the first row, as conform_* keeps them).
+    """
+
+    def __init__(self, dim_df: pd.DataFrame, key: str, columns: List[str],
+                 prefix: str = ""):
+        dim_df = dim_df.drop_duplicates(subset=[key], keep='first')
+        self.key = key
+        self.columns = [col for col in columns if col != key and col in dim_df.columns]
+        self.prefix = prefix
+        self._values = {col: dim_df[col].array for col in self.columns}
+
+        keys = dim_df[key]
+        self._dense: Optional[np.ndarray] = None
+        self._dense_base = 0
+        if pd.api.types.is_integer_dtype(keys) and len(keys):
+            key_values = keys.to_numpy(dtype=np.int64)
+            low, high = int(key_values.min()), int(key_values.max())
+            if high - low < DENSE_KEY_MAX_SPAN:
+                self._dense = np.full(high - low + 1, -1, dtype=np.int64)
+                self._dense[key_values - low] = np.arange(len(key_values))
+                self._dense_base = low
+        if self._dense is None:
+            self._index = pd.Index(keys)
+
+    def positions(self, fact_keys: pd.Series) -> np.ndarray:
+        """Dimension row position for each fact key, -1 where unmatched"""
+        if self._dense is not None:
+            if isinstance(fact_keys.dtype, pd.CategoricalDtype):
+                fact_keys = fact_keys.astype(fact_keys.cat.categories.dtype)
+            numeric = pd.to_numeric(fact_keys, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            slots = numeric - self._dense_base
+            inside = (slots >= 0) & (slots < len(self._dense)) & (np.mod(numeric, 1) == 0)
+            result = np.full(len(numeric), -1, dtype=np.int64)
+            result[inside] = self._dense[slots[inside].astype(np.int64)]
+            return result
+
+        return self._index.get_indexer(fact_keys)
+
+    def attach(self, fact_df: pd.DataFrame, run=None,
+               metric_name: Optional[str] = None) -> pd.DataFrame:
+        """Return `fact_df` with dimension attributes appended as prefixed columns"""
+        enriched_df, matched = self.attach_counted(fact_df)
+
+        if run is not None and metric_name and len(fact_df):
+            match_rate = matched / len(fact_df) * 100
+            run.log_metric(metric_name, round(float(match_rate), 2))
+
+        return enriched_df
+
+    def attach_counted(self, fact_df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        """`attach` without logging, also returning the number of matched fact rows"""
+        positions = self.positions(fact_df[self.key])
+
+        new_columns: Dict[str, pd.Series] = {}
+        for col in self.columns:
+            values = pd.api.extensions.take(self._values[col], positions, allow_fill=True)
+            new_columns[f"{self.prefix}{col}"] = pd.Series(values, index=fact_df.index)
+
+        enriched_df = fact_df.copy(deep=False)
+        for name, values in new_columns.items():
+            enriched_df[name] = values
+
+        return enriched_df, int((positions >= 0).sum())
@@ -0,0 +1,253 @@
+"""
+Metrics registry for Scout ETL Pipeline
+Counters, gauges and histograms exportable as Prometheus text or OTLP JSON
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+DEFAULT_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+def sanitize_metric_name(name: str) -> str:
+    """Make a string a valid Prometheus metric name"""
+    name = re.sub(r'[^a-zA-Z0-9_:]', '_', name)
+    if not name or name[0].isdigit():
+        name = f"_{name}"
+    return name
+
+class Metric:
+    """Base metric with per-label-set values"""
+    metric_type = "untyped"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = sanitize_metric_name(name)
+        self.description = description
+        self._values: Dict[LabelKey, Any] = {}
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[LabelKey, Any]]:
+        with self._lock:
+            return list(self._values.items())
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} cannot decrease")
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+class Histogram(Metric):
+    """Cumulative bucketed distribution of observations"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, description: str = "",
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            idx = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    idx = i
+                    break
+            state["counts"][idx] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+class MetricsRegistry:
+    """Collection of named metrics for one ETL run"""
+
+    def __init__(self, namespace: str = "scout_etl", const_labels: Optional[Dict[str, Any]] = None):
+        self.namespace = namespace
+        self.const_labels = {k: str(v) for k, v in (const_labels or {}).items()}
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs) -> Metric:
+        full_name = sanitize_metric_name(f"{self.namespace}_{name}" if self.namespace else name)
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = cls(full_name, description, **kwargs)
+                self._metrics[full_name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {full_name} already registered as {metric.metric_type}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "",
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    # Standard ETL instruments
+
+    def observe_stage(self, stage: str, duration_seconds: float, rows: Optional[int] = None,
+                      status: str = "success") -> None:
+        """Record stage latency and rows processed"""
+        self.histogram("stage_duration_seconds", "ETL stage latency").observe(
+            duration_seconds, stage=stage, status=status)
+        if rows is not None:
+            self.counter("rows_processed_total", "Rows processed per stage").inc(rows, stage=stage)
+
+    def record_bytes_read(self, source: str, n_bytes: int) -> None:
+        self.counter("bytes_read_total",
+                     "Bytes read from sources (in-memory size of the extracted frames)").inc(n_bytes, source=source)
+
+    def record_cache(self, cache: str, hit: bool, count: int = 1) -> None:
+        """Record cache lookups; the hit ratio gauge is derived on export"""
+        self.counter("cache_requests_total", "Cache lookups by result").inc(
+            count, cache=cache, result="hit" if hit else "miss")
+
+    def _derive_cache_hit_ratio(self) -> None:
+        full_name = sanitize_metric_name(f"{self.namespace}_cache_requests_total")
+        requests = self._metrics.get(full_name)
+        if requests is None:
+            return
+        totals: Dict[str, Dict[str, float]] = {}
+        for key, value in requests.samples():
+            labels = dict(key)
+            totals.setdefault(labels.get("cache", ""), {}).setdefault(labels.get("result"), 0.0)
+            totals[labels.get("cache", "")][labels.get("result")] += value
+        ratio = self.gauge("cache_hit_ratio", "Cache hit ratio")
+        for cache, counts in totals.items():
+            total = counts.get("hit", 0.0) + counts.get("miss", 0.0)
+            if total:
+                ratio.set(counts.get("hit", 0.0) / total, cache=cache)
+
+    def metrics(self) -> List[Metric]:
+        self._derive_cache_hit_ratio()
+        with self._lock:
+            return list(self._metrics.values())
+
+    # Exporters
+
+    def _labels(self, key: LabelKey) -> Dict[str, str]:
+        labels = dict(self.const_labels)
+        labels.update(dict(key))
+        return labels
+
+    def to_prometheus_text(self) -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        def fmt_labels(labels: Dict[str, str]) -> str:
+            if not labels:
+                return ""
+            parts = []
+            for k, v in sorted(labels.items()):
+                v = v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+                parts.append(f'{sanitize_metric_name(k)}="{v}"')
+            return "{" + ",".join(parts) + "}"
+
+        def fmt_value(value: float) -> str:
+            if math.isinf(value):
+                return "+Inf" if value > 0 else "-Inf"
+            return repr(float(value))
+
+        lines = []
+        for metric in self.metrics():
+            if metric.description:
+                lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for key, value in metric.samples():
+                labels = self._labels(key)
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(list(metric.buckets) + [math.inf], value["counts"]):
+                        cumulative += count
+                        bucket_labels = dict(labels, le=fmt_value(bound))
+                        lines.append(f"{metric.name}_bucket{fmt_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{metric.name}_sum{fmt_labels(labels)} {fmt_value(value['sum'])}")
+                    lines.append(f"{metric.name}_count{fmt_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{metric.name}{fmt_labels(labels)} {fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_otlp_json(self) -> Dict[str, Any]:
+        """Render metrics as an OTLP/JSON ExportMetricsServiceRequest"""
+        now_ns = str(time.time_ns())
+
+        def attributes(labels: Dict[str, str]) -> List[Dict[str, Any]]:
+            return [{"key": k, "value": {"stringValue": v}} for k, v in sorted(labels.items())]
+
+        otlp_metrics = []
+        for metric in self.metrics():
+            entry: Dict[str, Any] = {"name": metric.name, "description": metric.description}
+            points = []
+            for key, value in metric.samples():
+                point: Dict[str, Any] = {"attributes": attributes(dict(key)), "timeUnixNano": now_ns}
+                if isinstance(metric, Histogram):
+                    point.update({
+                        "count": str(value["count"]),
+                        "sum": value["sum"],
+                        "bucketCounts": [str(c) for c in value["counts"]],
+                        "explicitBounds": list(metric.buckets),
+                    })
+                else:
+                    point["asDouble"] = value
+                points.append(point)
+
+            if isinstance(metric, Counter):
+                entry["sum"] = {"dataPoints": points, "aggregationTemporality": 2, "isMonotonic": True}
+            elif isinstance(metric, Histogram):
+                entry["histogram"] = {"dataPoints": points, "aggregationTemporality": 2}
+            else:
+                entry["gauge"] = {"dataPoints": points}
+            otlp_metrics.append(entry)
+
+        return {
+            "resourceMetrics": [{
+                "resource": {"attributes": attributes(self.const_labels)},
+                "scopeMetrics": [{"scope": {"name": self.namespace}, "metrics": otlp_metrics}],
+            }]
+        }
+
+    def export(self, file_path: Union[str, Path], fmt: str = "prometheus") -> Path:
+        """Atomically write metrics to a file for a local collector to scrape"""
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if fmt == "prometheus":
+            payload = self.to_prometheus_text()
+        elif fmt == "otlp":
+            payload = json.dumps(self.to_otlp_json())
+        else:
+            raise ValueError(f"Unsupported metrics format: {fmt}")
+
+        tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, file_path)
+        return file_path
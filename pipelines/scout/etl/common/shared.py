@@ -0,0 +1,94 @@
+"""
+Shared-memory hand-off for Scout ETL Pipeline
+Publish read-only objects once for all pool workers instead of pickling them per task
+"""
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Tuple
+
+# (block name, payload size) - small and picklable, passed to workers
+SharedHandle = Tuple[str, int]
+
+# Modules a forkserver imports before forking pool workers
+FORKSERVER_PRELOAD = ['numpy', 'pandas', 'pyarrow']
+
+# Payloads already unpickled in this process, by block name
+_LOADED: Dict[str, Any] = {}
+
+class SharedPayload:
+    """A pickled object in a named shared-memory block
+
+    The creating process owns the block and unlinks it on close; workers
+    attach by `handle` and unpickle once per process (`load_shared`).
+    Use as a context manager around the pool that reads it.
+    """
+
+    def __init__(self, obj: Any):
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        self.size = len(data)
+        self._block = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self._block.buf[:self.size] = data
+
+    @property
+    def handle(self) -> SharedHandle:
+        return self._block.name, self.size
+
+    def close(self) -> None:
+        if self._block is not None:
+            _LOADED.pop(self._block.name, None)
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def __enter__(self) -> "SharedPayload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach without registering with the resource tracker
+
+    Before Python 3.13 attaching registers the block as if this process
+    owned it, and a worker's tracker would unlink it when the worker exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def load_shared(handle: SharedHandle) -> Any:
+    """The object behind `handle`, unpickled once per process"""
+    name, size = handle
+    if name not in _LOADED:
+        block = _attach(name)
+        try:
+            with block.buf[:size] as view:
+                _LOADED[name] = pickle.loads(view)
+        finally:
+            block.close()
+    return _LOADED[name]
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """A process pool whose workers are not forked from the calling process
+
+    Pools are opened from DAG worker threads while other stages and the
+    async log sink run; a forked child can inherit a lock another thread
+    holds and deadlock. Workers start from a forkserver (spawn where that
+    is unavailable), so large inputs should travel as SharedPayload handles
+    and entry-point scripts need the usual `if __name__ == '__main__'` guard.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Imported once by the server instead of by every worker
+        context.set_forkserver_preload(FORKSERVER_PRELOAD)
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
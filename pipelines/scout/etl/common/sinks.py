@@ -0,0 +1,247 @@
+"""
+Log sinks for Scout ETL Pipeline
+Buffered, non-blocking delivery of structured log records
+"""
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+LogRecord = Dict[str, Any]
+
+def _serialize(record: LogRecord) -> str:
+    """Serialize a log record to a single JSON line"""
+    return json.dumps(record, default=str)
+
+class LogSink:
+    """Base class for log sinks; receives records in batches"""
+
+    def write_batch(self, records: List[LogRecord]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+class StdoutSink(LogSink):
+    """Write NDJSON records to stdout with one write per batch"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write_batch(self, records: List[LogRecord]) -> None:
+        stream = self.stream or sys.stdout
+        stream.write("".join(_serialize(r) + "\n" for r in records))
+
+    def flush(self) -> None:
+        (self.stream or sys.stdout).flush()
+
+class RotatingNDJSONSink(LogSink):
+    """Append NDJSON records to a file, rotating when it exceeds max_bytes"""
+
+    def __init__(self, file_path: Union[str, Path], max_bytes: int = 50 * 1024 * 1024,
+                 backup_count: int = 5):
+        self.file_path = Path(file_path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.file_path, 'a', encoding='utf-8')
+
+    def write_batch(self, records: List[LogRecord]) -> None:
+        payload = "".join(_serialize(r) + "\n" for r in records)
+        if self.max_bytes and self._fh.tell() + len(payload) > self.max_bytes and self._fh.tell() > 0:
+            self._rotate()
+        self._fh.write(payload)
+
+    def _rotate(self) -> None:
+        """Shift file.N -> file.N+1 and start a fresh file"""
+        self._fh.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.file_path.with_name(f"{self.file_path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.file_path.with_name(f"{self.file_path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.file_path, self.file_path.with_name(f"{self.file_path.name}.1"))
+        else:
+            self.file_path.unlink()
+        self._fh = open(self.file_path, 'a', encoding='utf-8')
+
+    def flush(self) -> None:
+        if not self._fh.closed:
+            self._fh.flush()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._fh.flush()
+            self._fh.close()
+
+class TableSink(LogSink):
+    """Batch-insert log records into a database table
+
+    `client` is a Supabase client (anything exposing
+    `.table(name).insert(rows).execute()`); alternatively pass `insert_fn`
+    taking a list of row dicts.
+    """
+
+    def __init__(self, table_name: str = "scout_etl_logs", client: Any = None,
+                 insert_fn: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 batch_size: int = 500):
+        self.table_name = table_name
+        self.client = client
+        self.insert_fn = insert_fn
+        self.batch_size = batch_size
+        self._pending: List[Dict[str, Any]] = []
+
+    def write_batch(self, records: List[LogRecord]) -> None:
+        for record in records:
+            self._pending.append({
+                "run_id": record.get("run_id"),
+                "level": record.get("level"),
+                "message": record.get("message"),
+                "data": _serialize(record.get("data", {})),
+            })
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        while self._pending:
+            rows = self._pending[:self.batch_size]
+            try:
+                if self.insert_fn is not None:
+                    self.insert_fn(rows)
+                elif self.client is not None:
+                    self.client.table(self.table_name).insert(rows).execute()
+            except Exception as e:
+                print(f"⚠️ Failed to write {len(rows)} log rows to {self.table_name}: {e}",
+                      file=sys.stderr)
+            del self._pending[:len(rows)]
+
+class AsyncLogSink(LogSink):
+    """Feed one or more sinks from a bounded queue drained by a background thread
+
+    `emit` only enqueues the record; serialization and I/O happen on the
+    worker thread. When the queue is full `emit` blocks (backpressure)
+    rather than dropping records.
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, sinks: List[LogSink], max_queue: int = 10000, max_batch: int = 256):
+        self.sinks = sinks
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="etl-log-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: LogRecord) -> None:
+        """Enqueue a record for delivery"""
+        if self._closed:
+            self._deliver([record])
+            return
+        self._queue.put(record)
+
+    def write_batch(self, records: List[LogRecord]) -> None:
+        for record in records:
+            self.emit(record)
+
+    def flush(self) -> None:
+        """Block until all records enqueued so far have been delivered"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put((self._FLUSH, done))
+        done.wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._closed = True
+        for sink in self.sinks:
+            sink.close()
+
+    def _deliver(self, batch: List[LogRecord]) -> None:
+        for sink in self.sinks:
+            try:
+                sink.write_batch(batch)
+            except Exception as e:
+                print(f"⚠️ Log sink {type(sink).__name__} failed: {e}", file=sys.stderr)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[LogRecord] = []
+            control = None
+
+            while True:
+                if item is self._STOP or isinstance(item, tuple):
+                    control = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._deliver(batch)
+
+            if control is self._STOP:
+                return
+            if control is not None:
+                for sink in self.sinks:
+                    try:
+                        sink.flush()
+                    except Exception as e:
+                        print(f"⚠️ Log sink {type(sink).__name__} flush failed: {e}",
+                              file=sys.stderr)
+                control[1].set()
+
+def build_sinks(spec: str, log_file: Optional[str] = None,
+                table_name: str = "scout_etl_logs", batch_size: int = 500) -> List[LogSink]:
+    """Build sinks from a comma-separated spec, e.g. 'stdout,file,table'"""
+    sinks: List[LogSink] = []
+    for name in [s.strip().lower() for s in spec.split(',') if s.strip()]:
+        if name == "stdout":
+            sinks.append(StdoutSink())
+        elif name == "file":
+            sinks.append(RotatingNDJSONSink(log_file or "logs/scout_etl.ndjson"))
+        elif name == "table":
+            from ..extract.supabase_rest import create_supabase_client
+            client = create_supabase_client(use_service_role=True)
+            if client is None:
+                print("⚠️ Table log sink disabled: Supabase not configured", file=sys.stderr)
+                continue
+            sinks.append(TableSink(table_name, client=client, batch_size=batch_size))
+        else:
+            print(f"⚠️ Unknown log sink '{name}' ignored", file=sys.stderr)
+    return sinks
+
+_default_sink: Optional[AsyncLogSink] = None
+_default_lock = threading.Lock()
+
+def get_default_sink() -> AsyncLogSink:
+    """Return the process-wide async sink, creating it from config on first use"""
+    global _default_sink
+    if _default_sink is None:
+        with _default_lock:
+            if _default_sink is None:
+                from .config import cfg
+                sinks = build_sinks(cfg.log_sinks, log_file=cfg.log_file,
+                                    table_name=cfg.log_table, batch_size=cfg.batch_size)
+                _default_sink = AsyncLogSink(sinks or [StdoutSink()],
+                                             max_queue=cfg.log_queue_size)
+                atexit.register(_default_sink.close)
+    return _default_sink
@@ -0,0 +1,288 @@
+"""
+Spatial indexing for Scout ETL Pipeline
+Grid index over store locations, point-in-polygon and hex cell assignment in NumPy
+"""
+import math
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .config import cfg
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# Hex cells are laid out on an equirectangular projection true at this
+# latitude (the middle of the Philippines; cell sizes drift by a few
+# percent towards Mindanao and Batanes)
+HEX_REFERENCE_LAT = 12.0
+
+# Polygon: (latitude, longitude) vertices, implicitly closed
+Polygon = Sequence[Tuple[float, float]]
+
+def haversine_km(lat1: Any, lon1: Any, lat2: Any, lon2: Any) -> np.ndarray:
+    """Great-circle distance in km, broadcasting over array inputs"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64'))
+                              for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def points_in_polygon(latitude: Any, longitude: Any, polygon: Polygon) -> np.ndarray:
+    """Even-odd ray casting over all points at once, one pass per polygon edge"""
+    y = np.asarray(latitude, dtype='float64')
+    x = np.asarray(longitude, dtype='float64')
+    vertices = np.asarray(polygon, dtype='float64')
+    inside = np.zeros(y.shape, dtype=bool)
+    if len(vertices) < 3:
+        return inside
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for (yi, xi), (yj, xj) in zip(vertices, np.roll(vertices, 1, axis=0)):
+            spans = (yi > y) != (yj > y)
+            inside ^= spans & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+    return inside
+
+def assign_regions(latitude: Any, longitude: Any, regions: Dict[str, Polygon]) -> np.ndarray:
+    """Name of the first region polygon containing each point (None outside all)"""
+    lat = np.asarray(latitude, dtype='float64')
+    lon = np.asarray(longitude, dtype='float64')
+    result = np.full(lat.shape, None, dtype=object)
+    unassigned = np.isfinite(lat) & np.isfinite(lon)
+
+    for name, polygon in regions.items():
+        vertices = np.asarray(polygon, dtype='float64')
+        candidates = np.flatnonzero(
+            unassigned
+            & (lat >= vertices[:, 0].min()) & (lat <= vertices[:, 0].max())
+            & (lon >= vertices[:, 1].min()) & (lon <= vertices[:, 1].max())
+        )
+        if len(candidates) == 0:
+            continue
+        hits = candidates[points_in_polygon(lat[candidates], lon[candidates], vertices)]
+        result[hits] = name
+        unassigned[hits] = False
+    return result
+
+def hex_cells(latitude: Any, longitude: Any, size_km: Optional[float] = None) -> pd.Series:
+    """Pointy-top hex cell of each point as a packed int64 id (null without coordinates)
+
+    `size_km` is the hex circumradius (cfg.geo_hex_size_km). Ids pack the
+    axial (q, r) coordinates as q << 32 | r; see `hex_centers`.
+    """
+    size_km = size_km or cfg.geo_hex_size_km
+    lat = np.asarray(latitude, dtype='float64')
+    lon = np.asarray(longitude, dtype='float64')
+    x = lon * KM_PER_DEGREE * math.cos(math.radians(HEX_REFERENCE_LAT)) / size_km
+    y = lat * KM_PER_DEGREE / size_km
+
+    # Fractional axial coordinates, rounded in cube space
+    q = math.sqrt(3) / 3 * x - y / 3
+    r = 2 / 3 * y
+    s = -q - r
+    valid = np.isfinite(q) & np.isfinite(r)
+    q, r, s = (np.where(valid, v, 0.0) for v in (q, r, s))
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    ids = (rq.astype(np.int64) << 32) | (rr.astype(np.int64) & 0xFFFFFFFF)
+    return pd.Series(pd.array(np.where(valid, ids, 0), dtype='Int64')).where(valid)
+
+def hex_centers(cells: Any, size_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(latitude, longitude) of hex cell centers for ids from `hex_cells`"""
+    size_km = size_km or cfg.geo_hex_size_km
+    ids = pd.array(cells, dtype='Int64')
+    valid = ~np.asarray(ids.isna())
+    packed = ids.to_numpy(dtype=np.int64, na_value=0)
+    q = packed >> 32
+    r = ((packed & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000
+    x = size_km * (math.sqrt(3) * q + math.sqrt(3) / 2 * r)
+    y = size_km * 1.5 * r
+    lat = y / KM_PER_DEGREE
+    lon = x / (KM_PER_DEGREE * math.cos(math.radians(HEX_REFERENCE_LAT)))
+    return np.where(valid, lat, np.nan), np.where(valid, lon, np.nan)
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, end) for each pair, without a Python loop"""
+    lengths = np.maximum(ends - starts, 0)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return offsets + np.arange(total)
+
+class StoreSpatialIndex:
+    """Uniform latitude/longitude grid over store locations
+
+    Stores are sorted by grid cell so any rectangular block of cells is
+    one `searchsorted` range per grid row. Nearest-store queries grow a
+    block around the query cell until it provably holds the nearest
+    stores; radius and polygon queries only test stores in the cells
+    their bounding box touches. Stores without coordinates are skipped.
+    """
+
+    def __init__(self, store_ids: Any, latitude: Any, longitude: Any,
+                 cell_deg: Optional[float] = None):
+        lat = np.asarray(latitude, dtype='float64')
+        lon = np.asarray(longitude, dtype='float64')
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.cell_deg = cell_deg or cfg.spatial_cell_deg
+
+        lat, lon, ids = lat[valid], lon[valid], np.asarray(store_ids)[valid]
+        self.lat0 = float(lat.min()) if len(lat) else 0.0
+        self.lon0 = float(lon.min()) if len(lon) else 0.0
+        self.n_rows = int((lat.max() - self.lat0) // self.cell_deg) + 1 if len(lat) else 0
+        self.n_cols = int((lon.max() - self.lon0) // self.cell_deg) + 1 if len(lon) else 0
+        self._max_abs_lat = float(np.abs(lat).max()) if len(lat) else 0.0
+
+        rows, cols = self._cells(lat, lon)
+        codes = rows * self.n_cols + cols
+        order = np.argsort(codes, kind='stable')
+        self._codes = codes[order]
+        self.store_ids = ids[order]
+        self.latitude = lat[order]
+        self.longitude = lon[order]
+
+    @classmethod
+    def from_stores(cls, stores: pd.DataFrame, cell_deg: Optional[float] = None,
+                    id_column: str = 'store_id') -> "StoreSpatialIndex":
+        """Index a (silver) stores frame by its latitude/longitude columns"""
+        return cls(stores[id_column].to_numpy(), stores['latitude'], stores['longitude'], cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.store_ids)
+
+    def _cells(self, lat: Any, lon: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Grid (row, col) of points; points outside the grid get out-of-range cells"""
+        rows = np.floor((np.asarray(lat, dtype='float64') - self.lat0) / self.cell_deg)
+        cols = np.floor((np.asarray(lon, dtype='float64') - self.lon0) / self.cell_deg)
+        return rows.astype(np.int64), cols.astype(np.int64)
+
+    def _block(self, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """Positions of stores in grid rows row0..row1 and columns col0..col1"""
+        row0, row1 = max(row0, 0), min(row1, self.n_rows - 1)
+        col0, col1 = max(col0, 0), min(col1, self.n_cols - 1)
+        if row0 > row1 or col0 > col1:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(row0, row1 + 1, dtype=np.int64) * self.n_cols
+        starts = np.searchsorted(self._codes, rows + col0, side='left')
+        ends = np.searchsorted(self._codes, rows + col1, side='right')
+        return _ranges(starts, ends)
+
+    def _min_cell_km(self, lat: float) -> float:
+        """Lower bound on the width of one grid cell in km around `lat` and the stores"""
+        widest = min(max(self._max_abs_lat, abs(lat)) + self.cell_deg, 90.0)
+        return self.cell_deg * KM_PER_DEGREE * math.cos(math.radians(widest)) * 0.99
+
+    def _candidates(self, row0: int, row1: int, col0: int, col1: int,
+                    lat: np.ndarray, lon: np.ndarray, n: int) -> np.ndarray:
+        """Stores guaranteed to include the `n` nearest of every point in a block of cells
+
+        A store more than `r` cells outside the block is at least
+        r * cell width away from any point inside it.
+        """
+        covers_all = lambda r: (row0 - r <= 0 and row1 + r >= self.n_rows - 1
+                                and col0 - r <= 0 and col1 + r >= self.n_cols - 1)
+        r = max(-row1, row0 - (self.n_rows - 1), -col1, col0 - (self.n_cols - 1), 0)
+        while True:
+            found = self._block(row0 - r, row1 + r, col0 - r, col1 + r)
+            if len(found) >= n or covers_all(r):
+                break
+            r = max(r * 2, r + 1)
+        if covers_all(r):
+            return found
+
+        distances = haversine_km(lat[:, None], lon[:, None],
+                                 self.latitude[found][None, :], self.longitude[found][None, :])
+        bound = np.partition(distances, n - 1, axis=1)[:, n - 1].max()
+        reach = max(int(math.ceil(bound / self._min_cell_km(float(np.abs(lat).max())))), r)
+        return self._block(row0 - reach, row1 + reach, col0 - reach, col1 + reach)
+
+    def nearest_many(self, latitude: Any, longitude: Any, n: int = 1,
+                     max_groups: int = 1024, chunk_cells: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray]:
+        """The `n` nearest stores of every point: (store id, distance km) arrays of shape (points, n)
+
+        Points are grouped by blocks of grid cells (coarse enough for at
+        most about `max_groups` groups), each group sharing one candidate
+        search. Missing slots (no coordinates, fewer than `n` stores) are
+        None / NaN.
+        """
+        lat = np.asarray(latitude, dtype='float64').ravel()
+        lon = np.asarray(longitude, dtype='float64').ravel()
+        ids = np.full((len(lat), n), None, dtype=object)
+        dists = np.full((len(lat), n), np.nan)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        if len(self) == 0 or len(valid) == 0:
+            return ids, dists
+
+        rows, cols = self._cells(lat[valid], lon[valid])
+        span = 1
+        while True:
+            blocks = pd.MultiIndex.from_arrays([rows // span, cols // span])
+            codes, uniques = pd.factorize(blocks)
+            if len(uniques) <= max_groups:
+                break
+            span *= 2
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        k = min(n, len(self))
+
+        for group, (block_row, block_col) in enumerate(uniques):
+            members = valid[order[bounds[group]:bounds[group + 1]]]
+            row0, col0 = int(block_row) * span, int(block_col) * span
+            found = self._candidates(row0, row0 + span - 1, col0, col0 + span - 1,
+                                     lat[members], lon[members], k)
+            found_lat, found_lon = self.latitude[found][None, :], self.longitude[found][None, :]
+            step = max(1, chunk_cells // max(len(found), 1))
+            for start in range(0, len(members), step):
+                chunk = members[start:start + step]
+                distances = haversine_km(lat[chunk, None], lon[chunk, None], found_lat, found_lon)
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < len(found) else \
+                    np.broadcast_to(np.arange(len(found)), (len(chunk), len(found)))
+                nearest_d = np.take_along_axis(distances, nearest, axis=1)
+                ranked = np.argsort(nearest_d, axis=1, kind='stable')
+                nearest = np.take_along_axis(nearest, ranked, axis=1)
+                ids[chunk, :k] = self.store_ids[found[nearest]]
+                dists[chunk, :k] = np.take_along_axis(nearest_d, ranked, axis=1)
+        return ids, dists
+
+    def nearest(self, latitude: float, longitude: float, n: int = 1) -> pd.DataFrame:
+        """The `n` nearest stores to a point, closest first"""
+        ids, dists = self.nearest_many([latitude], [longitude], n)
+        found = ~np.isnan(dists[0])
+        return pd.DataFrame({'store_id': ids[0][found], 'distance_km': dists[0][found]})
+
+    def assign_nearest(self, latitude: Any, longitude: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest store id and its distance for every point (Voronoi assignment)"""
+        ids, dists = self.nearest_many(latitude, longitude, 1)
+        return ids[:, 0], dists[:, 0]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> pd.DataFrame:
+        """Stores within `radius_km` of a point, closest first"""
+        if len(self) == 0:
+            return pd.DataFrame({'store_id': [], 'distance_km': []})
+        row, col = (int(v[0]) for v in self._cells([latitude], [longitude]))
+        reach = int(math.ceil(radius_km / self._min_cell_km(latitude)))
+        found = self._block(row - reach, row + reach, col - reach, col + reach)
+        distances = haversine_km(latitude, longitude, self.latitude[found], self.longitude[found])
+        hits = distances <= radius_km
+        result = pd.DataFrame({'store_id': self.store_ids[found][hits], 'distance_km': distances[hits]})
+        return result.sort_values('distance_km', kind='stable').reset_index(drop=True)
+
+    def within_polygon(self, polygon: Polygon) -> pd.DataFrame:
+        """Stores inside a polygon of (latitude, longitude) vertices"""
+        vertices = np.asarray(polygon, dtype='float64')
+        if len(self) == 0 or len(vertices) < 3:
+            return pd.DataFrame({'store_id': [], 'latitude': [], 'longitude': []})
+        (row0, row1), (col0, col1) = self._cells(
+            [vertices[:, 0].min(), vertices[:, 0].max()],
+            [vertices[:, 1].min(), vertices[:, 1].max()],
+        )
+        found = self._block(int(row0), int(row1), int(col0), int(col1))
+        found = found[points_in_polygon(self.latitude[found], self.longitude[found], vertices)]
+        return pd.DataFrame({'store_id': self.store_ids[found],
+                             'latitude': self.latitude[found],
+                             'longitude': self.longitude[found]})
@@ -0,0 +1,153 @@
+"""
+Hash-partitioned spill storage for Scout ETL Pipeline
+Out-of-core execution: split frames to disk by group key, process one bucket at a time
+"""
+import hashlib
+import json
+import math
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from .dtypes import concat_aligned
+from .log import ETLRun
+
+# Peak working set of a transform relative to its input frame
+WORKING_SET_FACTOR = 4
+
+def hash_buckets(keys: pd.Series, n_buckets: int) -> np.ndarray:
+    """Stable bucket number per key (nulls share one bucket)"""
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        keys = keys.astype(keys.cat.categories.dtype)
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return (hashes % np.uint64(n_buckets)).astype(np.int64)
+
+def plan_bucket_count(frame_bytes: int, memory_budget_bytes: int,
+                      working_set_factor: float = WORKING_SET_FACTOR) -> int:
+    """Buckets needed so one bucket's working set fits the memory budget"""
+    if memory_budget_bytes <= 0:
+        raise ValueError("memory_budget_bytes must be positive")
+    return max(1, math.ceil(frame_bytes * working_set_factor / memory_budget_bytes))
+
+class SpillStore:
+    """A frame hash-partitioned to disk by one key column
+
+    Layout: <root>/<name>/bucket=<i>/part-<seq>.parquet. Appends add part
+    files, so inputs can be spilled chunk by chunk; all rows sharing a key
+    land in the same bucket, which makes per-key work (transaction
+    summaries, baskets, customer metrics) bucket-local.
+    """
+
+    def __init__(self, root: Union[str, Path], name: str, key: str, n_buckets: int):
+        if n_buckets < 1:
+            raise ValueError("n_buckets must be at least 1")
+        self.root = Path(root)
+        self.name = name
+        self.key = key
+        self.n_buckets = n_buckets
+        self.path = self.root / name
+        self.rows = 0
+
+    @classmethod
+    def create(cls, name: str, key: str, n_buckets: int,
+               root: Optional[Union[str, Path]] = None) -> "SpillStore":
+        """A new, empty store in a unique directory under `root` (cfg.spill_dir)"""
+        if root is None:
+            from .config import cfg
+            root = cfg.spill_dir
+        return cls(Path(root) / uuid.uuid4().hex[:12], name, key, n_buckets)
+
+    def _bucket_path(self, bucket: int) -> Path:
+        return self.path / f"bucket={bucket}"
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Split `df` by key bucket and write one part file per non-empty bucket"""
+        if df.empty:
+            return
+        buckets = hash_buckets(df[self.key], self.n_buckets)
+        order = np.argsort(buckets, kind='stable')
+        sorted_buckets = buckets[order]
+        starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts, ends):
+            self.write_bucket(int(sorted_buckets[start]),
+                              df.iloc[order[start:end]].reset_index(drop=True))
+
+    def write_bucket(self, bucket: int, df: pd.DataFrame) -> None:
+        """Add a part file to one bucket (rows must already hash to it)"""
+        if df.empty:
+            return
+        bucket_path = self._bucket_path(bucket)
+        bucket_path.mkdir(parents=True, exist_ok=True)
+        seq = len(list(bucket_path.glob("part-*.parquet")))
+        df.to_parquet(bucket_path / f"part-{seq:05d}.parquet", index=False)
+        self.rows += len(df)
+
+    def buckets(self) -> List[int]:
+        """Non-empty bucket numbers"""
+        if not self.path.exists():
+            return []
+        return sorted(int(p.name.split("=", 1)[1]) for p in self.path.iterdir()
+                      if p.is_dir() and p.name.startswith("bucket="))
+
+    def read_bucket(self, bucket: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        parts = sorted(self._bucket_path(bucket).glob("part-*.parquet"))
+        frames = [pd.read_parquet(p, columns=columns) for p in parts]
+        if not frames:
+            return pd.DataFrame()
+        return concat_aligned(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def iter_buckets(self, columns: Optional[List[str]] = None) -> Iterator[Tuple[int, pd.DataFrame]]:
+        for bucket in self.buckets():
+            yield bucket, self.read_bucket(bucket, columns)
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Concatenate all buckets (only for results known to fit in memory)"""
+        frames = [df for _, df in self.iter_buckets(columns) if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return concat_aligned(frames, ignore_index=True)
+
+    def repartition(self, name: str, key: str,
+                    n_buckets: Optional[int] = None) -> "SpillStore":
+        """Re-spill this store by another key, one bucket in memory at a time"""
+        target = SpillStore(self.root, name, key, n_buckets or self.n_buckets)
+        for _, df in self.iter_buckets():
+            target.append(df)
+        return target
+
+    def fingerprint(self) -> str:
+        """Content fingerprint from part file names and sizes"""
+        listing: List[Any] = [self.name, self.key, self.n_buckets]
+        if self.path.exists():
+            for part in sorted(self.path.glob("bucket=*/part-*.parquet")):
+                listing.append([str(part.relative_to(self.path)), part.stat().st_size])
+        return hashlib.blake2b(json.dumps(listing).encode(), digest_size=16).hexdigest()
+
+    def clear(self) -> None:
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        self.rows = 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __repr__(self) -> str:
+        return f"SpillStore({self.name!r}, key={self.key!r}, buckets={self.n_buckets}, path={str(self.path)!r})"
+
+def clear_spills(stores: Iterable[Any], run: ETLRun) -> int:
+    """Clear the SpillStores among `stores` and remove run directories left empty
+
+    Other values (e.g. in-memory dimension frames next to spilled facts)
+    are ignored. Returns the number of stores cleared.
+    """
+    spilled = [store for store in stores if isinstance(store, SpillStore)]
+    for store in spilled:
+        store.clear()
+    for root in {store.root for store in spilled}:
+        if root.exists() and not any(root.iterdir()):
+            root.rmdir()
+    run.log_step("clear_spills", "success", stores=len(spilled))
+    return len(spilled)
@@ -6,7 +6,9 @@ import hashlib
 import json
 import re
 from typing import Any, Dict, List, Optional, Union
+import numpy as np
 import pandas as pd
+from .hll import HyperLogLog
 
 def hash_row(row: Union[pd.Series, Dict], algorithm: str = "blake2b") -> str:
     """Generate stable hash for a row to create surrogate keys"""
@@ -29,6 +31,74 @@ def hash_row(row: Union[pd.Series, Dict], algorithm: str = "blake2b") -> str:
     else:
         return hashlib.sha256(json_str.encode()).hexdigest()[:16]
 
+def dataframe_fingerprint(obj: Any) -> str:
+    """Content fingerprint for a DataFrame (or dict/list of them)
+
+    Vectorized via pandas' row hashing; stable across processes for the
+    same values, columns and dtypes.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+
+    if obj is None:
+        hasher.update(b"none")
+    elif hasattr(obj, "fingerprint"):
+        # Disk-backed frames (e.g. SpillStore) fingerprint their own content
+        hasher.update(obj.fingerprint().encode())
+    elif isinstance(obj, pd.DataFrame):
+        hasher.update(json.dumps([list(map(str, obj.columns)),
+                                  [str(t) for t in obj.dtypes]]).encode())
+        try:
+            hasher.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+        except TypeError:
+            # Unhashable cell values (lists/dicts): fall back to their string form
+            hasher.update(pd.util.hash_pandas_object(obj.astype(str), index=True).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        return dataframe_fingerprint(obj.to_frame())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            hasher.update(str(key).encode())
+            hasher.update(dataframe_fingerprint(obj[key]).encode())
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            hasher.update(dataframe_fingerprint(item).encode())
+    else:
+        hasher.update(json.dumps(obj, sort_keys=True, default=str).encode())
+
+    return hasher.hexdigest()
+
+def hashable_values(series: pd.Series) -> pd.Series:
+    """Normalize a column so equal values hash equally whatever their storage dtype"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors='coerce').astype('float64')
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_convert(None)
+        values = series.astype('datetime64[ns]')
+        return values.astype('int64').where(values.notna(), None).astype(object)
+    return series.astype(object).where(series.notna(), None)
+
+def row_content_hash(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.Series:
+    """Vectorized 64-bit content fingerprint per row
+
+    Hashes the given columns (default: all except `_`-prefixed metadata) in
+    name order, after normalizing dtypes, so a row keeps its hash across
+    runs, dtype downcasts and parquet round trips. Adding or removing a
+    hashed column changes every hash.
+    """
+    if columns is None:
+        columns = [c for c in df.columns if not str(c).startswith('_')]
+    columns = sorted(columns, key=str)
+    if not columns:
+        return pd.Series(0, index=df.index, dtype='uint64')
+    normalized = pd.DataFrame({col: hashable_values(df[col]) for col in columns}, index=df.index)
+    hashes = pd.util.hash_pandas_object(normalized, index=False)
+    # Column names take part so renames and schema changes are detected
+    salt = int(hashlib.blake2b(json.dumps(list(map(str, columns))).encode(),
+                               digest_size=8).hexdigest(), 16)
+    return (hashes ^ np.uint64(salt)).rename(None)
+
 def create_natural_key(df: pd.DataFrame, key_cols: List[str]) -> pd.Series:
     """Create natural key from multiple columns"""
     # Combine columns with separator
@@ -156,18 +226,33 @@ def detect_column_types(df: pd.DataFrame) -> Dict[str, str]:
 
     return type_mapping
 
-def calculate_data_quality_score(df: pd.DataFrame) -> Dict[str, Any]:
-    """Calculate data quality metrics"""
+def calculate_data_quality_score(df: pd.DataFrame, approximate: bool = False,
+                                 precision: int = 12) -> Dict[str, Any]:
+    """Calculate data quality metrics
+
+    With `approximate=True` duplicate rows are estimated from a HyperLogLog
+    sketch of row hashes instead of an exact `duplicated()` pass.
+    """
     total_cells = df.shape[0] * df.shape[1]
     null_cells = df.isnull().sum().sum()
 
+    if approximate and len(df):
+        try:
+            row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        except TypeError:
+            row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+        distinct_rows = len(HyperLogLog(precision).update_hashes(row_hashes))
+        duplicate_rows = max(len(df) - distinct_rows, 0)
+    else:
+        duplicate_rows = df.duplicated().sum()
+
     quality_score = {
         "completeness": 1 - (null_cells / total_cells) if total_cells > 0 else 1,
         "row_count": len(df),
         "column_count": len(df.columns),
         "null_count": int(null_cells),
         "null_percentage": (null_cells / total_cells * 100) if total_cells > 0 else 0,
-        "duplicate_rows": df.duplicated().sum(),
+        "duplicate_rows": duplicate_rows,
         "columns_with_nulls": df.isnull().any().sum()
     }
 
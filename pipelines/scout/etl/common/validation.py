@@ -0,0 +1,328 @@
+"""
+Declarative data validation for Scout ETL Pipeline
+Compile configured per-table rules into plans that share vectorized passes
+"""
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .config import Config, cfg, get_config
+from .log import ETLRun
+
+# Checks evaluated per row; these run on a sample of large tables
+ROW_CHECKS = ('not_null', 'range', 'allowed', 'references')
+TABLE_CHECKS = ('row_count', 'row_count_delta', 'required_columns', 'completeness', 'unique')
+
+_CASE_FUNCS = {
+    "upper": str.upper,
+    "lower": str.lower,
+    None: lambda s: s,
+}
+
+@dataclass(frozen=True)
+class Rule:
+    """One configured check"""
+    name: str
+    check: str
+    columns: Tuple[str, ...] = ()
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    values: Tuple[Any, ...] = ()
+    case: Optional[str] = None
+    ref_table: Optional[str] = None
+    ref_key: Optional[str] = None
+    severity: str = "error"
+    max_fraction: float = 0.0
+
+@dataclass
+class RuleResult:
+    """Outcome of one rule; `violations` is estimated for the full table when sampled"""
+    rule: str
+    check: str
+    severity: str
+    passed: bool
+    violations: int
+    checked: int
+    value: Optional[float] = None
+    sampled: bool = False
+    message: str = ""
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    """Execution plan for one layer/table and one column layout
+
+    Rules share passes: one null count over the columns that need it,
+    one extraction (and for `allowed`, one factorization) per value
+    column, and a single sample drawn for all row-level checks.
+    """
+    layer: str
+    table: str
+    rules: Tuple[Rule, ...]
+    sample_rows: Optional[int]
+    null_columns: Optional[Tuple[str, ...]]
+
+    def execute(self, df: pd.DataFrame, frames: Optional[Dict[str, Any]] = None,
+                previous_rows: Optional[int] = None) -> List[RuleResult]:
+        n = len(df)
+        sample, sampled = df, False
+        if self.sample_rows and n > self.sample_rows:
+            positions = np.sort(np.random.default_rng(0).choice(n, self.sample_rows, replace=False))
+            sample, sampled = df.iloc[positions], True
+        m = len(sample)
+
+        # Null pass (all columns when completeness is checked)
+        null_counts = None
+        if self.null_columns is not None:
+            frame = sample if not self.null_columns else sample[list(self.null_columns)]
+            null_counts = frame.isna().sum()
+
+        value_cache: Dict[Tuple[str, str], Any] = {}
+        results = []
+        for rule in self.rules:
+            if rule.check in ROW_CHECKS:
+                bad = self._row_violations(rule, sample, null_counts, value_cache, frames)
+                if bad is None:
+                    continue
+                estimated = int(round(bad * n / m)) if sampled and m else bad
+                results.append(_fraction_result(rule, estimated, n, sampled))
+            else:
+                results.append(self._table_result(rule, df, sample, null_counts, previous_rows))
+        return results
+
+    def _row_violations(self, rule: Rule, sample: pd.DataFrame, null_counts: Optional[pd.Series],
+                        value_cache: Dict[Tuple[str, str], Any], frames: Optional[Dict[str, Any]]) -> Optional[int]:
+        if rule.check == 'not_null':
+            return int(null_counts[list(rule.columns)].sum())
+
+        column = rule.columns[0]
+        if rule.check == 'range':
+            if ('numeric', column) not in value_cache:
+                value_cache[('numeric', column)] = pd.to_numeric(
+                    sample[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            values = value_cache[('numeric', column)]
+            bad = np.zeros(len(values), dtype=bool)
+            if rule.minimum is not None:
+                bad |= values < rule.minimum
+            if rule.maximum is not None:
+                bad |= values > rule.maximum
+            return int(bad.sum())
+
+        if ('codes', column) not in value_cache:
+            value_cache[('codes', column)] = pd.factorize(sample[column], use_na_sentinel=True)
+        codes, uniques = value_cache[('codes', column)]
+
+        if rule.check == 'allowed':
+            case_func = _CASE_FUNCS[rule.case]
+            allowed = set(rule.values)
+            ok = np.array([(case_func(u) if isinstance(u, str) else u) in allowed for u in uniques],
+                          dtype=bool)
+            return int(((codes >= 0) & ~np.append(ok, True)[codes]).sum())
+
+        # references: distinct values are checked against the other table's keys once
+        other = (frames or {}).get(rule.ref_table)
+        if not isinstance(other, pd.DataFrame) or rule.ref_key not in other.columns:
+            return None
+        known = pd.Index(other[rule.ref_key].dropna().unique())
+        ok = pd.Index(uniques).isin(known)
+        return int(((codes >= 0) & ~np.append(ok, True)[codes]).sum())
+
+    def _table_result(self, rule: Rule, df: pd.DataFrame, sample: pd.DataFrame,
+                      null_counts: Optional[pd.Series], previous_rows: Optional[int]) -> RuleResult:
+        n = len(df)
+        if rule.check == 'required_columns':
+            missing = [c for c in rule.columns if c not in df.columns]
+            return RuleResult(rule.name, rule.check, rule.severity, not missing, len(missing),
+                              len(rule.columns), message=f"Missing columns: {missing}" if missing else "")
+
+        if rule.check == 'row_count':
+            passed = (rule.minimum is None or n >= rule.minimum) and \
+                     (rule.maximum is None or n <= rule.maximum)
+            message = "Empty dataset" if n == 0 else f"Row count {n} outside expected range"
+            return RuleResult(rule.name, rule.check, rule.severity, passed, int(not passed), n,
+                              value=n, message="" if passed else message)
+
+        if rule.check == 'row_count_delta':
+            if not previous_rows:
+                return RuleResult(rule.name, rule.check, rule.severity, True, 0, n)
+            change = abs(n - previous_rows) / previous_rows
+            passed = rule.maximum is None or change <= rule.maximum
+            return RuleResult(rule.name, rule.check, rule.severity, passed, int(not passed), n,
+                              value=round(change, 4),
+                              message="" if passed else
+                              f"Row count changed {change:.0%} ({previous_rows} -> {n})")
+
+        if rule.check == 'completeness':
+            total_cells = sample.shape[0] * sample.shape[1]
+            completeness = 1 - null_counts.sum() / total_cells if total_cells > 0 else 1.0
+            passed = rule.minimum is None or completeness >= rule.minimum
+            return RuleResult(rule.name, rule.check, rule.severity, passed, int(not passed),
+                              total_cells, value=float(completeness), sampled=len(sample) < n,
+                              message="" if passed else
+                              f"Low data quality: {completeness:.2%} completeness")
+
+        # unique: always on all rows, duplicates in a sample say little about the table
+        duplicates = int(df.duplicated(subset=list(rule.columns), keep='first').sum())
+        return _fraction_result(rule, duplicates, n, False)
+
+def _fraction_result(rule: Rule, violations: int, rows: int, sampled: bool) -> RuleResult:
+    fraction = violations / rows if rows else 0.0
+    passed = violations == 0 or fraction <= rule.max_fraction
+    label = ", ".join(rule.columns)
+    return RuleResult(rule.name, rule.check, rule.severity, passed, violations, rows,
+                      value=round(fraction, 6), sampled=sampled,
+                      message="" if passed else
+                      f"{rule.check} failed on {label}: {violations} rows ({fraction:.2%})"
+                      f"{' (estimated from sample)' if sampled else ''}")
+
+def _parse_rule(spec: Dict[str, Any]) -> Rule:
+    check = spec.get("check")
+    if check not in ROW_CHECKS + TABLE_CHECKS:
+        raise ValueError(f"Unsupported validation check '{check}'")
+    columns = spec.get("columns") or ([spec["column"]] if spec.get("column") else [])
+    if check in ROW_CHECKS and check != 'not_null' and len(columns) != 1:
+        raise ValueError(f"Validation check '{check}' needs exactly one column")
+    if spec.get("case") not in _CASE_FUNCS:
+        raise ValueError(f"Unsupported case '{spec.get('case')}' in validation check '{check}'")
+    severity = spec.get("severity", "error")
+    if severity not in ("error", "warn"):
+        raise ValueError(f"Unsupported severity '{severity}' in validation check '{check}'")
+
+    maximum = spec.get("max_change") if check == 'row_count_delta' else spec.get("max")
+    case_func = _CASE_FUNCS[spec.get("case")]
+    return Rule(
+        name=spec.get("name") or "_".join([check] + list(columns)),
+        check=check,
+        columns=tuple(columns),
+        minimum=spec.get("min"),
+        maximum=maximum,
+        values=tuple(case_func(v) if isinstance(v, str) else v for v in spec.get("values") or []),
+        case=spec.get("case"),
+        ref_table=spec.get("table"),
+        ref_key=spec.get("key") or (columns[0] if columns else None),
+        severity=severity,
+        max_fraction=float(spec.get("max_fraction", 0.0)),
+    )
+
+def get_plan(layer: str, table: str, columns: List[str]) -> ValidationPlan:
+    """Return the cached plan for a layer/table given its columns"""
+    # Keyed by the live Config, so plans are recompiled after reload_config()
+    return _compile_plan(get_config(), layer, table, tuple(columns))
+
+@lru_cache(maxsize=128)
+def _compile_plan(config: Config, layer: str, table: str,
+                  columns: Tuple[str, ...]) -> ValidationPlan:
+    """Compile layer defaults plus table rules against a concrete column layout
+
+    Rules on columns the table does not have are dropped (presence is
+    what `required_columns` checks).
+    """
+    layer_spec: Dict[str, Any] = (config.validation_rules or {}).get(layer) or {}
+    table_spec: Dict[str, Any] = (layer_spec.get("tables") or {}).get(table) or {}
+    present = set(columns)
+
+    rules = []
+    for spec in list(layer_spec.get("defaults") or []) + list(table_spec.get("rules") or []):
+        rule = _parse_rule(spec)
+        if rule.check in ROW_CHECKS + ('unique',) and not present.issuperset(rule.columns):
+            continue
+        rules.append(rule)
+
+    checks = {rule.check for rule in rules}
+    if 'completeness' in checks:
+        null_columns: Optional[Tuple[str, ...]] = ()
+    elif 'not_null' in checks:
+        null_columns = tuple(dict.fromkeys(c for r in rules if r.check == 'not_null' for c in r.columns))
+    else:
+        null_columns = None
+
+    sample_rows = table_spec.get("sample_rows", layer_spec.get("sample_rows"))
+    return ValidationPlan(
+        layer=layer,
+        table=table,
+        rules=tuple(rules),
+        sample_rows=int(sample_rows) if sample_rows else None,
+        null_columns=null_columns,
+    )
+
+def _load_counts(path: Path) -> Dict[str, int]:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_counts(path: Path, counts: Dict[str, int]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(counts, f)
+    os.replace(tmp_path, path)
+
+def validate_tables(layer: str, frames: Dict[str, Any], run: ETLRun,
+                    tables: Optional[List[str]] = None,
+                    state_path: Optional[str] = None) -> Dict[str, List[RuleResult]]:
+    """Run the configured rules of `layer` over `frames` (or just `tables`)
+
+    Every rule logs `<layer>_<table>_<rule>_violations`, each table
+    `<layer>_<table>_validation_passed`, and completeness checks
+    `<layer>_<table>_quality_score`. Failed rules are logged as errors;
+    only `error` severity fails the table. Row counts are persisted at
+    cfg.validation_state_path for `row_count_delta` rules.
+    """
+    start_time = pd.Timestamp.now()
+    path = Path(state_path or cfg.validation_state_path)
+    counts: Optional[Dict[str, int]] = None
+    report: Dict[str, List[RuleResult]] = {}
+
+    try:
+        for table in tables if tables is not None else list(frames):
+            df = frames.get(table)
+            if not isinstance(df, pd.DataFrame):
+                continue
+            plan = get_plan(layer, table, list(df.columns))
+
+            state_key = f"{layer}.{table}"
+            tracks_count = any(rule.check == 'row_count_delta' for rule in plan.rules)
+            if tracks_count and counts is None:
+                counts = _load_counts(path)
+            results = plan.execute(df, frames,
+                                   previous_rows=counts.get(state_key) if tracks_count else None)
+            if tracks_count:
+                counts[state_key] = len(df)
+
+            table_passed = True
+            for result in results:
+                run.log_metric(f"{layer}_{table}_{result.rule}_violations", result.violations)
+                if result.check == 'completeness':
+                    run.log_metric(f"{layer}_{table}_quality_score", result.value)
+                if not result.passed:
+                    run.log_error(f"{layer}_validation_{table}", result.message,
+                                  rule=result.rule, severity=result.severity)
+                    if result.severity == 'error':
+                        table_passed = False
+
+            run.log_metric(f"{layer}_{table}_validation_passed", table_passed)
+            report[table] = results
+
+        if counts is not None:
+            _save_counts(path, counts)
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step(f"{layer}_validation", "success",
+                    duration_ms=duration_ms,
+                    tables=len(report),
+                    rules=sum(len(results) for results in report.values()),
+                    failed=sum(not r.passed for results in report.values() for r in results),
+                    sampled=sorted(t for t, results in report.items() if any(r.sampled for r in results)))
+        return report
+
+    except Exception as e:
+        run.log_error(f"{layer}_validation", str(e))
+        raise
+
+def report_passed(report: Dict[str, List[RuleResult]]) -> bool:
+    """True when no `error` severity rule failed"""
+    return all(r.passed or r.severity != 'error' for results in report.values() for r in results)
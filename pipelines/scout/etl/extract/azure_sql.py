@@ -2,18 +2,23 @@
 Azure SQL Server data extraction for Scout ETL Pipeline
 """
 import pandas as pd
-import sqlalchemy as sa
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, Tuple
 from ..common.config import cfg
 from ..common.log import ETLRun
-from ..common.io import clean_dataframe, infer_datatypes
+from ..common.io import clean_dataframe, infer_datatypes, dataframe_chunks
 
-def create_azure_connection() -> Optional[sa.engine.Engine]:
+if TYPE_CHECKING:
+    import sqlalchemy as sa
+
+def create_azure_connection() -> Optional["sa.engine.Engine"]:
     """Create Azure SQL connection"""
     if not cfg.validate_azure_config():
         print("⚠️ Azure SQL configuration not available")
         return None
 
+    # The driver stack is only imported when Azure SQL is actually used
+    import sqlalchemy as sa
+
     try:
         # Build connection string
         connection_string = (
@@ -34,6 +39,41 @@ def create_azure_connection() -> Optional[sa.engine.Engine]:
         print(f"❌ Failed to connect to Azure SQL: {e}")
         return None
 
+# Extraction window shared by the full read and the streamed read
+SALES_WINDOW = "TransactionDate >= DATEADD(day, -90, GETDATE())"
+
+SALES_QUERY = f"""
+SELECT
+    InteractionID,
+    StoreID,
+    DeviceID,
+    ProductID,
+    CustomerID,
+    TransactionDate,
+    TransactionTime,
+    Quantity,
+    UnitPrice,
+    TotalAmount,
+    PaymentMethod,
+    Category,
+    Brand,
+    ProductName,
+    SKU,
+    CAST(TransactionDate AS VARCHAR) + ' ' +
+    CAST(TransactionTime AS VARCHAR) as TransactionTimestamp
+FROM SalesInteractions
+WHERE {SALES_WINDOW}
+ORDER BY TransactionDate DESC, TransactionTime DESC
+"""
+
+def _prepare_sales(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean and type a frame (or chunk) of sales interactions"""
+    df = clean_dataframe(df)
+    numeric_cols = ['Quantity', 'UnitPrice', 'TotalAmount', 'StoreID', 'DeviceID']
+    date_cols = ['TransactionDate', 'TransactionTimestamp']
+    return infer_datatypes(df, numeric_cols=numeric_cols, date_cols=date_cols,
+                           source_name='sales')
+
 def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
     """Extract sales interactions from Azure SQL"""
     start_time = pd.Timestamp.now()
@@ -46,43 +86,12 @@ def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
         return _mock_sales_interactions()
 
     try:
-        query = """
-        SELECT
-            InteractionID,
-            StoreID,
-            DeviceID,
-            ProductID,
-            CustomerID,
-            TransactionDate,
-            TransactionTime,
-            Quantity,
-            UnitPrice,
-            TotalAmount,
-            PaymentMethod,
-            Category,
-            Brand,
-            ProductName,
-            SKU,
-            CAST(TransactionDate AS VARCHAR) + ' ' +
-            CAST(TransactionTime AS VARCHAR) as TransactionTimestamp
-        FROM SalesInteractions
-        WHERE TransactionDate >= DATEADD(day, -90, GETDATE())
-        ORDER BY TransactionDate DESC, TransactionTime DESC
-        """
-
-        df = pd.read_sql(query, engine)
-
-        # Clean and process data
-        df = clean_dataframe(df)
-
-        # Infer data types
-        numeric_cols = ['Quantity', 'UnitPrice', 'TotalAmount', 'StoreID', 'DeviceID']
-        date_cols = ['TransactionDate', 'TransactionTimestamp']
-        df = infer_datatypes(df, numeric_cols=numeric_cols, date_cols=date_cols)
+        df = _prepare_sales(pd.read_sql(SALES_QUERY, engine))
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("pull_sales_interactions", "success",
-                    duration_ms=duration_ms, rows=len(df))
+                    duration_ms=duration_ms, rows=len(df),
+                    bytes_read=int(df.memory_usage(index=False, deep=True).sum()))
         run.log_metric("sales_interactions_extracted", len(df))
 
         return df
@@ -93,6 +102,59 @@ def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
         # Return mock data as fallback
         return _mock_sales_interactions()
 
+def stream_sales_interactions(run: ETLRun, chunk_rows: Optional[int] = None
+                              ) -> Tuple[int, Iterator[pd.DataFrame]]:
+    """Extract sales interactions as typed chunks of `chunk_rows` rows
+
+    Returns the window's row count (for sizing spills up front) and an
+    iterator that reads the window with a server-side cursor, so only one
+    chunk (cfg.bronze_chunk_rows) is held in memory at a time.
+    """
+    chunk_rows = chunk_rows or cfg.bronze_chunk_rows
+
+    engine = create_azure_connection()
+    if engine is None:
+        run.log_step("pull_sales_interactions", "skipped",
+                    note="Azure SQL not configured, using mock data")
+        mock = _mock_sales_interactions()
+        return len(mock), dataframe_chunks(mock, chunk_rows)
+
+    import sqlalchemy as sa
+
+    try:
+        with engine.connect() as conn:
+            expected_rows = int(conn.execute(
+                sa.text(f"SELECT COUNT(*) FROM SalesInteractions WHERE {SALES_WINDOW}")
+            ).scalar())
+    except Exception as e:
+        run.log_error("pull_sales_interactions", str(e))
+        raise
+
+    def read_chunks() -> Iterator[pd.DataFrame]:
+        start_time = pd.Timestamp.now()
+        rows = chunks = bytes_read = 0
+        try:
+            with engine.connect().execution_options(stream_results=True) as conn:
+                for chunk in pd.read_sql(sa.text(SALES_QUERY), conn, chunksize=chunk_rows):
+                    chunk = _prepare_sales(chunk)
+                    rows += len(chunk)
+                    chunks += 1
+                    bytes_read += int(chunk.memory_usage(index=False, deep=True).sum())
+                    yield chunk
+
+            duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+            run.log_step("pull_sales_interactions", "success",
+                        duration_ms=duration_ms, rows=rows, chunks=chunks,
+                        bytes_read=bytes_read)
+            run.log_metric("sales_interactions_extracted", rows)
+
+        except Exception as e:
+            # Chunks may already be spilled, so there is no mock fallback here
+            run.log_error("pull_sales_interactions", str(e))
+            raise
+
+    return expected_rows, read_chunks()
+
 def pull_stores(run: ETLRun) -> pd.DataFrame:
     """Extract store information from Azure SQL"""
     start_time = pd.Timestamp.now()
@@ -131,11 +193,13 @@ def pull_stores(run: ETLRun) -> pd.DataFrame:
         # Infer data types
         numeric_cols = ['StoreID', 'Latitude', 'Longitude']
         date_cols = ['OpenDate']
-        df = infer_datatypes(df, numeric_cols=numeric_cols, date_cols=date_cols)
+        df = infer_datatypes(df, numeric_cols=numeric_cols, date_cols=date_cols,
+                             source_name='stores')
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("pull_stores", "success",
-                    duration_ms=duration_ms, rows=len(df))
+                    duration_ms=duration_ms, rows=len(df),
+                    bytes_read=int(df.memory_usage(index=False, deep=True).sum()))
         run.log_metric("stores_extracted", len(df))
 
         return df
@@ -3,7 +3,6 @@ Google Drive JSON/CSV data extraction for Scout ETL Pipeline
 """
 import pandas as pd
 import json
-import requests
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from ..common.config import cfg
@@ -35,7 +34,8 @@ def pull_devices(run: ETLRun) -> pd.DataFrame:
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("pull_devices", "success",
-                    duration_ms=duration_ms, rows=len(devices_df))
+                    duration_ms=duration_ms, rows=len(devices_df),
+                    bytes_read=int(devices_df.memory_usage(index=False, deep=True).sum()))
         run.log_metric("devices_extracted", len(devices_df))
 
         return devices_df
@@ -64,7 +64,8 @@ def pull_campaign_data(run: ETLRun) -> pd.DataFrame:
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("pull_campaign_data", "success",
-                    duration_ms=duration_ms, rows=len(campaign_df))
+                    duration_ms=duration_ms, rows=len(campaign_df),
+                    bytes_read=int(campaign_df.memory_usage(index=False, deep=True).sum()))
         run.log_metric("campaign_data_extracted", len(campaign_df))
 
         return campaign_df
@@ -3,19 +3,24 @@ Supabase REST API data extraction for Scout ETL Pipeline
 Used for reference data and incremental loads
 """
 import pandas as pd
-import requests
-from typing import Optional, Dict, Any, List
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, List
 from ..common.config import cfg
 from ..common.log import ETLRun
 from ..common.io import clean_dataframe
+from ..common.key_index import KeyIndex
 
-def create_supabase_client(use_service_role: bool = False) -> Optional[Client]:
+if TYPE_CHECKING:
+    from supabase import Client
+
+def create_supabase_client(use_service_role: bool = False) -> Optional["Client"]:
     """Create Supabase client for data extraction"""
     if not cfg.validate_supabase_config(require_service_role=use_service_role):
         print("⚠️ Supabase configuration not available")
         return None
 
+    # The client library is only imported when Supabase is actually used
+    from supabase import create_client
+
     try:
         if use_service_role and cfg.supabase_service_role:
             supabase = create_client(cfg.supabase_url, cfg.supabase_service_role)
@@ -52,7 +57,8 @@ def pull_reference_data(run: ETLRun, table_name: str) -> pd.DataFrame:
 
             duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
             run.log_step(f"pull_reference_{table_name}", "success",
-                        duration_ms=duration_ms, rows=len(df))
+                        duration_ms=duration_ms, rows=len(df),
+                        bytes_read=int(df.memory_usage(index=False, deep=True).sum()))
             run.log_metric(f"{table_name}_extracted", len(df))
 
             return df
@@ -67,7 +73,11 @@ def pull_reference_data(run: ETLRun, table_name: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 def pull_existing_transactions(run: ETLRun, limit: int = 10000) -> pd.DataFrame:
-    """Pull existing transactions for incremental processing"""
+    """Pull the most recent existing transactions
+
+    Only the latest `limit` rows are returned; to skip already-loaded
+    interactions use the local key indexes (`common.key_index.drop_loaded_rows`).
+    """
     start_time = pd.Timestamp.now()
 
     supabase = create_supabase_client()
@@ -90,7 +100,8 @@ def pull_existing_transactions(run: ETLRun, limit: int = 10000) -> pd.DataFrame:
 
             duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
             run.log_step("pull_existing_transactions", "success",
-                        duration_ms=duration_ms, rows=len(df))
+                        duration_ms=duration_ms, rows=len(df),
+                        bytes_read=int(df.memory_usage(index=False, deep=True).sum()))
             run.log_metric("existing_transactions_extracted", len(df))
 
             return df
@@ -104,6 +115,56 @@ def pull_existing_transactions(run: ETLRun, limit: int = 10000) -> pd.DataFrame:
         print(f"❌ Failed to extract existing transactions: {e}")
         return pd.DataFrame()
 
+def iter_loaded_keys(supabase: "Client", table: str, column: str,
+                     page_size: Optional[int] = None) -> Iterator[pd.Series]:
+    """Page through every non-null value of `column`, in key order"""
+    page_size = page_size or cfg.batch_size
+    last = None
+    while True:
+        query = (supabase.table(table)
+                 .select(column)
+                 .not_.is_(column, 'null')
+                 .order(column)
+                 .limit(page_size))
+        if last is not None:
+            query = query.gt(column, last)
+        rows = query.execute().data or []
+        if not rows:
+            return
+        values = [row[column] for row in rows]
+        yield pd.Series(values)
+        if len(values) < page_size:
+            return
+        last = values[-1]
+
+def rebuild_key_index(run: ETLRun, index: Optional[KeyIndex] = None,
+                      table: str = 'scout_gold_transactions_flat',
+                      column: str = 'transaction_id',
+                      page_size: Optional[int] = None) -> int:
+    """Rebuild a local key index from every key loaded into the warehouse"""
+    start_time = pd.Timestamp.now()
+
+    supabase = create_supabase_client()
+    if supabase is None:
+        run.log_step(f"rebuild_key_index_{column}", "skipped",
+                    note="Supabase not configured")
+        return 0
+
+    try:
+        index = index or KeyIndex(column)
+        size = index.rebuild(iter_loaded_keys(supabase, table, column, page_size))
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step(f"rebuild_key_index_{column}", "success",
+                    duration_ms=duration_ms, keys=size, table=table)
+        run.log_metric(f"key_index_{index.name}_size", size)
+        return size
+
+    except Exception as e:
+        run.log_error(f"rebuild_key_index_{column}", str(e))
+        print(f"❌ Failed to rebuild key index from {table}: {e}")
+        raise
+
 def check_data_freshness(run: ETLRun) -> Dict[str, Any]:
     """Check the freshness of data in Supabase tables"""
     supabase = create_supabase_client()
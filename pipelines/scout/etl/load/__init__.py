@@ -0,0 +1 @@
+# Scout ETL Load Modules
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""
+Postgres bulk loader for Scout ETL Pipeline
+COPY into staging tables, then upsert into targets with INSERT ... ON CONFLICT
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, List, Set, Tuple
+import numpy as np
+import pandas as pd
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.io import dataframe_chunks
+from ..common.spill import SpillStore
+
+if TYPE_CHECKING:
+    import sqlalchemy as sa
+
+# Frame name -> (target table, key columns). Targets must exist; upserted
+# targets need a unique constraint on the key (NULLS NOT DISTINCT where key
+# columns can be null, as gold dimensions can). tables.yaml entries can
+# override both with `load_table` and `conflict_keys`.
+LOAD_TARGETS = {
+    'stores': ('scout_silver_stores', ['store_id']),
+    'devices': ('scout_silver_devices', ['device_id']),
+    'interactions': ('scout_silver_interactions', ['interaction_key']),
+    'transactions': ('scout_silver_transactions', ['transaction_key']),
+    'daily_sales': ('scout_gold_daily_sales',
+                    ['date_key', 'store_id', 'brand', 'category', 'payment_method']),
+}
+
+# Frames whose key is shared by several rows (line items share their
+# interaction_key): the target rows of each loaded key are deleted and the
+# frame's rows inserted, so these targets need no unique constraint.
+# tables.yaml `load_mode: replace|upsert` overrides.
+REPLACE_KEY_FRAMES = {'interactions'}
+
+NULL_MARKER = r'\N'
+
+def create_postgres_engine(pool_size: Optional[int] = None) -> Optional["sa.engine.Engine"]:
+    """Create the Postgres load engine (one pooled connection per parallel table)"""
+    if not cfg.validate_postgres_config():
+        print("⚠️ Postgres load target not configured")
+        return None
+
+    # The driver stack is only imported when the load target is actually used
+    import sqlalchemy as sa
+
+    try:
+        size = pool_size or cfg.load_max_connections
+        engine = sa.create_engine(cfg.postgres_url, pool_size=size, max_overflow=0,
+                                  pool_pre_ping=True)
+
+        # Test connection
+        with engine.connect() as conn:
+            conn.execute(sa.text("SELECT 1"))
+
+        print("✅ Postgres load connection established")
+        return engine
+
+    except Exception as e:
+        print(f"❌ Failed to connect to Postgres: {e}")
+        return None
+
+def resolve_target(name: str) -> Optional[Tuple[str, List[str], bool]]:
+    """Target table, key columns and whether keys are replaced (None if not loadable)"""
+    table_config = cfg.get_table_config(name) or {}
+    default = LOAD_TARGETS.get(name)
+    if default is None and 'load_table' not in table_config:
+        return None
+    table, keys = default or (None, [])
+    mode = table_config.get('load_mode', 'replace' if name in REPLACE_KEY_FRAMES else 'upsert')
+    return (table_config.get('load_table', table), list(table_config.get('conflict_keys', keys)),
+            mode == 'replace')
+
+def _quote(engine: "sa.engine.Engine", name: str) -> str:
+    return engine.dialect.identifier_preparer.quote(name)
+
+def build_upsert_sql(engine: "sa.engine.Engine", table: str, staging: str,
+                     columns: List[str], key_columns: List[str]) -> str:
+    """INSERT ... SELECT from staging with ON CONFLICT on the key columns"""
+    quoted = [_quote(engine, c) for c in columns]
+    keys = ", ".join(_quote(engine, c) for c in key_columns)
+    updates = [f"{_quote(engine, c)} = EXCLUDED.{_quote(engine, c)}"
+               for c in columns if c not in key_columns]
+    action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+    column_list = ", ".join(quoted)
+    return (f"INSERT INTO {_quote(engine, table)} ({column_list}) "
+            f"SELECT {column_list} FROM {_quote(engine, staging)} "
+            f"ON CONFLICT ({keys}) {action}")
+
+def build_insert_sql(engine: "sa.engine.Engine", table: str, staging: str,
+                     columns: List[str]) -> str:
+    """Plain INSERT ... SELECT from staging (keys already cleared)"""
+    column_list = ", ".join(_quote(engine, c) for c in columns)
+    return (f"INSERT INTO {_quote(engine, table)} ({column_list}) "
+            f"SELECT {column_list} FROM {_quote(engine, staging)}")
+
+def chunk_to_csv(df: pd.DataFrame) -> io.StringIO:
+    """Serialize a chunk for COPY ... (FORMAT csv, NULL '\\N')"""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=NULL_MARKER,
+              date_format='%Y-%m-%d %H:%M:%S.%f')
+    buffer.seek(0)
+    return buffer
+
+def _prepare_chunk(chunk: pd.DataFrame, columns: List[str],
+                   integer_columns: Set[str]) -> pd.DataFrame:
+    """Select load columns; integer targets get nullable ints, not floats like 1.0"""
+    chunk = chunk[columns]
+    floats = [c for c in columns if c in integer_columns and pd.api.types.is_float_dtype(chunk[c])]
+    if floats:
+        chunk = chunk.astype({c: 'Int64' for c in floats})
+    return chunk
+
+def _copy(cursor: Any, sql: str, buffer: io.StringIO) -> None:
+    """Stream a buffer through COPY FROM STDIN (psycopg2 or psycopg 3)"""
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(sql, buffer)
+    else:
+        with cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+def _key_aligned_chunks(df: pd.DataFrame, key_columns: List[str],
+                        chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Chunks of about `chunk_size` rows that never split the rows of a key"""
+    codes = df.groupby(key_columns, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    df, codes = df.iloc[order], codes[order]
+    key_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    # Cut at the first key starting at or after each multiple of chunk_size
+    cuts = np.searchsorted(key_starts, np.arange(0, len(df), chunk_size))
+    bounds = np.unique(np.r_[key_starts[cuts[cuts < len(key_starts)]], len(df)])
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        yield df.iloc[start:end]
+
+def _frame_chunks(frame: Any, key_columns: List[str], chunk_size: int,
+                  replace: bool = False) -> Iterator[pd.DataFrame]:
+    """Chunks of about `chunk_size` rows
+
+    Upserted frames keep one row per key (the last one wins); replaced
+    frames keep every row, with all rows of a key in the same chunk.
+    """
+    parts = (df for _, df in frame.iter_buckets()) if isinstance(frame, SpillStore) else [frame]
+    for part in parts:
+        if part.empty:
+            continue
+        if replace:
+            yield from _key_aligned_chunks(part, key_columns, chunk_size)
+            continue
+        # A key may only be upserted once per INSERT statement
+        part = part.drop_duplicates(subset=key_columns, keep='last')
+        yield from dataframe_chunks(part, chunk_size)
+
+def build_delete_sql(engine: "sa.engine.Engine", table: str, staging: str,
+                     key_columns: List[str]) -> str:
+    """DELETE target rows whose key is in staging (null keys match null keys)"""
+    match = " AND ".join(
+        f"t.{_quote(engine, c)} IS NOT DISTINCT FROM s.{_quote(engine, c)}" for c in key_columns
+    )
+    return f"DELETE FROM {_quote(engine, table)} t USING {_quote(engine, staging)} s WHERE {match}"
+
+def copy_upsert(engine: "sa.engine.Engine", frame: Any, table: str,
+                key_columns: List[str], batch_size: Optional[int] = None,
+                deletes: Optional[pd.DataFrame] = None,
+                replace: bool = False) -> Dict[str, Any]:
+    """Load a frame (or spilled frame) into `table` chunk by chunk
+
+    Each chunk of `batch_size` rows (cfg.batch_size) is COPYed into a
+    temporary staging table and merged with one INSERT ... ON CONFLICT,
+    in its own transaction. With `replace`, the chunk's keys are instead
+    deleted from the target and all of its rows inserted, in the same
+    transaction. Only columns present in both the frame and the target are
+    written. Keys in `deletes` are COPYed into a key-only staging table and
+    removed from the target first.
+    """
+    import sqlalchemy as sa
+
+    start_time = pd.Timestamp.now()
+    batch_size = batch_size or cfg.batch_size
+    table_columns = sa.inspect(engine).get_columns(table)
+    target_columns = {c['name'] for c in table_columns}
+    integer_columns = {c['name'] for c in table_columns if isinstance(c['type'], sa.Integer)}
+    missing_keys = [k for k in key_columns if k not in target_columns]
+    if missing_keys:
+        raise ValueError(f"Conflict keys {missing_keys} are not columns of {table}")
+
+    staging = f"_stage_{table}"
+    key_staging = f"_stage_keys_{table}"
+    rows = chunks = deleted = 0
+    columns: Optional[List[str]] = None
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {_quote(engine, staging)} "
+                       f"(LIKE {_quote(engine, table)} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+        connection.commit()
+
+        if deletes is not None and not deletes.empty:
+            # Key columns only, without the target's NOT NULL constraints on other columns
+            key_list = ", ".join(_quote(engine, c) for c in key_columns)
+            cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {_quote(engine, key_staging)} "
+                           f"ON COMMIT DELETE ROWS AS SELECT {key_list} "
+                           f"FROM {_quote(engine, table)} WITH NO DATA")
+            connection.commit()
+            key_copy_sql = (f"COPY {_quote(engine, key_staging)} ({key_list}) "
+                            f"FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')")
+            delete_sql = build_delete_sql(engine, table, key_staging, key_columns)
+            for chunk in dataframe_chunks(deletes[key_columns], batch_size):
+                _copy(cursor, key_copy_sql,
+                      chunk_to_csv(_prepare_chunk(chunk, key_columns, integer_columns)))
+                cursor.execute(delete_sql)
+                connection.commit()
+                deleted += len(chunk)
+
+        for chunk in _frame_chunks(frame, key_columns, batch_size, replace):
+            if columns is None:
+                columns = [c for c in chunk.columns if c in target_columns]
+                copy_sql = (f"COPY {_quote(engine, staging)} "
+                            f"({', '.join(_quote(engine, c) for c in columns)}) "
+                            f"FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')")
+                if replace:
+                    write_sqls = [build_delete_sql(engine, table, staging, key_columns),
+                                  build_insert_sql(engine, table, staging, columns)]
+                else:
+                    write_sqls = [build_upsert_sql(engine, table, staging, columns, key_columns)]
+
+            _copy(cursor, copy_sql, chunk_to_csv(_prepare_chunk(chunk, columns, integer_columns)))
+            for sql in write_sqls:
+                cursor.execute(sql)
+            connection.commit()
+            rows += len(chunk)
+            chunks += 1
+
+        cursor.close()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    elapsed = (pd.Timestamp.now() - start_time).total_seconds()
+    return {
+        "table": table,
+        "rows": rows,
+        "deleted": deleted,
+        "chunks": chunks,
+        "duration_ms": int(elapsed * 1000),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def load_tables(frames: Dict[str, Any], run: ETLRun,
+                engine: Optional["sa.engine.Engine"] = None,
+                max_connections: Optional[int] = None,
+                deletes: Optional[Dict[str, pd.DataFrame]] = None,
+                replace_by: Optional[Dict[str, List[str]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Bulk load silver and gold frames into their Postgres targets
+
+    Tables are independent and load in parallel, one connection each
+    (cfg.load_max_connections). `deletes` maps frame names to key rows to
+    remove (e.g. from change detection). `replace_by` maps frame names to
+    columns the frame is complete for (e.g. gold days rebuilt in full):
+    target rows sharing a loaded value are replaced by the frame's rows,
+    so rows that vanished from those values are removed. Returns per-table
+    load stats; rows written and throughput are also logged per table.
+    """
+    start_time = pd.Timestamp.now()
+    deletes = deletes or {}
+    replace_by = replace_by or {}
+    tasks = {}
+    for name in list(frames) + [n for n in deletes if n not in frames]:
+        frame = frames.get(name)
+        target = resolve_target(name)
+        has_rows = frame is not None and len(frame) > 0
+        has_deletes = name in deletes and not deletes[name].empty
+        if target is None or not (has_rows or has_deletes):
+            continue
+        if name in replace_by:
+            target = (target[0], list(replace_by[name]), True)
+        tasks[name] = (frame if has_rows else pd.DataFrame(), *target)
+
+    if not tasks:
+        run.log_step("load_postgres", "skipped", note="Nothing to load")
+        return {}
+
+    if run.dry_run:
+        for name, (frame, table, _, _) in tasks.items():
+            run.log_step(f"load_{name}", "skipped", note="Dry run", table=table, rows=len(frame),
+                         deletes=len(deletes.get(name, [])))
+        return {}
+
+    max_connections = max_connections or cfg.load_max_connections
+    engine = engine or create_postgres_engine(pool_size=max_connections)
+    if engine is None:
+        run.log_step("load_postgres", "skipped", note="Postgres not configured")
+        return {}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_connections, len(tasks))) as pool:
+            futures = {name: pool.submit(copy_upsert, engine, frame, table, keys,
+                                         deletes=deletes.get(name), replace=replace)
+                       for name, (frame, table, keys, replace) in tasks.items()}
+            for name, future in futures.items():
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    run.log_error(f"load_{name}", str(e))
+                    raise
+                results[name] = stats
+                run.log_step(f"load_{name}", "success", **stats)
+                run.log_metric(f"{name}_rows_loaded", stats["rows"])
+                run.log_metric(f"{name}_rows_deleted", stats["deleted"])
+                if stats["rows_per_sec"] is not None:
+                    run.log_metric(f"{name}_load_rows_per_sec", stats["rows_per_sec"])
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("load_postgres", "success",
+                    duration_ms=duration_ms,
+                    tables=len(results),
+                    rows=sum(stats["rows"] for stats in results.values()))
+        return results
+
+    except Exception as e:
+        run.log_error("load_postgres", str(e))
+        raise
@@ -0,0 +1 @@
+# Scout ETL Orchestration Modules
\ No newline at end of file
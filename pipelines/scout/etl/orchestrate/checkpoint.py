@@ -0,0 +1,91 @@
+"""
+Stage checkpoints for Scout ETL Pipeline
+Persist stage outputs keyed by run_id and input fingerprint so failed runs can resume
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import pandas as pd
+from ..common.config import cfg
+from ..common.util import dataframe_fingerprint
+
+class CheckpointStore:
+    """On-disk checkpoints for one run
+
+    Layout: <root>/<run_id>/<stage>.pkl plus <stage>.json holding the
+    input fingerprint the output was computed from and the output's own
+    content fingerprint (which feeds the input fingerprint downstream).
+    """
+
+    def __init__(self, run_id: str, root: Optional[Union[str, Path]] = None):
+        self.run_id = run_id
+        self.root = Path(root or cfg.checkpoint_dir)
+        self.run_path = self.root / run_id
+
+    @staticmethod
+    def input_fingerprint(stage: str, dep_fingerprints: List[str], salt: str = "") -> str:
+        """Fingerprint of a stage's inputs: its name, salt and upstream output fingerprints"""
+        payload = json.dumps([stage, salt, dep_fingerprints])
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _paths(self, stage: str) -> Tuple[Path, Path]:
+        return self.run_path / f"{stage}.pkl", self.run_path / f"{stage}.json"
+
+    def manifest(self, stage: str) -> Optional[Dict[str, Any]]:
+        _, manifest_path = self._paths(stage)
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self, stage: str, input_fp: str) -> bool:
+        """True when a checkpoint exists for these exact inputs"""
+        manifest = self.manifest(stage)
+        data_path, _ = self._paths(stage)
+        return (manifest is not None
+                and manifest.get("input_fingerprint") == input_fp
+                and data_path.exists())
+
+    def load(self, stage: str) -> Tuple[Any, str]:
+        """Return (output, output_fingerprint) for a checkpointed stage"""
+        data_path, _ = self._paths(stage)
+        output = pd.read_pickle(data_path)
+        return output, self.manifest(stage)["output_fingerprint"]
+
+    def save(self, stage: str, output: Any, input_fp: str) -> str:
+        """Persist a stage output atomically; returns its content fingerprint"""
+        self.run_path.mkdir(parents=True, exist_ok=True)
+        data_path, manifest_path = self._paths(stage)
+        output_fp = dataframe_fingerprint(output)
+
+        tmp_data = data_path.with_name(f".{data_path.name}.tmp")
+        pd.to_pickle(output, tmp_data)
+        os.replace(tmp_data, data_path)
+
+        manifest = {
+            "run_id": self.run_id,
+            "stage": stage,
+            "input_fingerprint": input_fp,
+            "output_fingerprint": output_fp,
+            "saved_at": datetime.utcnow().isoformat(),
+        }
+        tmp_manifest = manifest_path.with_name(f".{manifest_path.name}.tmp")
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, manifest_path)
+
+        return output_fp
+
+    def clear(self) -> None:
+        """Remove all checkpoints for this run"""
+        if not self.run_path.exists():
+            return
+        for path in self.run_path.iterdir():
+            path.unlink()
+        self.run_path.rmdir()
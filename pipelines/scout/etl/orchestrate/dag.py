@@ -0,0 +1,203 @@
+"""
+Dependency-graph executor for Scout ETL Pipeline
+Runs independent stages concurrently and reports the critical path
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..common.config import cfg
+from ..common.log import ETLRun
+from .checkpoint import CheckpointStore
+
+@dataclass
+class Stage:
+    """A node in the stage graph
+
+    `func` is called with the outputs of `deps`, positionally and in the
+    declared order. Outputs are passed by reference, never copied.
+    `salt` distinguishes otherwise identical inputs (e.g. an extract
+    window) when checkpointing. A `transient` stage's output is dropped
+    once all of its dependents finished, so large intermediate frames are
+    not held for the rest of the run (it is then missing from the outputs).
+    """
+    name: str
+    func: Callable[..., Any]
+    deps: List[str] = field(default_factory=list)
+    salt: str = ""
+    transient: bool = False
+
+@dataclass
+class DAGResult:
+    """Outputs and timing of a DAG execution"""
+    outputs: Dict[str, Any]
+    timings: Dict[str, Dict[str, float]]
+    critical_path: List[str]
+    critical_path_seconds: float
+    wall_seconds: float
+    resumed: List[str] = field(default_factory=list)
+
+class StageDAG:
+    """Small DAG executor for ETL stages"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+
+    def add(self, name: str, func: Callable[..., Any], deps: Optional[List[str]] = None,
+            salt: str = "", transient: bool = False) -> "StageDAG":
+        """Declare a stage and its dependencies"""
+        if name in self.stages:
+            raise ValueError(f"Stage {name} already declared in {self.name}")
+        self.stages[name] = Stage(name=name, func=func, deps=list(deps or []), salt=salt,
+                                  transient=transient)
+        return self
+
+    def topological_order(self) -> List[str]:
+        """Validate the graph and return stages in dependency order"""
+        for stage in self.stages.values():
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on undeclared stages: {missing}")
+
+        indegree = {name: len(stage.deps) for name, stage in self.stages.items()}
+        dependents = self._dependents()
+        ready = [name for name, n in indegree.items() if n == 0]
+        order = []
+
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for child in dependents[name]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+
+        if len(order) != len(self.stages):
+            cyclic = sorted(set(self.stages) - set(order))
+            raise ValueError(f"Cycle detected in {self.name} among stages: {cyclic}")
+
+        return order
+
+    def _dependents(self) -> Dict[str, List[str]]:
+        dependents: Dict[str, List[str]] = {name: [] for name in self.stages}
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                dependents[dep].append(stage.name)
+        return dependents
+
+    def run(self, run: ETLRun, max_workers: Optional[int] = None,
+            checkpoints: Optional[CheckpointStore] = None) -> DAGResult:
+        """Execute all stages, running independent ones concurrently
+
+        With `checkpoints`, each stage output is persisted; stages whose
+        checkpoint matches their current input fingerprint are restored
+        instead of re-executed.
+        """
+        order = self.topological_order()
+        dependents = self._dependents()
+        remaining = {name: len(stage.deps) for name, stage in self.stages.items()}
+        consumers = {name: len(children) for name, children in dependents.items()}
+
+        outputs: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        output_fps: Dict[str, str] = {}
+        resumed: List[str] = []
+        dag_start = time.perf_counter()
+
+        def execute(stage: Stage) -> Any:
+            started = time.perf_counter()
+            if checkpoints is None:
+                result = stage.func(*[outputs[d] for d in stage.deps])
+            else:
+                input_fp = checkpoints.input_fingerprint(
+                    stage.name, [output_fps[d] for d in stage.deps], stage.salt)
+                restored = checkpoints.is_valid(stage.name, input_fp)
+                run.registry.record_cache("checkpoint", restored)
+
+                if restored:
+                    result, output_fps[stage.name] = checkpoints.load(stage.name)
+                    resumed.append(stage.name)
+                    run.log_step(f"{self.name}_{stage.name}", "skipped",
+                                note="Restored from checkpoint",
+                                checkpoint_run_id=checkpoints.run_id)
+                else:
+                    result = stage.func(*[outputs[d] for d in stage.deps])
+                    output_fps[stage.name] = checkpoints.save(stage.name, result, input_fp)
+            finished = time.perf_counter()
+            timings[stage.name] = {
+                "start": started - dag_start,
+                "end": finished - dag_start,
+                "seconds": finished - started,
+            }
+            return result
+
+        workers = max(1, min(max_workers or cfg.max_workers, len(self.stages) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"dag-{self.name}") as pool:
+            pending = {}
+            for name in order:
+                if remaining[name] == 0:
+                    pending[pool.submit(execute, self.stages[name])] = name
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                    except Exception as e:
+                        for other in pending:
+                            other.cancel()
+                        run.log_error(f"{self.name}_{name}", str(e))
+                        raise
+
+                    for child in dependents[name]:
+                        remaining[child] -= 1
+                        if remaining[child] == 0:
+                            pending[pool.submit(execute, self.stages[child])] = child
+
+                    # Release transient inputs nothing else is waiting for
+                    for dep in self.stages[name].deps:
+                        consumers[dep] -= 1
+                        if consumers[dep] == 0 and self.stages[dep].transient:
+                            outputs.pop(dep, None)
+
+        wall_seconds = time.perf_counter() - dag_start
+        critical_path, critical_seconds = self._critical_path(order, timings)
+
+        run.log_step(f"{self.name}_dag", "success",
+                    duration_ms=int(wall_seconds * 1000),
+                    stages=len(order),
+                    critical_path=critical_path,
+                    critical_path_ms=int(critical_seconds * 1000),
+                    resumed_stages=len(resumed))
+        run.registry.gauge("dag_critical_path_seconds", "Critical-path time of a stage DAG").set(
+            critical_seconds, dag=self.name)
+
+        return DAGResult(outputs=outputs, timings=timings, critical_path=critical_path,
+                         critical_path_seconds=critical_seconds, wall_seconds=wall_seconds,
+                         resumed=resumed)
+
+    def _critical_path(self, order: List[str],
+                       timings: Dict[str, Dict[str, float]]) -> Tuple[List[str], float]:
+        """Longest chain of stage durations through the graph"""
+        finish: Dict[str, float] = {}
+        parent: Dict[str, Optional[str]] = {}
+
+        for name in order:
+            deps = self.stages[name].deps
+            best = max(deps, key=lambda d: finish[d]) if deps else None
+            finish[name] = (finish[best] if best else 0.0) + timings[name]["seconds"]
+            parent[name] = best
+
+        if not finish:
+            return [], 0.0
+
+        node: Optional[str] = max(finish, key=finish.get)
+        total = finish[node]
+        path = []
+        while node is not None:
+            path.append(node)
+            node = parent[node]
+
+        return list(reversed(path)), total
@@ -0,0 +1,243 @@
+"""
+End-to-end pipeline runner for Scout ETL
+Ties extract, bronze, silver and enrichment together as a stage DAG
+"""
+from typing import Optional
+import pandas as pd
+from ..common.config import cfg
+from ..common.log import ETLRun, log_run
+from .dag import StageDAG, DAGResult
+from .checkpoint import CheckpointStore
+
+def build_pipeline_dag(run: ETLRun, include_campaigns: bool = False,
+                       incremental: bool = False, out_of_core: bool = False,
+                       load: bool = False, dedupe_loaded: bool = False) -> StageDAG:
+    """Declare the standard Scout ETL stage graph"""
+    if incremental and out_of_core:
+        raise ValueError("incremental and out_of_core modes cannot be combined")
+    if dedupe_loaded and not incremental:
+        # Full refreshes diff complete tables; dropping rows would read as deletes
+        raise ValueError("dedupe_loaded requires incremental mode")
+
+    # Imported here so building the graph does not pull every client driver
+    # into modules that only need the executor
+    from ..extract.azure_sql import pull_sales_interactions, pull_stores
+    from ..extract.gdrive_json import pull_devices, pull_campaign_data
+    from ..transform.bronze_normalize import to_bronze
+    from ..transform.silver_conform import (
+        to_silver, to_silver_incremental, to_silver_out_of_core
+    )
+    from ..transform.silver_enrich import (
+        enrich_interactions, create_customer_segments,
+        enrich_interactions_out_of_core, create_customer_segments_out_of_core
+    )
+    from ..transform.customer_state import CustomerAggregateState
+    from ..transform.gold_aggregate import build_gold
+
+    dag = StageDAG("pipeline")
+
+    # Extraction sources are independent of each other; the salt ties their
+    # checkpoints to the extraction day
+    extract_salt = pd.Timestamp.now().strftime('%Y-%m-%d')
+    raw_sources = ['extract_stores', 'extract_devices']
+    raw_names = ['stores', 'devices']
+    if out_of_core:
+        from ..extract.azure_sql import stream_sales_interactions
+        from ..transform.bronze_normalize import to_bronze_stream
+        from ..transform.silver_conform import spill_bronze_sales
+
+        def extract_sales_spilled():
+            # Sales go from the source through bronze into the spill one
+            # chunk at a time, so the window is never held in memory
+            expected_rows, chunks = stream_sales_interactions(run)
+            return spill_bronze_sales(to_bronze_stream(chunks, 'sales', run), run, expected_rows)
+
+        dag.add('extract_sales', extract_sales_spilled, salt=extract_salt)
+    else:
+        dag.add('extract_sales', lambda: pull_sales_interactions(run), salt=extract_salt)
+        raw_sources.insert(0, 'extract_sales')
+        raw_names.insert(0, 'sales')
+    dag.add('extract_stores', lambda: pull_stores(run), salt=extract_salt)
+    dag.add('extract_devices', lambda: pull_devices(run), salt=extract_salt)
+
+    if include_campaigns:
+        dag.add('extract_campaigns', lambda: pull_campaign_data(run), salt=extract_salt)
+        raw_sources.append('extract_campaigns')
+        raw_names.append('campaigns')
+
+    dag.add('bronze',
+            lambda *frames: to_bronze(dict(zip(raw_names, frames)), run),
+            deps=raw_sources, transient=out_of_core)
+    if out_of_core:
+        from ..common.spill import clear_spills
+
+        # Facts flow between stages as hash-partitioned spills on disk
+        dag.add('silver', lambda sales, bronze: to_silver_out_of_core({**bronze, 'sales': sales}, run),
+                deps=['extract_sales', 'bronze'])
+        dag.add('gold', lambda silver: build_gold(silver, run), deps=['silver'])
+        dag.add('enrich', lambda silver: enrich_interactions_out_of_core(silver, run),
+                deps=['silver'])
+        dag.add('customer_segments',
+                lambda enriched: create_customer_segments_out_of_core(enriched, run),
+                deps=['enrich'])
+        if load:
+            _add_load_stage(dag, run)
+        # Spills are removed once everything reading them finished; a failed
+        # run keeps them for resuming from checkpoints
+        dag.add('clear_spills',
+                lambda sales, silver, enriched, *_: clear_spills([sales, *silver.values(), enriched],
+                                                                 run),
+                deps=['extract_sales', 'silver', 'enrich', 'gold', 'customer_segments']
+                + (['load'] if load else []))
+        return dag
+
+    if incremental:
+        from ..common.key_index import drop_loaded_rows, record_loaded_keys
+
+        silver_input = 'bronze'
+        if dedupe_loaded:
+            # Interactions loaded unchanged by earlier runs are skipped without a warehouse query
+            dag.add('bronze_new', lambda bronze: drop_loaded_rows(bronze, run), deps=['bronze'])
+            silver_input = 'bronze_new'
+        dag.add('silver', lambda bronze: to_silver_incremental(bronze, run), deps=[silver_input])
+        # Daily aggregates are rewritten only for the dates in the silver delta
+        dag.add('gold', lambda silver: build_gold(silver, run, incremental=True),
+                deps=['silver'])
+        if load:
+            _add_load_stage(dag, run)
+        # Keys are recorded once the batch is persisted (and loaded)
+        dag.add('record_keys',
+                lambda silver, bronze, *_: record_loaded_keys(silver, run, bronze_data=bronze),
+                deps=['silver', silver_input, 'gold'] + (['load'] if load else []))
+    else:
+        dag.add('silver', lambda bronze: to_silver(bronze, run), deps=['bronze'])
+        _add_change_stages(dag, run, load)
+
+    dag.add('enrich', lambda silver: enrich_interactions(silver, run), deps=['silver'])
+    if incremental:
+        # Segments are rescored from persisted per-customer aggregate state
+        dag.add('customer_segments',
+                lambda enriched: create_customer_segments(
+                    enriched, run, state=CustomerAggregateState()),
+                deps=['enrich'])
+    else:
+        dag.add('customer_segments',
+                lambda enriched: create_customer_segments(enriched, run),
+                deps=['enrich'])
+
+    return dag
+
+def _add_load_stage(dag: StageDAG, run: ETLRun) -> None:
+    """Bulk load the silver batch and gold aggregates as produced"""
+    # Driver imports are deferred until a load is actually requested
+    from ..load.postgres_copy import load_tables
+    # Gold days are rebuilt in full, so groups that vanished from a day are
+    # removed by replacing the target's rows for each loaded date
+    dag.add('load', lambda silver, gold: load_tables({**silver, 'daily_sales': gold}, run,
+                                                     replace_by={'daily_sales': ['date_key']}),
+            deps=['silver', 'gold'])
+
+def _add_change_stages(dag: StageDAG, run: ETLRun, load: bool) -> None:
+    """Full refresh stages that pass on changed rows only
+
+    Silver tables are diffed against the fingerprints committed by the last
+    run; gold is re-aggregated for the dates of changed interactions and
+    transactions and diffed within those dates; the load writes inserts and updates and
+    removes deletes. Fingerprints are committed after gold (and the load)
+    succeeded, so anything that failed downstream shows up as changed again.
+    """
+    from ..common.changes import ChangeTracker, detect_changes, commit_changes
+    from ..transform.gold_aggregate import build_gold
+
+    tracker = ChangeTracker()
+
+    def changed_dates(changes):
+        sources = [changes[name] for name in ('interactions', 'transactions') if name in changes]
+        if not sources:
+            return None
+        return sorted(set().union(*[c.changed_partitions('transaction_date') for c in sources]))
+
+    dag.add('changes', lambda silver: detect_changes(silver, run, tracker), deps=['silver'])
+    dag.add('gold', lambda silver, changes: build_gold(silver, run, dates=changed_dates(changes)),
+            deps=['silver', 'changes'])
+
+    def gold_changes(gold, changes):
+        dates = changed_dates(changes)
+        scopes = {'daily_sales': ('transaction_date', dates)} if dates is not None else None
+        return detect_changes({'daily_sales': gold}, run, tracker, scopes=scopes)
+
+    dag.add('gold_changes', gold_changes, deps=['gold', 'changes'])
+
+    commit_deps = ['changes', 'gold_changes']
+    if load:
+        from ..load.postgres_copy import load_tables
+
+        def load_changes(changes, gold_changes):
+            all_changes = {**changes, **gold_changes}
+            return load_tables({name: c.upserts for name, c in all_changes.items()}, run,
+                               deletes={name: c.deletes for name, c in all_changes.items()})
+
+        dag.add('load', load_changes, deps=['changes', 'gold_changes'])
+        commit_deps.append('load')
+
+    dag.add('commit_changes',
+            lambda changes, gold_changes, *_: commit_changes({**changes, **gold_changes},
+                                                             tracker, run),
+            deps=commit_deps)
+
+def run_pipeline(run: Optional[ETLRun] = None,
+                 include_campaigns: bool = False,
+                 max_workers: Optional[int] = None,
+                 checkpoint: bool = False,
+                 resume_run_id: Optional[str] = None,
+                 incremental: bool = False,
+                 out_of_core: bool = False,
+                 load: bool = False,
+                 dedupe_loaded: bool = False) -> DAGResult:
+    """Run the full extract -> bronze -> silver -> enrich/gold pipeline
+
+    `checkpoint=True` persists every stage output under the run's id.
+    `resume_run_id` reuses the checkpoints of an earlier (failed) run and
+    only re-executes stages whose inputs changed or never completed.
+    `incremental=True` merges only changed bronze partitions into the
+    persisted silver tables, enriches the resulting delta and merges it
+    into the persisted customer aggregate state, and re-aggregates gold
+    daily sales for the touched dates only. It also records the batch's
+    transaction ids, interaction keys and interaction content fingerprints
+    in local key indexes (cfg.key_index_dir); with `dedupe_loaded=True`
+    interactions an earlier run loaded unchanged are dropped after bronze
+    (corrected or extended ones are kept).
+    `out_of_core=True` hash-partitions facts to disk (cfg.spill_dir) and
+    runs silver, enrichment and segmentation one bucket at a time within
+    cfg.memory_budget_mb; sales are streamed from the source in chunks
+    (cfg.bronze_chunk_rows) straight into the spill, and the spills are
+    deleted when the run succeeds.
+    Full refreshes diff silver and gold rows against the fingerprints of
+    the last run (cfg.fingerprint_dir) and pass on changed rows only.
+    `load=True` bulk loads silver tables and gold aggregates into Postgres
+    (cfg.postgres_url) with COPY and batched upserts.
+    """
+    owns_run = run is None
+    if run is None:
+        run = log_run(environment=cfg.environment, dry_run=cfg.dry_run)
+
+    checkpoints = None
+    if checkpoint or resume_run_id:
+        checkpoints = CheckpointStore(resume_run_id or run.run_id)
+        run.log_step("checkpoints", "success",
+                    mode="resume" if resume_run_id else "write",
+                    checkpoint_run_id=checkpoints.run_id,
+                    path=str(checkpoints.run_path))
+
+    try:
+        result = build_pipeline_dag(run, include_campaigns, incremental, out_of_core, load,
+                                    dedupe_loaded).run(
+            run, max_workers=max_workers, checkpoints=checkpoints)
+        if owns_run:
+            run.finish(ok=True)
+        return result
+
+    except Exception:
+        if owns_run:
+            run.finish(ok=False)
+        raise
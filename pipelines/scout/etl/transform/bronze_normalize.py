@@ -4,31 +4,103 @@ Clean and standardize raw data from multiple sources
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from ..common.config import cfg
 from ..common.log import ETLRun
 from ..common.io import normalize_columns, clean_dataframe, infer_datatypes
+from ..common.datetimes import parse_datetimes
+from ..common.shared import process_pool
 from ..common.util import clean_column_names, detect_column_types, calculate_data_quality_score
+from ..common.validation import validate_tables, report_passed
+from .bronze_spec import has_spec, get_plan
 
-def to_bronze(raw_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd.DataFrame]:
-    """Transform raw data to bronze layer"""
+def to_bronze(raw_data: Dict[str, pd.DataFrame], run: ETLRun,
+              max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """Transform raw data to bronze layer
+
+    Sources, and row chunks of large sources, are normalized on a process
+    pool when the batch is big enough to pay for it; chunks are reassembled
+    in order with globally consistent `_bronze_row_id`s.
+    """
     start_time = pd.Timestamp.now()
     bronze_data = {}
+    quality_stats = {}
 
     try:
-        # Process each raw dataset
+        loaded_at = pd.Timestamp.now()
+        prepared = {}
         for source_name, df in raw_data.items():
-            bronze_df = normalize_source_data(df, source_name, run)
-            bronze_data[source_name] = bronze_df
+            if df.empty:
+                run.log_step(f"normalize_{source_name}", "skipped", note="Empty dataset")
+                bronze_data[source_name] = df
+                continue
+            prepared[source_name] = (len(df), _prepare_source_frame(df))
+
+        # Plan tasks: (source, chunk index, frame, row offset)
+        chunk_rows = cfg.bronze_chunk_rows
+        tasks = []
+        for source_name, (_, df) in prepared.items():
+            # Spec'd sources apply column-wise rules and can be split into row
+            # chunks; generic sources infer types from the whole frame
+            if has_spec(source_name) and len(df) > chunk_rows:
+                for chunk_index, offset in enumerate(range(0, len(df), chunk_rows)):
+                    tasks.append((source_name, chunk_index, df.iloc[offset:offset + chunk_rows], offset))
+            else:
+                tasks.append((source_name, 0, df, 0))
+
+        total_rows = sum(len(df) for _, df in prepared.values())
+        workers = max_workers or cfg.max_workers
+        parallel = workers > 1 and len(tasks) > 1 and total_rows >= cfg.bronze_parallel_min_rows
+
+        source_start = {name: pd.Timestamp.now() for name in prepared}
+        results: Dict[str, Dict[int, Tuple[pd.DataFrame, int]]] = {name: {} for name in prepared}
+        if parallel:
+            with process_pool(min(workers, len(tasks))) as pool:
+                futures = {
+                    pool.submit(_normalize_chunk, chunk, source_name, offset, loaded_at):
+                        (source_name, chunk_index)
+                    for source_name, chunk_index, chunk, offset in tasks
+                }
+                for future, (source_name, chunk_index) in futures.items():
+                    results[source_name][chunk_index] = future.result()
+        else:
+            for source_name, chunk_index, chunk, offset in tasks:
+                results[source_name][chunk_index] = _normalize_chunk(
+                    chunk, source_name, offset, loaded_at
+                )
+
+        # Reassemble chunks and aggregate quality stats
+        for source_name, chunks in results.items():
+            ordered = [chunks[i] for i in sorted(chunks)]
+            df = ordered[0][0] if len(ordered) == 1 else pd.concat(
+                [frame for frame, _ in ordered], ignore_index=True
+            )
+            null_cells = sum(nulls for _, nulls in ordered)
+            total_cells = df.shape[0] * df.shape[1]
+            completeness = 1 - (null_cells / total_cells) if total_cells > 0 else 1
+            quality_stats[source_name] = {"completeness": completeness, "row_count": len(df)}
+            bronze_data[source_name] = df
+
+            duration_ms = int((pd.Timestamp.now() - source_start[source_name]).total_seconds() * 1000)
+            run.log_step(f"normalize_{source_name}", "success",
+                        duration_ms=duration_ms,
+                        rows_in=prepared[source_name][0],
+                        rows_out=len(df),
+                        chunks=len(ordered),
+                        quality_score=round(completeness, 3))
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("bronze_normalize", "success",
                     duration_ms=duration_ms,
-                    sources_processed=len(bronze_data))
+                    sources_processed=len(bronze_data),
+                    tasks=len(tasks),
+                    parallel=parallel)
 
         # Log quality metrics for each bronze table
         for name, df in bronze_data.items():
-            quality = calculate_data_quality_score(df)
+            quality = quality_stats.get(name) or calculate_data_quality_score(
+                df, approximate=cfg.approx_distinct, precision=cfg.hll_precision
+            )
             run.log_metric(f"bronze_{name}_quality_score", quality["completeness"])
             run.log_metric(f"bronze_{name}_row_count", quality["row_count"])
 
@@ -38,6 +110,48 @@ def to_bronze(raw_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd.Da
         run.log_error("bronze_normalize", str(e))
         raise
 
+def to_bronze_stream(chunks: Iterable[pd.DataFrame], source_name: str,
+                     run: ETLRun) -> Iterator[pd.DataFrame]:
+    """Normalize one source chunk by chunk (e.g. a streamed extract)
+
+    Chunks are normalized as in `to_bronze`, serially and with
+    `_bronze_row_id`s continuing across chunks. Columns empty in a single
+    chunk are kept, so every chunk has the same schema. Row counts and
+    quality are logged once the stream is exhausted.
+    """
+    start_time = pd.Timestamp.now()
+    loaded_at = pd.Timestamp.now()
+    rows_in = rows_out = null_cells = total_cells = n_chunks = 0
+    try:
+        for chunk in chunks:
+            rows_in += len(chunk)
+            chunk = chunk.copy(deep=False)
+            chunk.columns = clean_column_names(chunk.columns.tolist())
+            chunk = chunk.dropna(how='all')
+            if chunk.empty:
+                continue
+            df, nulls = _normalize_chunk(chunk, source_name, rows_out, loaded_at)
+            rows_out += len(df)
+            null_cells += nulls
+            total_cells += df.size
+            n_chunks += 1
+            yield df
+
+        completeness = 1 - (null_cells / total_cells) if total_cells > 0 else 1
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step(f"normalize_{source_name}", "success",
+                    duration_ms=duration_ms,
+                    rows_in=rows_in,
+                    rows_out=rows_out,
+                    chunks=n_chunks,
+                    quality_score=round(completeness, 3))
+        run.log_metric(f"bronze_{source_name}_quality_score", completeness)
+        run.log_metric(f"bronze_{source_name}_row_count", rows_out)
+
+    except Exception as e:
+        run.log_error(f"normalize_{source_name}", str(e))
+        raise
+
 def normalize_source_data(df: pd.DataFrame, source_name: str, run: ETLRun) -> pd.DataFrame:
     """Normalize data from a specific source"""
     if df.empty:
@@ -48,37 +162,20 @@ def normalize_source_data(df: pd.DataFrame, source_name: str, run: ETLRun) -> pd
     start_time = pd.Timestamp.now()
 
     try:
-        # Step 1: Clean column names
-        original_columns = df.columns.tolist()
-        df.columns = clean_column_names(df.columns.tolist())
-
-        # Step 2: Remove completely empty rows and columns
-        df = df.dropna(how='all').loc[:, df.notna().any()]
-
-        # Step 3: Data type detection and conversion
-        if source_name == "sales":
-            df = _normalize_sales_data(df)
-        elif source_name == "stores":
-            df = _normalize_stores_data(df)
-        elif source_name == "devices":
-            df = _normalize_devices_data(df)
-        else:
-            # Generic normalization
-            df = _normalize_generic_data(df)
+        df = _prepare_source_frame(df)
+        df, null_cells = _normalize_chunk(df, source_name)
 
-        # Step 4: Add metadata columns
-        df = _add_bronze_metadata(df, source_name)
-
-        # Step 5: Data quality validation
+        # Data quality validation
         final_count = len(df)
-        quality_score = calculate_data_quality_score(df)
+        total_cells = df.shape[0] * df.shape[1]
+        completeness = 1 - (null_cells / total_cells) if total_cells > 0 else 1
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step(f"normalize_{source_name}", "success",
                     duration_ms=duration_ms,
                     rows_in=original_count,
                     rows_out=final_count,
-                    quality_score=round(quality_score["completeness"], 3))
+                    quality_score=round(completeness, 3))
 
         return df
 
@@ -86,133 +183,35 @@ def normalize_source_data(df: pd.DataFrame, source_name: str, run: ETLRun) -> pd
         run.log_error(f"normalize_{source_name}", str(e))
         raise
 
-def _normalize_sales_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalize sales/interactions data"""
-    # Expected columns mapping
-    column_mapping = {
-        'interactionid': 'interaction_id',
-        'transactionid': 'transaction_id',
-        'storeid': 'store_id',
-        'deviceid': 'device_id',
-        'productid': 'product_id',
-        'customerid': 'customer_id',
-        'transactiondate': 'transaction_date',
-        'transactiontime': 'transaction_time',
-        'transactiontimestamp': 'transaction_timestamp',
-        'quantity': 'quantity',
-        'qty': 'quantity',
-        'unitprice': 'unit_price',
-        'totalamount': 'total_amount',
-        'total_price': 'total_amount',
-        'paymentmethod': 'payment_method',
-        'category': 'category',
-        'brand': 'brand',
-        'productname': 'product_name',
-        'product': 'product_name',
-        'sku': 'sku'
-    }
-
-    # Apply column mapping
-    df = df.rename(columns=column_mapping)
-
-    # Data type conversions
-    numeric_columns = ['quantity', 'unit_price', 'total_amount', 'store_id', 'device_id']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Date/time conversions
-    date_columns = ['transaction_date', 'transaction_timestamp']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-
-    # String cleaning
-    string_columns = ['brand', 'category', 'product_name', 'payment_method', 'sku']
-    for col in string_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
-            df[col] = df[col].replace(['NAN', 'NONE', ''], np.nan)
+def _prepare_source_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Whole-frame steps that must not be done per chunk"""
+    # Step 1: Clean column names
+    df = df.copy(deep=False)
+    df.columns = clean_column_names(df.columns.tolist())
 
-    return df
+    # Step 2: Remove completely empty rows and columns
+    return df.dropna(how='all').loc[:, df.notna().any()]
 
-def _normalize_stores_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalize stores data"""
-    column_mapping = {
-        'storeid': 'store_id',
-        'storename': 'store_name',
-        'storetype': 'store_type',
-        'region': 'region',
-        'province': 'province',
-        'city': 'city',
-        'barangay': 'barangay',
-        'address': 'address',
-        'latitude': 'latitude',
-        'longitude': 'longitude',
-        'opendate': 'open_date',
-        'status': 'status',
-        'managername': 'manager_name',
-        'contactinfo': 'contact_info'
-    }
-
-    df = df.rename(columns=column_mapping)
-
-    # Numeric conversions
-    numeric_columns = ['store_id', 'latitude', 'longitude']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Date conversions
-    if 'open_date' in df.columns:
-        df['open_date'] = pd.to_datetime(df['open_date'], errors='coerce')
-
-    # String cleaning
-    string_columns = ['store_name', 'store_type', 'region', 'province', 'city', 'status']
-    for col in string_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.title()
-            df[col] = df[col].replace(['Nan', 'None', ''], np.nan)
+def _normalize_chunk(df: pd.DataFrame, source_name: str, row_offset: int = 0,
+                     loaded_at: Optional[pd.Timestamp] = None) -> Tuple[pd.DataFrame, int]:
+    """Normalize one source frame or row chunk; runs in worker processes
 
-    return df
+    Returns the bronze frame and its null cell count so chunk quality
+    stats can be aggregated without rescanning.
+    """
+    # Step 3: Data type conversion from the source's compiled spec
+    if has_spec(source_name):
+        df = get_plan(source_name, df.columns.tolist()).execute(df)
+    else:
+        # Generic normalization
+        df = _normalize_generic_data(df, source_name)
 
-def _normalize_devices_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalize devices data"""
-    column_mapping = {
-        'deviceid': 'device_id',
-        'devicename': 'device_name',
-        'devicetype': 'device_type',
-        'storeid': 'store_id',
-        'locationinstore': 'location_in_store',
-        'installationdate': 'installation_date',
-        'status': 'status',
-        'lastmaintenance': 'last_maintenance',
-        'serialnumber': 'serial_number',
-        'firmwareversion': 'firmware_version'
-    }
-
-    df = df.rename(columns=column_mapping)
-
-    # Numeric conversions
-    if 'store_id' in df.columns:
-        df['store_id'] = pd.to_numeric(df['store_id'], errors='coerce')
-
-    # Date conversions
-    date_columns = ['installation_date', 'last_maintenance']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-
-    # String cleaning
-    string_columns = ['device_name', 'device_type', 'status', 'location_in_store']
-    for col in string_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.title()
-            df[col] = df[col].replace(['Nan', 'None', ''], np.nan)
+    # Step 4: Add metadata columns
+    df = _add_bronze_metadata(df, source_name, row_offset=row_offset, loaded_at=loaded_at)
 
-    return df
+    return df, int(df.isnull().sum().sum())
 
-def _normalize_generic_data(df: pd.DataFrame) -> pd.DataFrame:
+def _normalize_generic_data(df: pd.DataFrame, source_name: str) -> pd.DataFrame:
     """Generic normalization for unknown data sources"""
     # Detect and convert data types
     type_mapping = detect_column_types(df)
@@ -227,7 +226,7 @@ def _normalize_generic_data(df: pd.DataFrame) -> pd.DataFrame:
             elif dtype == "float":
                 df[col] = pd.to_numeric(df[col], errors='coerce')
             elif dtype == "datetime":
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+                df[col] = parse_datetimes(df[col], key=(source_name, col))
             elif dtype == "boolean":
                 df[col] = df[col].astype(str).str.lower().map({
                     'true': True, 'false': False, '1': True, '0': False,
@@ -243,14 +242,15 @@ def _normalize_generic_data(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def _add_bronze_metadata(df: pd.DataFrame, source_name: str) -> pd.DataFrame:
+def _add_bronze_metadata(df: pd.DataFrame, source_name: str, row_offset: int = 0,
+                         loaded_at: Optional[pd.Timestamp] = None) -> pd.DataFrame:
     """Add metadata columns to bronze data"""
     df = df.copy()
 
     # Add bronze layer metadata
     df['_bronze_source'] = source_name
-    df['_bronze_loaded_at'] = pd.Timestamp.now()
-    df['_bronze_row_id'] = range(1, len(df) + 1)
+    df['_bronze_loaded_at'] = loaded_at if loaded_at is not None else pd.Timestamp.now()
+    df['_bronze_row_id'] = range(row_offset + 1, row_offset + len(df) + 1)
 
     # Add data quality indicators
     df['_bronze_null_count'] = df.isnull().sum(axis=1)
@@ -259,32 +259,6 @@ def _add_bronze_metadata(df: pd.DataFrame, source_name: str) -> pd.DataFrame:
     return df
 
 def validate_bronze_data(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> bool:
-    """Validate bronze layer data quality"""
-    validation_passed = True
-
-    for source_name, df in bronze_data.items():
-        if df.empty:
-            run.log_error(f"bronze_validation_{source_name}", "Empty dataset")
-            validation_passed = False
-            continue
-
-        # Check for required metadata columns
-        required_metadata = ['_bronze_source', '_bronze_loaded_at', '_bronze_row_id']
-        missing_metadata = [col for col in required_metadata if col not in df.columns]
-
-        if missing_metadata:
-            run.log_error(f"bronze_validation_{source_name}",
-                         f"Missing metadata columns: {missing_metadata}")
-            validation_passed = False
-
-        # Check data quality thresholds
-        quality = calculate_data_quality_score(df)
-        if quality["completeness"] < 0.7:  # 70% completeness threshold
-            run.log_error(f"bronze_validation_{source_name}",
-                         f"Low data quality: {quality['completeness']:.2%} completeness")
-            validation_passed = False
-
-        # Log validation results
-        run.log_metric(f"bronze_{source_name}_validation_passed", validation_passed)
-
-    return validation_passed
\ No newline at end of file
+    """Validate bronze layer data quality against the configured bronze rules"""
+    report = validate_tables("bronze", bronze_data, run)
+    return report_passed(report)
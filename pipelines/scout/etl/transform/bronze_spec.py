@@ -0,0 +1,105 @@
+"""
+Compiled bronze normalization specs for Scout ETL Pipeline
+Turn per-source config specs into cached execution plans
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..common.config import Config, cfg, get_config
+from ..common.datetimes import parse_datetimes
+
+_CASE_FUNCS = {
+    "upper": str.upper,
+    "lower": str.lower,
+    "title": str.title,
+    None: lambda s: s,
+}
+
+@dataclass(frozen=True)
+class BronzePlan:
+    """Execution plan for one source and one input column layout"""
+    source_name: str
+    rename: Tuple[Tuple[str, str], ...]
+    numeric: Tuple[str, ...]
+    datetime: Tuple[str, ...]
+    strings: Tuple[str, ...]
+    case: Optional[str]
+    null_tokens: Tuple[str, ...]
+
+    def execute(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the plan: one rename, one numeric cast, one datetime parse, one string pass"""
+        if self.rename:
+            df = df.rename(columns=dict(self.rename))
+        else:
+            df = df.copy(deep=False)
+
+        if self.numeric:
+            df[list(self.numeric)] = df[list(self.numeric)].apply(pd.to_numeric, errors='coerce')
+
+        if self.datetime:
+            for col in self.datetime:
+                df[col] = parse_datetimes(df[col], key=(self.source_name, col))
+
+        if self.strings:
+            df[list(self.strings)] = _clean_strings(
+                df[list(self.strings)], _CASE_FUNCS[self.case], frozenset(self.null_tokens)
+            )
+
+        return df
+
+def _clean_strings(frame: pd.DataFrame, case_func, null_tokens: frozenset) -> pd.DataFrame:
+    """Strip/re-case all string columns in one pass over their distinct values
+
+    Equivalent to `astype(str).str.strip().<case>()` followed by replacing
+    null tokens with NaN, but each distinct value is cleaned once.
+    """
+    values = frame.to_numpy(dtype=object).ravel(order='F')
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+
+    def clean(value: Any) -> Any:
+        text = case_func(str(value).strip())
+        return np.nan if text in null_tokens else text
+
+    cleaned = np.array([clean(u) for u in uniques] + [clean(np.nan)], dtype=object)
+    result = cleaned[codes].reshape(frame.shape, order='F')
+    return pd.DataFrame(result, index=frame.index, columns=frame.columns)
+
+def has_spec(source_name: str) -> bool:
+    return source_name in (cfg.bronze_specs or {})
+
+def get_plan(source_name: str, columns: List[str]) -> BronzePlan:
+    """Return the cached plan for a source given its (cleaned) input columns"""
+    # Keyed by the live Config, so plans are recompiled after reload_config()
+    return _compile_plan(get_config(), source_name, tuple(columns))
+
+@lru_cache(maxsize=128)
+def _compile_plan(config: Config, source_name: str, columns: Tuple[str, ...]) -> BronzePlan:
+    """Compile a source spec against a concrete column layout"""
+    spec: Dict[str, Any] = (config.bronze_specs or {}).get(source_name)
+    if spec is None:
+        raise KeyError(f"No bronze spec configured for source '{source_name}'")
+
+    rename = {src: dst for src, dst in (spec.get("rename") or {}).items()
+              if src in columns and src != dst}
+    renamed = [rename.get(col, col) for col in columns]
+    present = set(renamed)
+
+    strings_spec = spec.get("strings") or {}
+    case = strings_spec.get("case")
+    if case not in _CASE_FUNCS:
+        raise ValueError(f"Unsupported string case '{case}' in bronze spec '{source_name}'")
+
+    def select(cols: Optional[List[str]]) -> Tuple[str, ...]:
+        return tuple(col for col in (cols or []) if col in present)
+
+    return BronzePlan(
+        source_name=source_name,
+        rename=tuple(rename.items()),
+        numeric=select(spec.get("numeric")),
+        datetime=select(spec.get("datetime")),
+        strings=select(strings_spec.get("columns")),
+        case=case,
+        null_tokens=tuple(strings_spec.get("null_tokens") or []),
+    )
@@ -0,0 +1,268 @@
+"""
+Incremental customer aggregate state for Scout ETL Pipeline
+Mergeable per-customer sums, counts, min/max and distinct sketches for RFM
+"""
+import operator
+import os
+from functools import reduce
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.dataset import partition_values
+from ..common.hll import grouped_sketches
+
+# Distinct-count measures: state column -> source column
+DISTINCT_MEASURES = {
+    'brands_purchased': 'brand',
+    'categories_purchased': 'category',
+    'stores_visited': 'store_id',
+}
+
+# Day partials are kept per customer and key, so re-delivered rows replace
+# their earlier version the way silver upserts them
+STATE_KEY = 'interaction_key'
+
+# Set-valued state: unions on merge. `days` lists the days a customer has
+# partials for, so re-merging a customer reads only those day partials
+SET_COLUMNS = list(DISTINCT_MEASURES) + ['days']
+
+STATE_COLUMNS = ['revenue_sum', 'revenue_count', 'quantity_sum',
+                 'first_purchase', 'last_purchase'] + SET_COLUMNS
+
+def _plain(series: pd.Series) -> pd.Series:
+    """Categorical keys back to their values so state stays comparable across runs"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    return series
+
+def build_customer_partials(df: pd.DataFrame, by: List[str],
+                            approximate: Optional[bool] = None) -> pd.DataFrame:
+    """Aggregate rows into mergeable partial state grouped by `by`
+
+    Sums, counts and min/max merge by sum/min/max; distinct measures are
+    kept as value sets (exact) or, with `approximate` (default
+    cfg.approx_distinct), HyperLogLog sketches. Both merge with `|` and
+    count with `len`.
+    """
+    if approximate is None:
+        approximate = cfg.approx_distinct
+    df = df.assign(**{col: _plain(df[col]) for col in by})
+    grouped = df.groupby(by, observed=True, sort=False)
+    partials = pd.DataFrame({
+        'revenue_sum': grouped['total_amount'].sum(),
+        'revenue_count': grouped['total_amount'].count(),
+        'quantity_sum': grouped['quantity'].sum(),
+        'first_purchase': grouped['transaction_date'].min(),
+        'last_purchase': grouped['transaction_date'].max(),
+    })
+
+    if approximate:
+        # Group numbers follow first appearance, as the aggregations above
+        codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        for state_col, col in DISTINCT_MEASURES.items():
+            partials[state_col] = grouped_sketches(codes, len(partials), df[col],
+                                                   cfg.hll_group_precision)
+    else:
+        for state_col, col in DISTINCT_MEASURES.items():
+            partials[state_col] = _distinct_sets(df, by, col, partials.index)
+
+    return partials
+
+def _distinct_sets(df: pd.DataFrame, by: List[str], col: str, index: pd.Index) -> List[frozenset]:
+    """Per-group set of distinct non-null values of `col`, aligned to `index`"""
+    pairs = df[by + [col]].dropna(subset=[col]).drop_duplicates()
+    pairs[col] = _plain(pairs[col])
+    group_ids = pairs.groupby(by, observed=True, sort=False).ngroup().to_numpy()
+    order = np.argsort(group_ids, kind='stable')
+    values = pairs[col].to_numpy(dtype=object)[order]
+    boundaries = np.flatnonzero(np.diff(group_ids[order])) + 1
+
+    keys = pairs.iloc[order[np.r_[0, boundaries]]][by] if len(pairs) else pairs[by]
+    key_index = pd.MultiIndex.from_frame(keys) if len(by) > 1 else pd.Index(keys[by[0]])
+    sets = pd.Series([frozenset(chunk) for chunk in np.split(values, boundaries)] if len(pairs) else [],
+                     index=key_index, dtype=object)
+    sets = sets.reindex(index)
+    return [s if isinstance(s, frozenset) else frozenset() for s in sets]
+
+def merge_partials(partials: pd.DataFrame) -> pd.DataFrame:
+    """Merge partial states that share a customer_id index into one row per customer"""
+    if partials.index.is_unique:
+        return partials
+
+    grouped = partials.groupby(level=0, sort=False)
+    merged = pd.DataFrame({
+        'revenue_sum': grouped['revenue_sum'].sum(),
+        'revenue_count': grouped['revenue_count'].sum(),
+        'quantity_sum': grouped['quantity_sum'].sum(),
+        'first_purchase': grouped['first_purchase'].min(),
+        'last_purchase': grouped['last_purchase'].max(),
+    })
+    for state_col in SET_COLUMNS:
+        if state_col in partials.columns:
+            merged[state_col] = grouped[state_col].agg(lambda s: reduce(operator.or_, s))
+    return merged
+
+def customer_metrics_from_state(state: pd.DataFrame) -> pd.DataFrame:
+    """Per-customer metrics (as used for RFM scoring) derived from aggregate state"""
+    revenue_count = state['revenue_count']
+    metrics = pd.DataFrame({
+        'total_revenue': state['revenue_sum'],
+        'avg_transaction_value': state['revenue_sum'] / revenue_count.where(revenue_count > 0),
+        'transaction_count': revenue_count,
+        'total_quantity': state['quantity_sum'],
+        'first_purchase': state['first_purchase'],
+        'last_purchase': state['last_purchase'],
+    }, index=state.index)
+    for state_col in DISTINCT_MEASURES:
+        metrics[state_col] = state[state_col].map(len).astype('int64')
+
+    metrics.index.name = 'customer_id'
+    numeric_cols = metrics.select_dtypes('number').columns
+    metrics[numeric_cols] = metrics[numeric_cols].round(2)
+    return metrics.sort_index()
+
+def _replace_rows(customers: pd.DataFrame, ids: pd.Index, merged: pd.DataFrame) -> pd.DataFrame:
+    """Swap the rows of `ids` in the customer table for freshly merged ones"""
+    kept = customers[~customers.index.isin(ids)]
+    if kept.empty:
+        return merged
+    return pd.concat([kept, merged])
+
+def _unchanged_rows(previous: pd.DataFrame, incoming: pd.DataFrame) -> np.ndarray:
+    """Mask of `incoming` rows identical to the `previous` row of the same index"""
+    same = incoming.index.isin(previous.index)
+    if not same.any():
+        return same
+    positions = np.flatnonzero(same)
+    aligned = previous.reindex(incoming.index[positions])
+    equal = np.ones(len(positions), dtype=bool)
+    for col in incoming.columns:
+        equal &= aligned[col].to_numpy() == incoming[col].to_numpy()[positions]
+    same[positions] = equal
+    return same
+
+def _customer_rows(partial: pd.DataFrame, day: str) -> pd.DataFrame:
+    """Keyed day partial rows as customer-level partials tagged with their day"""
+    rows = partial.droplevel(STATE_KEY)
+    rows['days'] = [frozenset([day])] * len(rows)
+    return rows
+
+class CustomerAggregateState:
+    """Persisted per-customer aggregate state, merged batch by batch
+
+    Layout: <root>/days/<YYYY-MM-DD>.pkl holds each transaction day's
+    partial state per customer and `interaction_key`, and
+    <root>/customers.pkl the merged table. A batch upserts its keys into
+    the partials of its days, as silver upserts interactions: rows of
+    other keys stay. New keys are merged into the customer table directly
+    (cost proportional to the batch) and re-delivered keys with identical
+    partials are skipped. Customers whose earlier partials changed are
+    re-merged from the partials of the days they were active on only,
+    since min/max and distinct sets cannot be subtracted.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        self.root = Path(root or cfg.customer_state_dir)
+        self.days_path = self.root / "days"
+        self.customers_path = self.root / "customers.pkl"
+        self._customers: Optional[pd.DataFrame] = None
+
+    @property
+    def customers(self) -> pd.DataFrame:
+        if self._customers is None:
+            if self.customers_path.exists():
+                self._customers = pd.read_pickle(self.customers_path)
+            else:
+                self._customers = pd.DataFrame(columns=STATE_COLUMNS)
+        return self._customers
+
+    def _day_path(self, day: str) -> Path:
+        return self.days_path / f"{day}.pkl"
+
+    @staticmethod
+    def _write_pickle(obj: Any, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        pd.to_pickle(obj, tmp_path)
+        os.replace(tmp_path, path)
+
+    def merge_batch(self, df: pd.DataFrame, run: Optional[ETLRun] = None) -> Dict[str, int]:
+        """Merge a batch of enriched interactions into the state"""
+        start_time = pd.Timestamp.now()
+        if df.empty:
+            return {"days_added": 0, "days_updated": 0, "customers_updated": 0,
+                    "customers_remerged": 0}
+
+        days = partition_values(df['transaction_date'])
+        keyed = build_customer_partials(df.assign(_state_day=days.values),
+                                        ['_state_day', 'customer_id', STATE_KEY])
+        batch_keys = pd.Index(_plain(df[STATE_KEY]).unique())
+
+        new_day_partials: Dict[str, pd.DataFrame] = {}
+        additions: List[pd.DataFrame] = []
+        remerge_ids: List[pd.Index] = []
+        days_updated = 0
+        for day, incoming in keyed.groupby(level=0, sort=True):
+            incoming = incoming.droplevel(0)
+            path = self._day_path(day)
+            if path.exists():
+                previous = pd.read_pickle(path)
+                replaced = previous.index.get_level_values(STATE_KEY).isin(batch_keys)
+                unchanged = _unchanged_rows(previous[replaced], incoming)
+                changed = previous[replaced].index.difference(incoming.index[unchanged])
+                remerge_ids.append(changed.get_level_values('customer_id'))
+                partial = pd.concat([previous[~replaced], incoming])
+                incoming = incoming[~unchanged]
+                days_updated += 1
+            else:
+                partial = incoming
+            self._write_pickle(partial, path)
+            new_day_partials[day] = partial
+            additions.append(_customer_rows(incoming, day))
+
+        customers = self.customers
+        remerge = remerge_ids[0].append(remerge_ids[1:]).unique() if remerge_ids else pd.Index([])
+        updated = pd.Index([])
+
+        incoming = pd.concat(additions) if additions else customers.iloc[0:0]
+        incoming = incoming[~incoming.index.isin(remerge)]
+        if len(incoming):
+            incoming_ids = incoming.index.unique()
+            existing = customers[customers.index.isin(incoming_ids)]
+            merged = merge_partials(pd.concat([existing, incoming]) if len(existing) else incoming)
+            customers = _replace_rows(customers, incoming_ids, merged)
+            updated = updated.union(incoming_ids)
+
+        if len(remerge):
+            # Only the days these customers were (or now are) active on
+            known = customers.loc[customers.index.intersection(remerge), 'days']
+            active_days = set().union(*known) | set(new_day_partials)
+            parts = []
+            for day in sorted(active_days):
+                partial = new_day_partials.get(day)
+                if partial is None:
+                    partial = pd.read_pickle(self._day_path(day))
+                rows = partial[partial.index.get_level_values('customer_id').isin(remerge)]
+                if len(rows):
+                    parts.append(_customer_rows(rows, day))
+            merged = merge_partials(pd.concat(parts)) if parts else customers.iloc[0:0]
+            customers = _replace_rows(customers, remerge, merged)
+            updated = updated.union(remerge)
+
+        self._customers = customers
+        stats = {"days_added": len(new_day_partials) - days_updated, "days_updated": days_updated,
+                 "customers_updated": len(updated), "customers_remerged": len(remerge)}
+
+        if run is not None:
+            duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+            run.log_step("customer_state_merge", "success",
+                        duration_ms=duration_ms, rows=len(df), customers=len(customers),
+                        **stats)
+        return stats
+
+    def save(self) -> None:
+        """Persist the merged customer table atomically"""
+        self._write_pickle(self.customers, self.customers_path)
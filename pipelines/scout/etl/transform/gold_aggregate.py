@@ -0,0 +1,283 @@
+"""
+Gold layer aggregates for Scout ETL Pipeline
+Daily store x brand x category x payment-method sales, maintained per date partition
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple, Union
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.dataset import PartitionedDataset, partition_values
+from ..common.datetimes import parse_datetimes
+from ..common.calendar_dim import date_key
+from ..common.aggregate import broadcast_group_stats
+from ..common.util import row_content_hash
+from ..common.spill import SpillStore
+from ..common.spatial import hex_cells, hex_centers
+from .silver_enrich import estimated_margin_rate
+
+DAILY_SALES_TABLE = 'daily_sales'
+DAILY_SALES_DIMENSIONS = ['store_id', 'brand', 'category', 'payment_method']
+
+# All measures are additive across partitions of the rows, as long as a
+# transaction is never split between partitions
+DAILY_SALES_MEASURES = ['revenue', 'quantity', 'line_items', 'transactions',
+                        'cross_sell_baskets', 'estimated_margin']
+
+# Daily sales per hex cell of store locations, for the geographic page
+GEO_DAILY_SALES_TABLE = 'geo_daily_sales'
+GEO_DAILY_SALES_MEASURES = ['revenue', 'quantity', 'line_items', 'transactions']
+
+def build_daily_aggregates(interactions_df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate silver interactions to one row per day and dimension combination
+
+    Rows with a missing dimension value are kept in their own group.
+    `transactions` counts distinct transaction ids, `cross_sell_baskets`
+    those spanning more than one brand.
+    """
+    return _finish_daily_aggregates(_daily_partials(interactions_df))
+
+def _daily_partials(interactions_df: pd.DataFrame) -> pd.DataFrame:
+    """Unrounded daily sums and counts (see `build_daily_aggregates`)"""
+    if interactions_df.empty or 'transaction_date' not in interactions_df.columns:
+        return pd.DataFrame()
+
+    df = interactions_df
+    dimensions = [c for c in DAILY_SALES_DIMENSIONS if c in df.columns]
+    frame = pd.DataFrame({
+        'transaction_date': parse_datetimes(df['transaction_date']).dt.normalize(),
+        **{col: df[col] for col in dimensions},
+        'revenue': df['total_amount'] if 'total_amount' in df.columns else np.nan,
+        'quantity': df['quantity'] if 'quantity' in df.columns else np.nan,
+    }, index=df.index)
+
+    if 'total_amount' in df.columns and 'category' in df.columns:
+        frame['estimated_margin'] = df['total_amount'] * estimated_margin_rate(df['category'])
+    else:
+        frame['estimated_margin'] = np.nan
+
+    if 'transaction_id' in df.columns:
+        frame['transaction_id'] = df['transaction_id']
+        if 'brand' in df.columns:
+            brand_count = broadcast_group_stats(df, 'transaction_id', {
+                'brands_in_basket': ('brand', 'nunique'),
+            })['brands_in_basket']
+            frame['cross_sell_id'] = df['transaction_id'].where(brand_count > 1)
+        else:
+            frame['cross_sell_id'] = None
+    else:
+        frame['transaction_id'] = None
+        frame['cross_sell_id'] = None
+
+    keys = ['transaction_date'] + dimensions
+    grouped = frame.groupby(keys, dropna=False, observed=True, sort=True)
+    daily = grouped.agg(
+        revenue=('revenue', 'sum'),
+        quantity=('quantity', 'sum'),
+        line_items=('revenue', 'size'),
+        transactions=('transaction_id', 'nunique'),
+        cross_sell_baskets=('cross_sell_id', 'nunique'),
+        estimated_margin=('estimated_margin', 'sum'),
+    ).reset_index()
+
+    daily.insert(1, 'date_key', date_key(daily['transaction_date']))
+    return daily
+
+def _combine_partials(parts: List[pd.DataFrame],
+                      dimensions: List[str] = DAILY_SALES_DIMENSIONS,
+                      measures: List[str] = DAILY_SALES_MEASURES) -> pd.DataFrame:
+    """Sum daily partials built over disjoint sets of transactions"""
+    parts = [p for p in parts if not p.empty]
+    if len(parts) <= 1:
+        return parts[0] if parts else pd.DataFrame()
+
+    combined = pd.concat(parts, ignore_index=True)
+    keys = [c for c in ['transaction_date', 'date_key'] + dimensions
+            if c in combined.columns]
+    return combined.groupby(keys, dropna=False, observed=True, sort=True)[
+        measures].sum().reset_index()
+
+def _finish_daily_aggregates(daily: pd.DataFrame) -> pd.DataFrame:
+    if daily.empty:
+        return daily
+    daily['revenue'] = daily['revenue'].round(2)
+    daily['estimated_margin'] = daily['estimated_margin'].round(2)
+    daily['avg_basket_value'] = (
+        daily['revenue'] / daily['transactions'].where(daily['transactions'] > 0)
+    ).round(2)
+    daily['_row_hash'] = row_content_hash(daily)
+    return daily
+
+def store_hex_cells(stores: Optional[pd.DataFrame],
+                    size_km: Optional[float] = None) -> Optional[pd.Series]:
+    """Hex cell id per store_id for stores with coordinates (None without any)"""
+    if stores is None or stores.empty or \
+            not {'store_id', 'latitude', 'longitude'}.issubset(stores.columns):
+        return None
+    located = stores.dropna(subset=['latitude', 'longitude'])
+    located = located[~located['store_id'].duplicated(keep='last')]
+    if located.empty:
+        return None
+    cells = hex_cells(located['latitude'], located['longitude'], size_km)
+    return pd.Series(cells.to_numpy(), index=located['store_id'].to_numpy(), name='hex_id')
+
+def build_geo_aggregates(interactions_df: pd.DataFrame, stores: pd.DataFrame,
+                         size_km: Optional[float] = None) -> pd.DataFrame:
+    """Aggregate silver interactions to one row per day and store hex cell
+
+    Each store is placed in a hex cell of `size_km` (cfg.geo_hex_size_km);
+    sales of stores without coordinates are kept under a null cell.
+    `stores` counts the located stores in the cell.
+    """
+    store_cells = store_hex_cells(stores, size_km)
+    if store_cells is None:
+        return pd.DataFrame()
+    return _finish_geo_aggregates(_geo_partials(interactions_df, store_cells), store_cells, size_km)
+
+def _geo_partials(interactions_df: pd.DataFrame, store_cells: pd.Series) -> pd.DataFrame:
+    """Unrounded daily sums and counts per hex cell (see `build_geo_aggregates`)"""
+    df = interactions_df
+    if df.empty or not {'transaction_date', 'store_id'}.issubset(df.columns):
+        return pd.DataFrame()
+
+    frame = pd.DataFrame({
+        'transaction_date': parse_datetimes(df['transaction_date']).dt.normalize(),
+        'hex_id': df['store_id'].map(store_cells).astype('Int64'),
+        'revenue': df['total_amount'] if 'total_amount' in df.columns else np.nan,
+        'quantity': df['quantity'] if 'quantity' in df.columns else np.nan,
+        'transaction_id': df['transaction_id'] if 'transaction_id' in df.columns else None,
+    }, index=df.index)
+
+    geo = frame.groupby(['transaction_date', 'hex_id'], dropna=False, sort=True).agg(
+        revenue=('revenue', 'sum'),
+        quantity=('quantity', 'sum'),
+        line_items=('revenue', 'size'),
+        transactions=('transaction_id', 'nunique'),
+    ).reset_index()
+
+    geo.insert(1, 'date_key', date_key(geo['transaction_date']))
+    return geo
+
+def _finish_geo_aggregates(geo: pd.DataFrame, store_cells: pd.Series,
+                           size_km: Optional[float] = None) -> pd.DataFrame:
+    if geo.empty:
+        return geo
+    geo['revenue'] = geo['revenue'].round(2)
+    geo['avg_basket_value'] = (
+        geo['revenue'] / geo['transactions'].where(geo['transactions'] > 0)
+    ).round(2)
+    geo['stores'] = geo['hex_id'].map(store_cells.value_counts()).fillna(0).astype('int64')
+    geo['hex_lat'], geo['hex_lon'] = hex_centers(geo['hex_id'], size_km)
+    geo['_row_hash'] = row_content_hash(geo)
+    return geo
+
+def build_gold(silver_data: Dict[str, Any], run: ETLRun,
+               incremental: bool = False,
+               dataset_root: Optional[str] = None,
+               silver_root: Optional[str] = None,
+               dates: Optional[List[str]] = None) -> pd.DataFrame:
+    """Refresh the daily sales aggregates for the dates present in `silver_data`
+
+    Aggregates are stored as a `PartitionedDataset` partitioned by
+    transaction date, and only partitions for dates in the batch are
+    rewritten. With `incremental`, `silver_data['interactions']` is the
+    delta from `to_silver_incremental`: each touched date is re-aggregated
+    from the persisted silver partition, which holds the whole day.
+    Spilled interactions (`to_silver_out_of_core`) are aggregated bucket
+    by bucket. `dates` (partition labels, e.g. from change detection)
+    restricts a full refresh to those days; a listed day without rows is
+    removed. When silver stores have coordinates, per-day hex cell rollups
+    (`geo_daily_sales`) are rewritten for the same dates. Returns the
+    daily aggregates that were written.
+    """
+    interactions = silver_data.get('interactions')
+    if interactions is None or len(interactions) == 0:
+        run.log_step("gold_daily_sales", "skipped", note="No interactions data")
+        return pd.DataFrame()
+
+    start_time = pd.Timestamp.now()
+    root = dataset_root or cfg.gold_dataset_dir
+    gold_ds = PartitionedDataset(root, DAILY_SALES_TABLE, 'transaction_date')
+
+    # Hex rollups need store coordinates; they are rewritten for the same dates
+    store_cells = store_hex_cells(silver_data.get('stores'))
+    geo_ds = PartitionedDataset(root, GEO_DAILY_SALES_TABLE, 'transaction_date') \
+        if store_cells is not None else None
+    geo = pd.DataFrame()
+
+    try:
+        if incremental:
+            silver_ds = PartitionedDataset(silver_root or cfg.silver_dataset_dir,
+                                           'interactions', 'transaction_date')
+            touched = sorted(partition_values(interactions['transaction_date']).unique())
+            written, geo_written = [], []
+            for value in touched:
+                day = silver_ds.read_partition(value)
+                daily = build_daily_aggregates(day)
+                gold_ds.write_partition(value, daily)
+                written.append(daily)
+                if geo_ds is not None:
+                    geo = _finish_geo_aggregates(_geo_partials(day, store_cells), store_cells)
+                    geo_ds.write_partition(value, geo)
+                    geo_written.append(geo)
+            daily = _concat_written(written)
+            geo = _concat_written(geo_written)
+        elif dates is not None:
+            labels = partition_values(interactions['transaction_date'])
+            rows = interactions[labels.isin(dates)]
+            daily = build_daily_aggregates(rows)
+            written = gold_ds.write(daily) if not daily.empty else []
+            for value in set(dates) - set(written):
+                gold_ds.delete_partition(value)
+            if geo_ds is not None:
+                geo = _finish_geo_aggregates(_geo_partials(rows, store_cells), store_cells)
+                geo_written = geo_ds.write(geo) if not geo.empty else []
+                for value in set(dates) - set(geo_written):
+                    geo_ds.delete_partition(value)
+            touched = sorted(dates)
+        else:
+            daily, geo = _aggregate_interactions(interactions, store_cells)
+            touched = gold_ds.write(daily) if not daily.empty else []
+            if geo_ds is not None and not geo.empty:
+                geo_ds.write(geo)
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("gold_daily_sales", "success",
+                    duration_ms=duration_ms,
+                    rows=len(daily),
+                    geo_rows=len(geo),
+                    partitions_written=len(touched),
+                    incremental=incremental)
+        run.log_metric("gold_daily_sales_rows", len(daily))
+        run.log_metric("gold_daily_sales_partitions_written", len(touched))
+        if geo_ds is not None:
+            run.log_metric("gold_geo_daily_sales_rows", len(geo))
+
+        return daily
+
+    except Exception as e:
+        run.log_error("gold_daily_sales", str(e))
+        raise
+
+def _concat_written(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def _aggregate_interactions(interactions: Union[pd.DataFrame, SpillStore],
+                            store_cells: Optional[pd.Series] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Daily aggregates and (with store cells) hex rollups of all interactions"""
+    if isinstance(interactions, SpillStore):
+        # Buckets are keyed by transaction_id, so bucket aggregates add up
+        daily_parts, geo_parts = [], []
+        for _, df in interactions.iter_buckets():
+            daily_parts.append(_daily_partials(df))
+            if store_cells is not None:
+                geo_parts.append(_geo_partials(df, store_cells))
+        daily = _finish_daily_aggregates(_combine_partials(daily_parts))
+        geo = _combine_partials(geo_parts, ['hex_id'], GEO_DAILY_SALES_MEASURES)
+    else:
+        daily = build_daily_aggregates(interactions)
+        geo = _geo_partials(interactions, store_cells) if store_cells is not None else pd.DataFrame()
+    if store_cells is not None:
+        geo = _finish_geo_aggregates(geo, store_cells)
+    return daily, geo
@@ -4,13 +4,21 @@ Apply business rules, data quality, and standardization
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from ..common.config import cfg
 from ..common.log import ETLRun
 from ..common.util import (
     create_surrogate_key, validate_primary_key, validate_foreign_key,
-    calculate_data_quality_score
+    calculate_data_quality_score, dataframe_fingerprint, row_content_hash
 )
+from ..common.dataset import PartitionedDataset, partition_values
+from ..common.datetimes import parse_datetimes
+from ..common.calendar_dim import calendar_columns, hour_columns
+from ..common.dtypes import optimize_dtypes, concat_aligned
+from ..common.aggregate import group_codes, first_n_distinct_join
+from ..common.spill import SpillStore, plan_bucket_count
+from ..common.validation import validate_tables, report_passed
+from ..orchestrate.dag import StageDAG
 
 def to_silver(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd.DataFrame]:
     """Transform bronze data to silver layer with business rules"""
@@ -18,30 +26,41 @@ def to_silver(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd
     silver_data = {}
 
     try:
-        # Process in dependency order: stores -> devices -> sales
+        # Conformance stages only depend on their own bronze input; FK
+        # coverage checks are separate nodes so stores, devices and
+        # interactions conform concurrently
+        dag = StageDAG("silver_conform")
+
         if 'stores' in bronze_data:
-            silver_data['stores'] = conform_stores(bronze_data['stores'], run)
+            dag.add('stores', lambda: conform_stores(bronze_data['stores'], run))
 
         if 'devices' in bronze_data:
-            silver_data['devices'] = conform_devices(
-                bronze_data['devices'],
-                silver_data.get('stores'),
-                run
-            )
+            dag.add('devices', lambda: conform_devices(bronze_data['devices'], None, run))
+            if 'stores' in bronze_data:
+                dag.add('devices_fk',
+                        lambda devices, stores: _validate_device_foreign_keys(devices, stores, run),
+                        deps=['devices', 'stores'])
 
         if 'sales' in bronze_data:
-            silver_data['interactions'] = conform_interactions(
-                bronze_data['sales'],
-                silver_data.get('stores'),
-                silver_data.get('devices'),
-                run
-            )
-
-        # Add derived tables
-        if 'interactions' in silver_data:
-            silver_data['transactions'] = create_transaction_summary(
-                silver_data['interactions'], run
-            )
+            dag.add('interactions',
+                    lambda: conform_interactions(bronze_data['sales'], None, None, run))
+
+            fk_deps = [name for name in ('stores', 'devices') if name in bronze_data]
+            if fk_deps:
+                dag.add('interactions_fk',
+                        lambda interactions, *dims: _validate_interaction_foreign_keys(
+                            interactions, dict(zip(fk_deps, dims)), run),
+                        deps=['interactions'] + fk_deps)
+
+            # Add derived tables
+            dag.add('transactions',
+                    lambda interactions: create_transaction_summary(interactions, run),
+                    deps=['interactions'])
+
+        result = dag.run(run)
+        for table_name in ('stores', 'devices', 'interactions', 'transactions'):
+            if table_name in result.outputs:
+                silver_data[table_name] = result.outputs[table_name]
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("silver_conform", "success",
@@ -58,6 +77,295 @@ def to_silver(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd
         run.log_error("silver_conform", str(e))
         raise
 
+BRONZE_METADATA_VOLATILE = ['_bronze_loaded_at', '_bronze_row_id']
+
+def to_silver_incremental(bronze_data: Dict[str, pd.DataFrame], run: ETLRun,
+                          dataset_root: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Conform only new/changed bronze partitions and merge them into persisted silver
+
+    Sales are partitioned by transaction day. A partition is re-conformed
+    only when its bronze content fingerprint differs from the one recorded
+    at the last merge. Conformed rows are upserted into the persisted
+    `interactions` table by `interaction_key` (all rows sharing a key are
+    replaced, so reprocessing never duplicates line items), and the
+    `transactions` summary is recomputed only for the affected
+    `transaction_id`s and upserted by `transaction_key`.
+
+    Returns the (small) dimension tables plus the changed interactions and
+    transactions, so downstream stages process the delta only.
+    """
+    start_time = pd.Timestamp.now()
+    root = dataset_root or cfg.silver_dataset_dir
+    silver_data = {}
+
+    try:
+        # Dimensions are small: conform in full and replace
+        if 'stores' in bronze_data:
+            silver_data['stores'] = conform_stores(bronze_data['stores'], run)
+            PartitionedDataset(root, 'stores').write(silver_data['stores'])
+
+        if 'devices' in bronze_data:
+            silver_data['devices'] = conform_devices(
+                bronze_data['devices'], silver_data.get('stores'), run
+            )
+            PartitionedDataset(root, 'devices').write(silver_data['devices'])
+
+        sales_df = bronze_data.get('sales')
+        if sales_df is None or sales_df.empty or 'transaction_date' not in sales_df.columns:
+            duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+            run.log_step("silver_conform_incremental", "skipped",
+                        duration_ms=duration_ms, note="No partitionable sales data")
+            return silver_data
+
+        interactions_ds = PartitionedDataset(root, 'interactions', 'transaction_date')
+        transactions_ds = PartitionedDataset(root, 'transactions', 'transaction_date')
+
+        # Detect changed bronze partitions by content fingerprint
+        known = interactions_ds.get_meta('bronze_partition_fingerprints', {})
+        labels = partition_values(sales_df['transaction_date'])
+        content_cols = [c for c in sales_df.columns if c not in BRONZE_METADATA_VOLATILE]
+
+        changed_fps = {}
+        changed_positions = []
+        for value, positions in labels.groupby(labels, sort=True).indices.items():
+            part = sales_df.iloc[positions][content_cols].reset_index(drop=True)
+            fp = dataframe_fingerprint(part)
+            if known.get(value) != fp:
+                changed_fps[value] = fp
+                changed_positions.append(positions)
+
+        run.log_metric("silver_incremental_partitions_total", int(labels.nunique()))
+        run.log_metric("silver_incremental_partitions_changed", len(changed_fps))
+
+        if not changed_positions:
+            silver_data['interactions'] = sales_df.iloc[0:0]
+            silver_data['transactions'] = pd.DataFrame()
+            duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+            run.log_step("silver_conform_incremental", "success",
+                        duration_ms=duration_ms, rows=0, note="No changed partitions")
+            return silver_data
+
+        delta_bronze = sales_df.iloc[np.sort(np.concatenate(changed_positions))]
+
+        # Conform the delta only
+        delta = conform_interactions(delta_bronze, None, None, run)
+        # Re-delivered rows differ only in per-row `_bronze_*`/`_silver_*`
+        # metadata, so duplicates are found by content hash
+        row_hashes = delta['_row_hash'] if '_row_hash' in delta.columns else row_content_hash(delta)
+        duplicates = row_hashes.duplicated().to_numpy()
+        if duplicates.any():
+            run.log_metric("silver_incremental_duplicates_dropped", int(duplicates.sum()))
+            delta = delta[~duplicates]
+        _validate_interaction_foreign_keys(
+            delta, {'stores': silver_data.get('stores'), 'devices': silver_data.get('devices')}, run
+        )
+
+        # Upsert interactions by interaction_key, partition by partition
+        delta_labels = partition_values(delta['transaction_date'])
+        delta_keys = pd.Index(delta['interaction_key'].unique())
+        affected_tx = pd.Index(delta['transaction_id'].dropna().unique()) \
+            if 'transaction_id' in delta.columns else pd.Index([])
+
+        merged_partitions = {}
+        touched = set(delta_labels.unique()) | set(changed_fps)
+        for value in sorted(touched):
+            existing = interactions_ds.read_partition(value)
+            incoming = delta[delta_labels == value]
+            if not existing.empty:
+                existing = existing[~existing['interaction_key'].isin(delta_keys)]
+                merged = concat_aligned([existing, incoming], ignore_index=True)
+            else:
+                merged = incoming.reset_index(drop=True)
+            interactions_ds.write_partition(value, merged)
+            merged_partitions[value] = merged
+
+        # Recompute transaction summaries for affected transaction_ids only
+        delta_tx = pd.DataFrame()
+        if len(affected_tx):
+            affected_rows = concat_aligned(
+                [m[m['transaction_id'].isin(affected_tx)] for m in merged_partitions.values()
+                 if not m.empty],
+                ignore_index=True
+            ) if merged_partitions else pd.DataFrame()
+            delta_tx = create_transaction_summary(affected_rows, run)
+
+            if not delta_tx.empty and 'transaction_date' in delta_tx.columns:
+                tx_labels = partition_values(delta_tx['transaction_date'])
+                for value in sorted(set(tx_labels.unique()) | set(merged_partitions)):
+                    existing = transactions_ds.read_partition(value)
+                    incoming = delta_tx[tx_labels == value]
+                    if not existing.empty:
+                        existing = existing[~existing['transaction_id'].isin(affected_tx)]
+                        incoming = concat_aligned([existing, incoming], ignore_index=True)
+                    transactions_ds.write_partition(value, incoming)
+
+        known.update(changed_fps)
+        interactions_ds.set_meta('bronze_partition_fingerprints', known)
+
+        silver_data['interactions'] = delta
+        silver_data['transactions'] = delta_tx
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("silver_conform_incremental", "success",
+                    duration_ms=duration_ms,
+                    rows=len(delta),
+                    partitions_merged=len(merged_partitions),
+                    transactions_recomputed=len(delta_tx))
+
+        validation_passed = validate_silver_data(silver_data, run)
+        run.log_metric("silver_validation_passed", validation_passed)
+
+        return silver_data
+
+    except Exception as e:
+        run.log_error("silver_conform_incremental", str(e))
+        raise
+
+def spill_bronze_sales(chunks: Iterable[pd.DataFrame], run: ETLRun,
+                       expected_rows: Optional[int] = None,
+                       n_buckets: Optional[int] = None,
+                       spill_root: Optional[str] = None) -> SpillStore:
+    """Hash-partition bronze sales chunks to disk by transaction
+
+    Chunks are appended as they arrive, so a streamed extract is never
+    held in memory as a whole. The bucket count is planned from the first
+    chunk's bytes per row times `expected_rows` (default: that chunk's
+    rows) against cfg.memory_budget_mb. Buckets are keyed by
+    `transaction_id` (`interaction_id` for sources without transaction
+    ids, which have nothing to summarize per basket).
+    """
+    start_time = pd.Timestamp.now()
+    chunks = iter(chunks)
+    first = next((chunk for chunk in chunks if not chunk.empty), None)
+    if first is None:
+        run.log_step("spill_bronze_sales", "skipped", note="No sales data")
+        return SpillStore.create('bronze_sales', 'transaction_id', 1, spill_root)
+
+    try:
+        spill_key = next((col for col in ('transaction_id', 'interaction_id')
+                          if col in first.columns), None)
+        if spill_key is None:
+            raise ValueError("Sales data has neither transaction_id nor interaction_id to partition by")
+
+        if n_buckets is None:
+            bytes_per_row = first.memory_usage(deep=True).sum() / len(first)
+            n_buckets = plan_bucket_count(int(bytes_per_row * max(expected_rows or 0, len(first))),
+                                          cfg.memory_budget_mb * 1024 * 1024)
+
+        store = SpillStore.create('bronze_sales', spill_key, n_buckets, spill_root)
+        store.append(first)
+        n_chunks = 1
+        del first
+        for chunk in chunks:
+            store.append(chunk)
+            n_chunks += 1
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("spill_bronze_sales", "success",
+                    duration_ms=duration_ms,
+                    rows=len(store),
+                    chunks=n_chunks,
+                    buckets=n_buckets)
+        return store
+
+    except Exception as e:
+        run.log_error("spill_bronze_sales", str(e))
+        raise
+
+def to_silver_out_of_core(bronze_data: Dict[str, Any], run: ETLRun,
+                          n_buckets: Optional[int] = None,
+                          spill_root: Optional[str] = None) -> Dict[str, Any]:
+    """Conform bronze to silver one hash bucket of transactions at a time
+
+    Sales are spilled to disk hash-partitioned by `transaction_id` (or
+    arrive already spilled by `spill_bronze_sales`), so every line item of
+    a transaction (and every exact duplicate) lands in the same bucket; each bucket is conformed and summarized independently,
+    keeping the working set within cfg.memory_budget_mb. Dimensions are
+    small and conformed in memory.
+
+    Returns the dimension frames plus `interactions` and `transactions` as
+    SpillStores bucketed by `transaction_id` (`interaction_id` for sources
+    without transaction ids).
+    """
+    start_time = pd.Timestamp.now()
+    silver_data: Dict[str, Any] = {}
+
+    try:
+        if 'stores' in bronze_data:
+            silver_data['stores'] = conform_stores(bronze_data['stores'], run)
+
+        if 'devices' in bronze_data:
+            silver_data['devices'] = conform_devices(bronze_data['devices'], None, run)
+            _validate_device_foreign_keys(silver_data['devices'], silver_data.get('stores'), run)
+
+        validation_passed = validate_silver_data(silver_data, run)
+
+        sales = bronze_data.get('sales')
+        if sales is None or len(sales) == 0:
+            run.log_step("silver_conform_out_of_core", "skipped", note="No sales data")
+            return silver_data
+
+        # Sales streamed into a spill (`spill_bronze_sales`) are owned by the
+        # caller; an in-memory frame is spilled here and cleared afterwards
+        owns_spill = not isinstance(sales, SpillStore)
+        bronze_spill = spill_bronze_sales([sales], run, n_buckets=n_buckets,
+                                          spill_root=spill_root) if owns_spill else sales
+        spill_key, n_buckets = bronze_spill.key, bronze_spill.n_buckets
+
+        interactions = SpillStore(bronze_spill.root, 'interactions', spill_key, n_buckets)
+        transactions = SpillStore(bronze_spill.root, 'transactions', spill_key, n_buckets)
+        fk_values = {'store_id': [], 'device_id': []}
+        null_cells = total_cells = 0
+
+        for bucket, bucket_df in bronze_spill.iter_buckets():
+            conformed = conform_interactions(bucket_df, None, None, run)
+            if conformed.empty:
+                continue
+            interactions.write_bucket(bucket, conformed)
+            transactions.write_bucket(bucket, create_transaction_summary(conformed, run))
+
+            for col, values in fk_values.items():
+                if col in conformed.columns:
+                    values.append(conformed[col].dropna().unique())
+            null_cells += int(conformed.isnull().sum().sum())
+            total_cells += conformed.size
+
+        if owns_spill:
+            bronze_spill.clear()
+
+        # Foreign key coverage over the distinct keys of all buckets
+        key_frame = {col: pd.unique(np.concatenate(values)) if values else np.array([])
+                     for col, values in fk_values.items()}
+        for col, dim_name in (('store_id', 'stores'), ('device_id', 'devices')):
+            dim_df = silver_data.get(dim_name)
+            if dim_df is not None and not dim_df.empty and len(key_frame[col]):
+                fk = validate_foreign_key(pd.DataFrame({col: key_frame[col]}), col, dim_df, col)
+                run.log_metric(f"interactions_{dim_name.rstrip('s')}_fk_coverage", fk["coverage_pct"])
+
+        completeness = 1 - null_cells / total_cells if total_cells else 1
+        run.log_metric("silver_interactions_quality_score", completeness)
+        if completeness < 0.8:
+            run.log_error("silver_validation_interactions",
+                         f"Low data quality: {completeness:.2%}")
+            validation_passed = False
+        run.log_metric("silver_validation_passed", validation_passed)
+
+        silver_data['interactions'] = interactions
+        silver_data['transactions'] = transactions
+
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("silver_conform_out_of_core", "success",
+                    duration_ms=duration_ms,
+                    rows=len(interactions),
+                    buckets=n_buckets,
+                    transactions=len(transactions))
+
+        return silver_data
+
+    except Exception as e:
+        run.log_error("silver_conform_out_of_core", str(e))
+        raise
+
 def conform_stores(stores_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
     """Conform stores data to silver layer standards"""
     if stores_df.empty:
@@ -112,15 +420,7 @@ def conform_devices(devices_df: pd.DataFrame,
         df['device_key'] = create_surrogate_key(df, ['device_id'])
 
         # Validate foreign key to stores
-        if stores_df is not None and not stores_df.empty:
-            fk_validation = validate_foreign_key(
-                df, 'store_id', stores_df, 'store_id'
-            )
-            run.log_metric("devices_store_fk_coverage", fk_validation["coverage_pct"])
-
-            if fk_validation["orphan_count"] > 0:
-                run.log_step("conform_devices_orphans", "warning",
-                            orphan_count=fk_validation["orphan_count"])
+        _validate_device_foreign_keys(df, stores_df, run)
 
         # Validate primary key
         pk_valid = validate_primary_key(df, ['device_id'])
@@ -162,21 +462,9 @@ def conform_interactions(interactions_df: pd.DataFrame,
         )
 
         # Validate foreign keys
-        fk_validations = {}
-
-        if stores_df is not None and not stores_df.empty:
-            fk_validations['store'] = validate_foreign_key(
-                df, 'store_id', stores_df, 'store_id'
-            )
-
-        if devices_df is not None and not devices_df.empty:
-            fk_validations['device'] = validate_foreign_key(
-                df, 'device_id', devices_df, 'device_id'
-            )
-
-        # Log foreign key validation results
-        for fk_name, validation in fk_validations.items():
-            run.log_metric(f"interactions_{fk_name}_fk_coverage", validation["coverage_pct"])
+        _validate_interaction_foreign_keys(
+            df, {'stores': stores_df, 'devices': devices_df}, run
+        )
 
         # Add derived columns
         df = _add_interaction_derived_columns(df)
@@ -184,6 +472,11 @@ def conform_interactions(interactions_df: pd.DataFrame,
         # Add silver metadata
         df = _add_silver_metadata(df, 'interactions')
 
+        # Compact storage: downcast ids/quantities, shared-dictionary categoricals
+        if cfg.optimize_dtypes:
+            df = optimize_dtypes(df, run, 'silver_interactions',
+                                 exclude=['interaction_key', 'transaction_id'])
+
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("conform_interactions", "success",
                     duration_ms=duration_ms, rows=len(df))
@@ -194,6 +487,50 @@ def conform_interactions(interactions_df: pd.DataFrame,
         run.log_error("conform_interactions", str(e))
         raise
 
+def _validate_device_foreign_keys(devices_df: pd.DataFrame,
+                                  stores_df: Optional[pd.DataFrame],
+                                  run: ETLRun) -> Optional[Dict[str, Any]]:
+    """Validate and log device -> store foreign key coverage"""
+    if stores_df is None or stores_df.empty or devices_df.empty:
+        return None
+
+    fk_validation = validate_foreign_key(
+        devices_df, 'store_id', stores_df, 'store_id'
+    )
+    run.log_metric("devices_store_fk_coverage", fk_validation["coverage_pct"])
+
+    if fk_validation["orphan_count"] > 0:
+        run.log_step("conform_devices_orphans", "warning",
+                    orphan_count=fk_validation["orphan_count"])
+
+    return fk_validation
+
+def _validate_interaction_foreign_keys(interactions_df: pd.DataFrame,
+                                       dims: Dict[str, Optional[pd.DataFrame]],
+                                       run: ETLRun) -> Dict[str, Dict[str, Any]]:
+    """Validate and log interaction -> store/device foreign key coverage"""
+    fk_validations = {}
+    if interactions_df.empty:
+        return fk_validations
+
+    stores_df = dims.get('stores')
+    if stores_df is not None and not stores_df.empty:
+        fk_validations['store'] = validate_foreign_key(
+            interactions_df, 'store_id', stores_df, 'store_id'
+        )
+
+    devices_df = dims.get('devices')
+    if devices_df is not None and not devices_df.empty:
+        fk_validations['device'] = validate_foreign_key(
+            interactions_df, 'device_id', devices_df, 'device_id'
+        )
+
+    # Log foreign key validation results
+    for fk_name, validation in fk_validations.items():
+        run.log_metric(f"interactions_{fk_name}_fk_coverage", validation["coverage_pct"])
+
+    return fk_validations
+
 def create_transaction_summary(interactions_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
     """Create transaction-level summary from interactions"""
     if interactions_df.empty:
@@ -202,32 +539,44 @@ def create_transaction_summary(interactions_df: pd.DataFrame, run: ETLRun) -> pd
     start_time = pd.Timestamp.now()
 
     try:
-        # Group by transaction to create summary
-        transaction_cols = ['transaction_id', 'store_id', 'device_id',
-                           'transaction_date', 'transaction_timestamp', 'payment_method']
-
-        # Check which columns exist
-        existing_cols = [col for col in transaction_cols if col in interactions_df.columns]
-
-        if not existing_cols:
+        if 'transaction_id' not in interactions_df.columns:
             run.log_step("create_transaction_summary", "skipped",
                         note="Required transaction columns not found")
             return pd.DataFrame()
 
-        # Aggregate interactions to transactions
-        df = (interactions_df.groupby(existing_cols, as_index=False)
-              .agg({
-                  'quantity': 'sum',
-                  'total_amount': 'sum',
-                  'product_name': 'count',  # Item count
-                  'brand': lambda x: '|'.join(x.unique()[:5]),  # Top 5 brands
-                  'category': lambda x: '|'.join(x.unique()[:3])  # Top 3 categories
-              })
-              .rename(columns={
-                  'product_name': 'item_count',
-                  'brand': 'brands_purchased',
-                  'category': 'categories_purchased'
-              }))
+        # Group by transaction_id alone; header attributes are carried along
+        # (first value, earliest timestamp) instead of being group keys
+        carried = {
+            'store_id': 'first',
+            'device_id': 'first',
+            'transaction_date': 'first',
+            'transaction_timestamp': 'min',
+            'payment_method': 'first',
+        }
+        measures = {
+            'quantity': ('quantity', 'sum'),
+            'total_amount': ('total_amount', 'sum'),
+            'item_count': ('product_name', 'count'),
+        }
+        named_aggs = {col: (col, how) for col, how in carried.items()
+                      if col in interactions_df.columns}
+        named_aggs.update({name: spec for name, spec in measures.items()
+                           if spec[0] in interactions_df.columns})
+
+        codes, transaction_ids = group_codes(interactions_df['transaction_id'])
+        grouped = interactions_df.groupby(codes, sort=True, observed=True)
+        df = grouped.agg(**named_aggs)
+        df = df.loc[df.index >= 0]
+        df.insert(0, 'transaction_id', transaction_ids.take(df.index).to_numpy())
+        df = df.reset_index(drop=True)
+
+        # Top 5 brands / top 3 categories per transaction, in purchase order
+        if 'brand' in interactions_df.columns:
+            df['brands_purchased'] = first_n_distinct_join(
+                codes, len(transaction_ids), interactions_df['brand'], 5)
+        if 'category' in interactions_df.columns:
+            df['categories_purchased'] = first_n_distinct_join(
+                codes, len(transaction_ids), interactions_df['category'], 3)
 
         # Add derived metrics
         df['avg_item_price'] = df['total_amount'] / df['quantity']
@@ -327,19 +676,19 @@ def _apply_interaction_business_rules(df: pd.DataFrame) -> pd.DataFrame:
 def _add_interaction_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Add derived columns to interactions"""
     # Calculate derived fields if base columns exist
+    # Calendar parts come from the calendar/hour dimensions: one lookup per row
     if 'transaction_date' in df.columns:
-        df['day_of_week'] = pd.to_datetime(df['transaction_date']).dt.day_name()
-        df['month'] = pd.to_datetime(df['transaction_date']).dt.month
-        df['quarter'] = pd.to_datetime(df['transaction_date']).dt.quarter
-        df['year'] = pd.to_datetime(df['transaction_date']).dt.year
+        transaction_date = parse_datetimes(df['transaction_date'])
+        calendar = calendar_columns(transaction_date,
+                                    ['date_key', 'day_of_week', 'month', 'quarter', 'year'])
+        for col in calendar.columns:
+            df[col] = calendar[col]
 
     if 'transaction_timestamp' in df.columns:
-        df['hour'] = pd.to_datetime(df['transaction_timestamp']).dt.hour
-        df['time_of_day'] = pd.cut(
-            pd.to_datetime(df['transaction_timestamp']).dt.hour,
-            bins=[0, 6, 12, 18, 24],
-            labels=['Night', 'Morning', 'Afternoon', 'Evening']
-        )
+        hours = hour_columns(parse_datetimes(df['transaction_timestamp']),
+                             ['hour', 'time_of_day'])
+        df['hour'] = hours['hour']
+        df['time_of_day'] = hours['time_of_day']
 
     # Revenue per unit
     if 'total_amount' in df.columns and 'quantity' in df.columns:
@@ -351,44 +700,18 @@ def _add_silver_metadata(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
     """Add silver layer metadata"""
     df = df.copy()
 
+    df['_row_hash'] = row_content_hash(df)
     df['_silver_table'] = table_name
     df['_silver_loaded_at'] = pd.Timestamp.now()
-    df['_silver_quality_score'] = calculate_data_quality_score(df)["completeness"]
+    df['_silver_quality_score'] = calculate_data_quality_score(
+        df, approximate=cfg.approx_distinct, precision=cfg.hll_precision
+    )["completeness"]
 
     return df
 
 def validate_silver_data(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> bool:
-    """Validate silver layer data"""
-    validation_passed = True
-
-    for table_name, df in silver_data.items():
-        if df.empty:
-            continue
-
-        # Check for surrogate keys
-        key_column = f"{table_name.rstrip('s')}_key"
-        if table_name == 'interactions':
-            key_column = 'interaction_key'
-
-        if key_column not in df.columns:
-            run.log_error(f"silver_validation_{table_name}",
-                         f"Missing surrogate key: {key_column}")
-            validation_passed = False
-
-        # Check data quality
-        quality = calculate_data_quality_score(df)
-        if quality["completeness"] < 0.8:  # 80% completeness threshold
-            run.log_error(f"silver_validation_{table_name}",
-                         f"Low data quality: {quality['completeness']:.2%}")
-            validation_passed = False
-
-        # Check for required business rules
-        if table_name == 'stores' and 'status' in df.columns:
-            inactive_count = (~df['status'].str.upper().isin(['ACTIVE', 'OPEN'])).sum()
-            if inactive_count > 0:
-                run.log_error(f"silver_validation_{table_name}",
-                             f"Found {inactive_count} inactive stores")
-
-        run.log_metric(f"silver_{table_name}_quality_score", quality["completeness"])
-
-    return validation_passed
\ No newline at end of file
+    """Validate non-empty silver tables against the configured silver rules"""
+    tables = [name for name, df in silver_data.items()
+              if isinstance(df, pd.DataFrame) and not df.empty]
+    report = validate_tables("silver", silver_data, run, tables=tables)
+    return report_passed(report)
\ No newline at end of file
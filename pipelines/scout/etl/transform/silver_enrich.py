@@ -4,13 +4,39 @@ Add derived insights, lookups, and cross-table joins
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from ..common.config import cfg
 from ..common.log import ETLRun
 from ..common.util import create_surrogate_key, calculate_data_quality_score
-
-def enrich_interactions(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> pd.DataFrame:
-    """Enrich interactions with store and device information"""
+from ..common.datetimes import parse_datetimes
+from ..common.dtypes import optimize_dtypes, concat_aligned
+from ..common.aggregate import (
+    broadcast_group_stats, broadcast_stats_table, group_stat_partials, merge_group_stats
+)
+from ..common.lookup import DimensionLookup
+from ..common.spill import SpillStore, hash_buckets
+from ..common.shared import SharedPayload, SharedHandle, load_shared, process_pool
+from ..common.calendar_dim import calendar_columns, hour_columns
+from ..common.quantiles import (
+    KLLSketch, merge_sketches, quantile_bin_edges, assign_quantile_bins
+)
+from .customer_state import (
+    CustomerAggregateState, build_customer_partials, customer_metrics_from_state
+)
+
+def enrich_interactions(silver_data: Dict[str, pd.DataFrame], run: ETLRun,
+                        group_stats: Optional[Dict[str, pd.DataFrame]] = None,
+                        max_workers: Optional[int] = None) -> pd.DataFrame:
+    """Enrich interactions with store and device information
+
+    Brand, category and customer statistics are computed once up front, or
+    taken from `group_stats` (see `compute_enrichment_globals`) so a
+    partition enriches exactly as the whole would; everything else is
+    row-local. Large batches are split into transaction-hash shards and
+    enriched on a process pool, with the statistics and dimensions handed
+    to workers through shared memory; shards are reassembled in input
+    order, so the result is identical to the serial path.
+    """
     if 'interactions' not in silver_data or silver_data['interactions'].empty:
         run.log_step("enrich_interactions", "skipped", note="No interactions data")
         return pd.DataFrame()
@@ -18,47 +44,42 @@ def enrich_interactions(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> pd
     start_time = pd.Timestamp.now()
 
     try:
-        interactions_df = silver_data['interactions'].copy()
+        interactions_df = silver_data['interactions']
         stores_df = silver_data.get('stores', pd.DataFrame())
         devices_df = silver_data.get('devices', pd.DataFrame())
 
-        # Start with base interactions
-        enriched_df = interactions_df.copy()
-
-        # Enrich with store data
-        if not stores_df.empty:
-            enriched_df = _enrich_with_store_data(enriched_df, stores_df, run)
-
-        # Enrich with device data
-        if not devices_df.empty:
-            enriched_df = _enrich_with_device_data(enriched_df, devices_df, run)
-
-        # Add customer insights (demographic mapping)
-        enriched_df = _add_customer_insights(enriched_df, run)
+        if group_stats is None:
+            group_stats = compute_enrichment_globals([interactions_df])
+        enriched_at = pd.Timestamp.now()
 
-        # Add business metrics
-        enriched_df = _add_business_metrics(enriched_df, run)
+        workers = max_workers or cfg.max_workers
+        parallel = workers > 1 and len(interactions_df) >= cfg.enrich_parallel_min_rows
+        if parallel:
+            enriched_df, matched = _enrich_sharded(interactions_df, stores_df, devices_df,
+                                                   group_stats, enriched_at, workers)
+        else:
+            enriched_df, matched = _enrich_rows(interactions_df, stores_df, devices_df,
+                                                group_stats, enriched_at)
 
-        # Add temporal enrichments
-        enriched_df = _add_temporal_enrichments(enriched_df, run)
+        for dimension, matched_rows in matched.items():
+            run.log_metric(f"{dimension}_enrichment_match_rate",
+                           round(matched_rows / len(enriched_df) * 100, 2))
 
-        # Update surrogate key for enriched data
-        enriched_df['interaction_enriched_key'] = create_surrogate_key(
-            enriched_df, ['transaction_id', 'store_id', 'device_id']
-        )
-
-        # Add enrichment metadata
-        enriched_df['_enriched_at'] = pd.Timestamp.now()
-        enriched_df['_enrichment_source'] = 'silver_enrich'
+        if cfg.optimize_dtypes:
+            enriched_df = optimize_dtypes(enriched_df, run, 'enriched_interactions',
+                                          exclude=['interaction_key', 'interaction_enriched_key',
+                                                   'transaction_id'])
 
         duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
         run.log_step("enrich_interactions", "success",
                     duration_ms=duration_ms,
                     rows=len(enriched_df),
-                    columns=len(enriched_df.columns))
+                    columns=len(enriched_df.columns),
+                    shards=workers if parallel else 1)
 
         # Log enrichment metrics
-        quality = calculate_data_quality_score(enriched_df)
+        quality = calculate_data_quality_score(enriched_df, approximate=cfg.approx_distinct,
+                                               precision=cfg.hll_precision)
         run.log_metric("enriched_interactions_quality", quality["completeness"])
         run.log_metric("enriched_interactions_columns", len(enriched_df.columns))
 
@@ -68,48 +89,143 @@ def enrich_interactions(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> pd
         run.log_error("enrich_interactions", str(e))
         raise
 
-def _enrich_with_store_data(interactions_df: pd.DataFrame,
-                           stores_df: pd.DataFrame,
-                           run: ETLRun) -> pd.DataFrame:
-    """Enrich interactions with store information"""
-    # Prepare store lookup data
-    store_lookup = stores_df[['store_id', 'store_name', 'store_type', 'region',
-                             'province', 'city', 'barangay', 'latitude', 'longitude']].copy()
-
-    # Rename columns to avoid conflicts
-    store_lookup.columns = ['store_id'] + [f'store_{col}' for col in store_lookup.columns[1:]]
+def _enrich_rows(interactions_df: pd.DataFrame, stores_df: pd.DataFrame,
+                 devices_df: pd.DataFrame, group_stats: Dict[str, pd.DataFrame],
+                 enriched_at: pd.Timestamp) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Row-local enrichment of a batch or shard given population-wide group stats
+
+    Returns the enriched rows and the number of rows matched per dimension.
+    """
+    enriched_df = interactions_df.copy()
+    matched = {}
+
+    # Enrich with store data
+    if not stores_df.empty:
+        enriched_df, matched['store'] = _enrich_with_store_data(enriched_df, stores_df)
+
+    # Enrich with device data
+    if not devices_df.empty:
+        enriched_df, matched['device'] = _enrich_with_device_data(enriched_df, devices_df)
+
+    # Add customer insights (demographic mapping)
+    enriched_df = _add_customer_insights(enriched_df, None, group_stats)
+
+    # Add business metrics
+    enriched_df = _add_business_metrics(enriched_df, None, group_stats)
+
+    # Add temporal enrichments
+    enriched_df = _add_temporal_enrichments(enriched_df, None)
+
+    # Update surrogate key for enriched data
+    enriched_df['interaction_enriched_key'] = create_surrogate_key(
+        enriched_df, ['transaction_id', 'store_id', 'device_id']
+    )
+
+    # Add enrichment metadata
+    enriched_df['_enriched_at'] = enriched_at
+    enriched_df['_enrichment_source'] = 'silver_enrich'
+
+    return enriched_df, matched
+
+def _enrich_shard(shard_df: pd.DataFrame, shared: SharedHandle,
+                  enriched_at: pd.Timestamp) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Pool task: enrich one shard against the shared dimensions and group stats"""
+    context = load_shared(shared)
+    return _enrich_rows(shard_df, context['stores'], context['devices'],
+                        context['group_stats'], enriched_at)
+
+def _enrich_sharded(interactions_df: pd.DataFrame, stores_df: pd.DataFrame,
+                    devices_df: pd.DataFrame, group_stats: Dict[str, pd.DataFrame],
+                    enriched_at: pd.Timestamp,
+                    n_shards: int) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Enrich transaction-hash shards on a process pool and restore input order"""
+    # Baskets stay within one shard, so per-transaction metrics are exact
+    if 'transaction_id' in interactions_df.columns:
+        shard_ids = hash_buckets(interactions_df['transaction_id'], n_shards)
+    else:
+        shard_ids = np.arange(len(interactions_df)) % n_shards
+    order = np.argsort(shard_ids, kind='stable')
+    bounds = np.flatnonzero(np.diff(shard_ids[order])) + 1
+    shard_positions = np.split(order, bounds)
+
+    context = {'stores': stores_df, 'devices': devices_df, 'group_stats': group_stats}
+    with SharedPayload(context) as shared:
+        with process_pool(min(n_shards, len(shard_positions))) as pool:
+            futures = [pool.submit(_enrich_shard, interactions_df.iloc[positions],
+                                   shared.handle, enriched_at)
+                       for positions in shard_positions]
+            results = [future.result() for future in futures]
+
+    enriched_df = concat_aligned([frame for frame, _ in results])
+    enriched_df = enriched_df.iloc[np.argsort(order, kind='stable')]
+
+    matched: Dict[str, int] = {}
+    for _, shard_matched in results:
+        for dimension, matched_rows in shard_matched.items():
+            matched[dimension] = matched.get(dimension, 0) + matched_rows
+    return enriched_df, matched
+
+def enrich_interactions_out_of_core(silver_data: Dict[str, Any], run: ETLRun) -> SpillStore:
+    """Enrich spilled interactions bucket by bucket (see `to_silver_out_of_core`)
+
+    A first pass over the buckets merges population-wide brand, category
+    and customer statistics; the second pass enriches each bucket with
+    those statistics, so results match enriching the whole window at once.
+    Basket metrics are bucket-local because buckets are keyed by
+    transaction_id.
+    """
+    interactions = silver_data.get('interactions')
+    if interactions is None or len(interactions) == 0:
+        run.log_step("enrich_interactions_out_of_core", "skipped", note="No interactions data")
+        return SpillStore.create('enriched_interactions', 'transaction_id', 1)
 
-    # Merge with interactions
-    enriched_df = interactions_df.merge(store_lookup, on='store_id', how='left')
+    start_time = pd.Timestamp.now()
 
-    # Calculate store metrics
-    store_match_rate = (enriched_df['store_name'].notna().sum() / len(enriched_df)) * 100
-    run.log_metric("store_enrichment_match_rate", round(store_match_rate, 2))
+    try:
+        group_stats = compute_enrichment_globals(df for _, df in interactions.iter_buckets())
 
-    return enriched_df
+        enriched = SpillStore(interactions.root, 'enriched_interactions', interactions.key,
+                              interactions.n_buckets)
+        dims = {name: silver_data[name] for name in ('stores', 'devices') if name in silver_data}
+        for bucket, bucket_df in interactions.iter_buckets():
+            # One bucket at a time in this process keeps the memory budget
+            enriched.write_bucket(bucket, enrich_interactions(
+                {'interactions': bucket_df, **dims}, run, group_stats=group_stats, max_workers=1
+            ))
 
-def _enrich_with_device_data(interactions_df: pd.DataFrame,
-                            devices_df: pd.DataFrame,
-                            run: ETLRun) -> pd.DataFrame:
-    """Enrich interactions with device information"""
-    # Prepare device lookup data
-    device_lookup = devices_df[['device_id', 'device_name', 'device_type',
-                               'location_in_store', 'serial_number']].copy()
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("enrich_interactions_out_of_core", "success",
+                    duration_ms=duration_ms,
+                    rows=len(enriched),
+                    buckets=interactions.n_buckets)
 
-    # Rename columns to avoid conflicts
-    device_lookup.columns = ['device_id'] + [f'device_{col}' for col in device_lookup.columns[1:]]
+        return enriched
 
-    # Merge with interactions
-    enriched_df = interactions_df.merge(device_lookup, on='device_id', how='left')
+    except Exception as e:
+        run.log_error("enrich_interactions_out_of_core", str(e))
+        raise
 
-    # Calculate device metrics
-    device_match_rate = (enriched_df['device_name'].notna().sum() / len(enriched_df)) * 100
-    run.log_metric("device_enrichment_match_rate", round(device_match_rate, 2))
+STORE_LOOKUP_COLUMNS = ['store_name', 'store_type', 'region', 'province', 'city',
+                        'barangay', 'latitude', 'longitude']
+DEVICE_LOOKUP_COLUMNS = ['device_name', 'device_type', 'location_in_store', 'serial_number']
 
-    return enriched_df
+def _enrich_with_store_data(interactions_df: pd.DataFrame,
+                           stores_df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Enrich interactions with store information (returns matched row count)"""
+    # Columns are prefixed to avoid conflicts (store_store_name, store_region, ...)
+    store_lookup = DimensionLookup(stores_df, 'store_id', STORE_LOOKUP_COLUMNS, prefix='store_')
+    return store_lookup.attach_counted(interactions_df)
 
-def _add_customer_insights(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
-    """Add customer demographic insights"""
+def _enrich_with_device_data(interactions_df: pd.DataFrame,
+                            devices_df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Enrich interactions with device information (returns matched row count)"""
+    # Columns are prefixed to avoid conflicts (device_device_name, device_device_type, ...)
+    device_lookup = DimensionLookup(devices_df, 'device_id', DEVICE_LOOKUP_COLUMNS, prefix='device_')
+    return device_lookup.attach_counted(interactions_df)
+
+def _add_customer_insights(df: pd.DataFrame, run: Optional[ETLRun],
+                           group_stats: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Add customer demographic insights (frequency from `compute_enrichment_globals`)"""
     enriched_df = df.copy()
 
     # Age group mapping (if age data exists)
@@ -138,10 +254,9 @@ def _add_customer_insights(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
         )
 
     # Frequency indicators (simplified for demo)
-    if 'customer_id' in df.columns:
-        customer_freq = df.groupby('customer_id').size()
-        freq_mapping = customer_freq.to_dict()
-        enriched_df['customer_frequency'] = df['customer_id'].map(freq_mapping)
+    if 'customer' in group_stats:
+        enriched_df['customer_frequency'] = broadcast_stats_table(
+            df['customer_id'], group_stats['customer'])['customer_frequency']
 
         enriched_df['frequency_segment'] = pd.cut(
             enriched_df['customer_frequency'],
@@ -151,175 +266,306 @@ def _add_customer_insights(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
 
     return enriched_df
 
-def _add_business_metrics(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
-    """Add business intelligence metrics"""
-    enriched_df = df.copy()
+BRAND_STATS = {
+    'brand_total_revenue': ('total_amount', 'sum'),
+    'brand_transaction_count': ('total_amount', 'count'),
+    'brand_avg_transaction': ('total_amount', 'mean'),
+}
+CATEGORY_STATS = {
+    'category_total_revenue': ('total_amount', 'sum'),
+    'category_avg_transaction': ('total_amount', 'mean'),
+    'category_avg_quantity': ('quantity', 'mean'),
+}
+CUSTOMER_STATS = {
+    'customer_frequency': ('customer_id', 'size'),
+}
+
+# group_stats name -> (group key, statistics, rounding)
+ENRICHMENT_GROUP_STATS = {
+    'brand': ('brand', BRAND_STATS, None),
+    'category': ('category', CATEGORY_STATS, 2),
+    'customer': ('customer_id', CUSTOMER_STATS, None),
+}
+
+def compute_enrichment_globals(frames: Iterable[pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Population-wide brand, category and customer statistics over partitions
+
+    Each frame contributes mergeable partial sums and counts for the
+    ENRICHMENT_GROUP_STATS specs it has the columns for; the merged result
+    is indexed by group key, ready to broadcast onto any partition.
+    """
+    partials: Dict[str, List[pd.DataFrame]] = {name: [] for name in ENRICHMENT_GROUP_STATS}
+    for df in frames:
+        if df.empty:
+            continue
+        for name, (by, aggs, _) in ENRICHMENT_GROUP_STATS.items():
+            if {by, *(col for col, _ in aggs.values())}.issubset(df.columns):
+                partials[name].append(group_stat_partials(df, by, aggs))
+
+    return {name: merge_group_stats(parts, ENRICHMENT_GROUP_STATS[name][1],
+                                    decimals=ENRICHMENT_GROUP_STATS[name][2])
+            for name, parts in partials.items() if parts}
+
+# Simplified margin assumptions by category
+CATEGORY_MARGIN_RATES = {
+    'BEVERAGES': 0.25,
+    'SNACKS': 0.30,
+    'PERSONAL CARE': 0.35,
+    'ELECTRONICS': 0.15,
+    'CLOTHING': 0.50
+}
+DEFAULT_MARGIN_RATE = 0.25
+
+def estimated_margin_rate(category: pd.Series) -> pd.Series:
+    """Margin rate per row from its category (default rate when unknown)"""
+    return category.str.upper().map(CATEGORY_MARGIN_RATES).fillna(DEFAULT_MARGIN_RATE)
+
+def _add_business_metrics(df: pd.DataFrame, run: Optional[ETLRun],
+                          group_stats: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Add business intelligence metrics (group stats from `compute_enrichment_globals`)"""
+    # New columns are collected and attached once; group stats are broadcast
+    # by group codes rather than merged back onto the frame
+    new_columns = {}
 
     # Margin calculation (simplified - would need cost data in production)
     if 'total_amount' in df.columns and 'category' in df.columns:
-        # Simplified margin assumptions by category
-        margin_mapping = {
-            'BEVERAGES': 0.25,
-            'SNACKS': 0.30,
-            'PERSONAL CARE': 0.35,
-            'ELECTRONICS': 0.15,
-            'CLOTHING': 0.50
-        }
-
-        enriched_df['estimated_margin_rate'] = df['category'].str.upper().map(margin_mapping).fillna(0.25)
-        enriched_df['estimated_margin'] = df['total_amount'] * enriched_df['estimated_margin_rate']
+        margin_rate = estimated_margin_rate(df['category'])
+        new_columns['estimated_margin_rate'] = margin_rate
+        new_columns['estimated_margin'] = df['total_amount'] * margin_rate
 
     # Brand performance indicators
-    if 'brand' in df.columns and 'total_amount' in df.columns:
-        brand_performance = df.groupby('brand')['total_amount'].agg(['sum', 'count', 'mean'])
-        brand_performance.columns = ['brand_total_revenue', 'brand_transaction_count', 'brand_avg_transaction']
-
-        enriched_df = enriched_df.merge(
-            brand_performance.reset_index(),
-            on='brand',
-            how='left'
-        )
+    if 'brand' in group_stats:
+        new_columns.update(broadcast_stats_table(df['brand'], group_stats['brand']).items())
 
     # Category insights
-    if 'category' in df.columns:
-        category_stats = df.groupby('category').agg({
-            'total_amount': ['sum', 'mean'],
-            'quantity': 'mean'
-        }).round(2)
-
-        category_stats.columns = ['category_total_revenue', 'category_avg_transaction', 'category_avg_quantity']
-
-        enriched_df = enriched_df.merge(
-            category_stats.reset_index(),
-            on='category',
-            how='left'
-        )
+    if 'category' in group_stats:
+        new_columns.update(broadcast_stats_table(df['category'], group_stats['category']).items())
 
     # Cross-selling indicators
     if 'transaction_id' in df.columns and 'brand' in df.columns:
         # Count unique brands per transaction
-        brand_count = df.groupby('transaction_id')['brand'].nunique().reset_index()
-        brand_count.columns = ['transaction_id', 'brands_in_basket']
-
-        enriched_df = enriched_df.merge(brand_count, on='transaction_id', how='left')
+        distinct = 'approx_nunique' if cfg.approx_distinct else 'nunique'
+        brand_count = broadcast_group_stats(df, 'transaction_id', {
+            'brands_in_basket': ('brand', distinct),
+        }, hll_precision=cfg.hll_group_precision)['brands_in_basket']
+        new_columns['brands_in_basket'] = brand_count
 
         # Cross-selling flag
-        enriched_df['is_cross_sell'] = (enriched_df['brands_in_basket'] > 1).astype(bool)
+        new_columns['is_cross_sell'] = (brand_count > 1).astype(bool)
 
-    return enriched_df
+    if not new_columns:
+        return df.copy()
+
+    base = df.drop(columns=[c for c in new_columns if c in df.columns])
+    return pd.concat([base, pd.DataFrame(new_columns, index=df.index)], axis=1)
+
+TEMPORAL_DATE_COLUMNS = ['is_weekend', 'is_month_end', 'is_month_start', 'season',
+                         'is_holiday_season', 'is_payday_period', 'is_holiday', 'holiday_name']
+TEMPORAL_HOUR_COLUMNS = ['hour', 'is_peak_hour', 'is_business_hour', 'work_shift']
 
-def _add_temporal_enrichments(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
+def _add_temporal_enrichments(df: pd.DataFrame, run: Optional[ETLRun]) -> pd.DataFrame:
     """Add time-based enrichments"""
-    enriched_df = df.copy()
+    # Flags are precomputed in the calendar and hour-of-day dimensions
+    # (Philippine seasons, holidays, paydays, shifts); each is a lookup by key
+    new_columns = []
 
     if 'transaction_date' in df.columns:
-        transaction_date = pd.to_datetime(df['transaction_date'])
-
-        # Day classifications
-        enriched_df['is_weekend'] = transaction_date.dt.weekday >= 5
-        enriched_df['is_month_end'] = transaction_date.dt.day >= 25
-        enriched_df['is_month_start'] = transaction_date.dt.day <= 7
-
-        # Season mapping (Philippines context)
-        enriched_df['season'] = transaction_date.dt.month.map({
-            12: 'Dry', 1: 'Dry', 2: 'Dry', 3: 'Hot Dry', 4: 'Hot Dry', 5: 'Hot Dry',
-            6: 'Wet', 7: 'Wet', 8: 'Wet', 9: 'Wet', 10: 'Wet', 11: 'Dry'
-        })
-
-        # Holiday indicators (simplified)
-        enriched_df['is_holiday_season'] = transaction_date.dt.month.isin([11, 12, 1])
-
-        # Payroll periods (15th and 30th)
-        enriched_df['is_payday_period'] = (
-            (transaction_date.dt.day.between(13, 17)) |
-            (transaction_date.dt.day.between(28, 31))
-        )
+        transaction_date = parse_datetimes(df['transaction_date'])
+        new_columns.append(calendar_columns(transaction_date, TEMPORAL_DATE_COLUMNS))
 
     if 'transaction_timestamp' in df.columns:
-        transaction_ts = pd.to_datetime(df['transaction_timestamp'])
-
-        # Hour-based classifications
-        enriched_df['hour'] = transaction_ts.dt.hour
-        enriched_df['is_peak_hour'] = transaction_ts.dt.hour.isin([11, 12, 13, 17, 18, 19])  # Lunch & dinner
-        enriched_df['is_business_hour'] = transaction_ts.dt.hour.between(9, 21)
-
-        # Shift classifications
-        enriched_df['work_shift'] = pd.cut(
-            transaction_ts.dt.hour,
-            bins=[0, 6, 14, 22, 24],
-            labels=['Night', 'Morning', 'Afternoon', 'Evening'],
-            include_lowest=True
-        )
+        transaction_ts = parse_datetimes(df['transaction_timestamp'])
+        new_columns.append(hour_columns(transaction_ts, TEMPORAL_HOUR_COLUMNS))
+
+    enriched_df = df.copy()
+    for columns in new_columns:
+        for col in columns.columns:
+            enriched_df[col] = columns[col]
 
     return enriched_df
 
-def create_customer_segments(enriched_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
-    """Create customer segmentation table"""
-    if enriched_df.empty or 'customer_id' not in enriched_df.columns:
+def create_customer_segments(enriched_df: pd.DataFrame, run: ETLRun,
+                             state: Optional[CustomerAggregateState] = None) -> pd.DataFrame:
+    """Create customer segmentation table
+
+    With a `state`, the batch is merged into the persisted per-customer
+    aggregates and RFM scores are recomputed from the state table, so a
+    refresh costs time proportional to the new rows rather than the history.
+    """
+    has_batch = not enriched_df.empty and 'customer_id' in enriched_df.columns
+    if not has_batch and state is None:
         run.log_step("create_customer_segments", "skipped", note="No customer data")
         return pd.DataFrame()
 
     try:
         # Aggregate customer metrics
-        customer_metrics = enriched_df.groupby('customer_id').agg({
-            'total_amount': ['sum', 'mean', 'count'],
-            'quantity': 'sum',
-            'transaction_date': ['min', 'max'],
-            'brand': 'nunique',
-            'category': 'nunique',
-            'store_id': 'nunique'
-        }).round(2)
-
-        customer_metrics.columns = [
-            'total_revenue', 'avg_transaction_value', 'transaction_count',
-            'total_quantity', 'first_purchase', 'last_purchase',
-            'brands_purchased', 'categories_purchased', 'stores_visited'
-        ]
+        if state is not None:
+            if has_batch:
+                state.merge_batch(enriched_df, run)
+                state.save()
+            customer_metrics = customer_metrics_from_state(state.customers)
+        else:
+            customer_metrics = customer_metrics_from_state(
+                build_customer_partials(enriched_df, ['customer_id'])
+            )
+
+        if customer_metrics.empty:
+            run.log_step("create_customer_segments", "skipped", note="No customer data")
+            return pd.DataFrame()
 
         # Calculate derived metrics
-        customer_metrics['days_active'] = (
-            pd.to_datetime(customer_metrics['last_purchase']) -
-            pd.to_datetime(customer_metrics['first_purchase'])
-        ).dt.days + 1
+        customer_metrics = add_customer_derived_metrics(customer_metrics, pd.Timestamp.now())
 
-        customer_metrics['avg_days_between_visits'] = (
-            customer_metrics['days_active'] / customer_metrics['transaction_count']
+        # RFM scores (1-5 scale) from quantile-sketch bin edges; partitions
+        # of customers would each build sketches and share the merged edges
+        edges = rfm_bin_edges([build_rfm_sketches(customer_metrics)])
+        customer_metrics = assign_rfm_scores(customer_metrics, edges)
+
+        # Add surrogate key
+        customer_metrics = customer_metrics.reset_index()
+        customer_metrics['customer_segment_key'] = create_surrogate_key(
+            customer_metrics, ['customer_id']
         )
 
-        # RFM Segmentation
-        customer_metrics['recency_days'] = (
-            pd.Timestamp.now() - pd.to_datetime(customer_metrics['last_purchase'])
-        ).dt.days
+        run.log_step("create_customer_segments", "success", rows=len(customer_metrics))
+        run.log_metric("customer_segments_created", len(customer_metrics))
 
-        # Create RFM scores (1-5 scale)
-        customer_metrics['recency_score'] = pd.qcut(
-            customer_metrics['recency_days'], q=5, labels=[5, 4, 3, 2, 1]
-        )
-        customer_metrics['frequency_score'] = pd.qcut(
-            customer_metrics['transaction_count'], q=5, labels=[1, 2, 3, 4, 5]
-        )
-        customer_metrics['monetary_score'] = pd.qcut(
-            customer_metrics['total_revenue'], q=5, labels=[1, 2, 3, 4, 5]
-        )
+        return customer_metrics
 
-        # Combine RFM into segments
-        customer_metrics['rfm_score'] = (
-            customer_metrics['recency_score'].astype(str) +
-            customer_metrics['frequency_score'].astype(str) +
-            customer_metrics['monetary_score'].astype(str)
+    except Exception as e:
+        run.log_error("create_customer_segments", str(e))
+        return pd.DataFrame()
+
+# RFM score column -> (input metric, labels from lowest to highest bin)
+RFM_SCORES = {
+    'recency_score': ('recency_days', [5, 4, 3, 2, 1]),
+    'frequency_score': ('transaction_count', [1, 2, 3, 4, 5]),
+    'monetary_score': ('total_revenue', [1, 2, 3, 4, 5]),
+}
+
+def add_customer_derived_metrics(customer_metrics: pd.DataFrame,
+                                 as_of: pd.Timestamp) -> pd.DataFrame:
+    """Add activity span, visit spacing and recency to per-customer metrics"""
+    customer_metrics = customer_metrics.copy()
+    last_purchase = pd.to_datetime(customer_metrics['last_purchase'])
+
+    customer_metrics['days_active'] = (
+        last_purchase - pd.to_datetime(customer_metrics['first_purchase'])
+    ).dt.days + 1
+
+    customer_metrics['avg_days_between_visits'] = (
+        customer_metrics['days_active'] / customer_metrics['transaction_count']
+    )
+
+    # RFM Segmentation
+    customer_metrics['recency_days'] = (as_of - last_purchase).dt.days
+
+    return customer_metrics
+
+def build_rfm_sketches(customer_metrics: pd.DataFrame) -> Dict[str, KLLSketch]:
+    """Quantile sketches of the RFM inputs for one partition of customers"""
+    return {
+        score_col: KLLSketch.from_values(customer_metrics[metric_col], cfg.quantile_sketch_k)
+        for score_col, (metric_col, _) in RFM_SCORES.items()
+    }
+
+def rfm_bin_edges(partition_sketches: List[Dict[str, KLLSketch]]) -> Dict[str, np.ndarray]:
+    """Merge per-partition sketches into global quintile edges per RFM score"""
+    edges = {}
+    for score_col, (_, labels) in RFM_SCORES.items():
+        merged = merge_sketches(sketches[score_col] for sketches in partition_sketches)
+        edges[score_col] = quantile_bin_edges(merged, len(labels))
+    return edges
+
+def assign_rfm_scores(customer_metrics: pd.DataFrame,
+                      edges: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Score customers against shared bin edges and combine into rfm_score
+
+    Every partition scored with the same edges gets the scores a single
+    pass over all customers would give; tied edges leave bins empty
+    instead of failing like `pd.qcut`. Edges equal `pd.qcut`'s while the
+    sketches are exact (up to cfg.quantile_sketch_k customers); beyond
+    that they are approximate, and customers ranked within about 1.7/k of
+    an edge may score one bin off.
+    """
+    customer_metrics = customer_metrics.copy()
+    for score_col, (metric_col, labels) in RFM_SCORES.items():
+        bins = assign_quantile_bins(customer_metrics[metric_col], edges[score_col])
+        customer_metrics[score_col] = pd.Categorical.from_codes(
+            bins, categories=labels, ordered=True
         )
 
+    # Combine RFM into segments
+    customer_metrics['rfm_score'] = (
+        customer_metrics['recency_score'].astype(str) +
+        customer_metrics['frequency_score'].astype(str) +
+        customer_metrics['monetary_score'].astype(str)
+    )
+
+    return customer_metrics
+
+CUSTOMER_METRIC_SOURCE_COLUMNS = ['customer_id', 'total_amount', 'quantity', 'transaction_date',
+                                  'brand', 'category', 'store_id']
+
+def create_customer_segments_out_of_core(enriched: SpillStore, run: ETLRun) -> pd.DataFrame:
+    """Customer segmentation over spilled enriched interactions
+
+    Interactions are re-spilled by `customer_id`; each bucket's customer
+    metrics and RFM quantile sketches are computed independently, the
+    sketches are merged into global bin edges, and every bucket is scored
+    with the same edges before the (one row per customer) results are
+    concatenated.
+    """
+    if enriched is None or len(enriched) == 0:
+        run.log_step("create_customer_segments", "skipped", note="No customer data")
+        return pd.DataFrame()
+
+    start_time = pd.Timestamp.now()
+
+    try:
+        by_customer = SpillStore(enriched.root, 'enriched_by_customer', 'customer_id',
+                                 enriched.n_buckets)
+        for _, bucket_df in enriched.iter_buckets():
+            if 'customer_id' not in bucket_df.columns:
+                continue
+            columns = [c for c in CUSTOMER_METRIC_SOURCE_COLUMNS if c in bucket_df.columns]
+            by_customer.append(bucket_df[columns])
+
+        as_of = pd.Timestamp.now()
+        metrics_by_bucket = {}
+        partition_sketches = []
+        for bucket, bucket_df in by_customer.iter_buckets():
+            customer_metrics = customer_metrics_from_state(
+                build_customer_partials(bucket_df, ['customer_id'])
+            )
+            customer_metrics = add_customer_derived_metrics(customer_metrics, as_of)
+            partition_sketches.append(build_rfm_sketches(customer_metrics))
+            metrics_by_bucket[bucket] = customer_metrics
+        by_customer.clear()
+
+        if not metrics_by_bucket:
+            run.log_step("create_customer_segments", "skipped", note="No customer data")
+            return pd.DataFrame()
+
+        edges = rfm_bin_edges(partition_sketches)
+        customer_metrics = pd.concat(
+            [assign_rfm_scores(metrics, edges) for metrics in metrics_by_bucket.values()]
+        ).sort_index()
+
         # Add surrogate key
         customer_metrics = customer_metrics.reset_index()
         customer_metrics['customer_segment_key'] = create_surrogate_key(
             customer_metrics, ['customer_id']
         )
 
-        run.log_step("create_customer_segments", "success", rows=len(customer_metrics))
+        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        run.log_step("create_customer_segments", "success",
+                    duration_ms=duration_ms, rows=len(customer_metrics),
+                    buckets=enriched.n_buckets)
         run.log_metric("customer_segments_created", len(customer_metrics))
 
         return customer_metrics
 
     except Exception as e:
         run.log_error("create_customer_segments", str(e))
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()